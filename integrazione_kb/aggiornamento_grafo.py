@@ -0,0 +1,265 @@
+from collections import Counter
+
+from integrazione_kb.costruisci_grafo import aggiungi_relazione, costo_proprieta
+
+
+class ModificheGrafo:
+    """
+    Descrive cosa è cambiato nel grafo dopo un aggiornamento.
+
+    - archi_aggiunti: coppie (a, b) con il loro nuovo costo
+    - archi_rimossi: coppie (a, b) che non esistono più
+    - archi_modificati: coppie (a, b) con costo (vecchio, nuovo)
+    - nodi_aggiunti / nodi_rimossi: nodi comparsi o spariti dal grafo
+
+    Gli archi sono simmetrici e compaiono una sola volta per coppia.
+    """
+
+    def __init__(self):
+        self.archi_aggiunti = {}
+        self.archi_rimossi = set()
+        self.archi_modificati = {}
+        self.nodi_aggiunti = set()
+        self.nodi_rimossi = set()
+
+    def vuota(self):
+        return not (
+            self.archi_aggiunti
+            or self.archi_rimossi
+            or self.archi_modificati
+            or self.nodi_aggiunti
+            or self.nodi_rimossi
+        )
+
+    def nodi_toccati(self):
+        """
+        Tutti i nodi estremi di un arco cambiato, più i nodi aggiunti o rimossi.
+        """
+        nodi = set(self.nodi_aggiunti) | set(self.nodi_rimossi)
+        for coppie in (self.archi_aggiunti, self.archi_rimossi, self.archi_modificati):
+            for a, b in coppie:
+                nodi.add(a)
+                nodi.add(b)
+        return nodi
+
+    def solo_peggioramenti(self):
+        """
+        True se nessun costo è diminuito e nessun arco è stato aggiunto:
+        in questo caso le distanze possono solo aumentare.
+        """
+        if self.archi_aggiunti:
+            return False
+        return all(nuovo >= vecchio for vecchio, nuovo in self.archi_modificati.values())
+
+
+def _coppia(a, b):
+    return (a, b) if a <= b else (b, a)
+
+
+def _voce(sorgente, nome_prop, destinazione):
+    """
+    Voce di un'asserzione nel conteggio della sua coppia: il costo
+    in testa, così il costo dell'arco è il minimo delle voci rimaste.
+    """
+    return (float(costo_proprieta(nome_prop)), sorgente, nome_prop, destinazione)
+
+
+def _costo_arco(conteggi):
+    return min(voce[0] for voce in conteggi)
+
+
+class AggiornatoreGrafo:
+    """
+    Aggiorna il grafo di costruisci_grafo un'asserzione alla volta,
+    senza ricostruirlo dall'ontologia.
+
+    Per ogni coppia di nodi tiene il conteggio delle asserzioni
+    (sorgente, proprietà, destinazione) che la collegano: così, quando
+    un'asserzione viene rimossa, il costo dell'arco torna al minimo di
+    quelle rimaste e l'arco sparisce solo quando non ne resta nessuna.
+    Rimuovere un'asserzione mai fatta non tocca le altre, anche se
+    hanno lo stesso costo. Ogni operazione costa quanto gli archi
+    che cambia.
+
+    Dopo ogni operazione gli osservatori registrati ricevono un
+    oggetto ModificheGrafo con l'elenco di ciò che è cambiato.
+    """
+
+    def __init__(self, grafo, asserzioni=None, tipi=None):
+        """
+        - grafo: grafo da aggiornare (viene modificato sul posto)
+        - asserzioni: le terne da cui il grafo è stato costruito
+          (ad esempio asserzioni_ontologia). Se mancano, ogni arco esistente
+          conta come una sola asserzione anonima con il suo costo attuale:
+          la toglie qualsiasi asserzione con quel costo tra i due nodi,
+          e non si può sapere se sotto un arco ci fossero più asserzioni.
+        - tipi: tabella nome -> TIPO_* da tenere allineata quando si
+          aggiungono o rimuovono individui (viene modificata sul posto)
+        """
+        self.grafo = grafo
+        self.tipi = tipi
+        self.osservatori = []
+        self.asserzioni_coppia = {}
+
+        if asserzioni is None:
+            for a, vicini in grafo.items():
+                for b, costo in vicini.items():
+                    if a <= b:
+                        # Voce anonima: conosco solo il costo
+                        self.asserzioni_coppia[(a, b)] = Counter({(float(costo), None): 1})
+        else:
+            for sorgente, nome_prop, destinazione in asserzioni:
+                chiave = _coppia(sorgente, destinazione)
+                conteggi = self.asserzioni_coppia.setdefault(chiave, Counter())
+                conteggi[_voce(sorgente, nome_prop, destinazione)] += 1
+
+    @classmethod
+    def da_asserzioni(cls, asserzioni, tipi=None):
+        """
+        Costruisce insieme grafo e aggiornatore a partire dalle asserzioni.
+        """
+        asserzioni = list(asserzioni)
+        grafo = {}
+        for sorgente, nome_prop, destinazione in asserzioni:
+            aggiungi_relazione(grafo, sorgente, nome_prop, destinazione)
+        return cls(grafo, asserzioni, tipi)
+
+    def registra_osservatore(self, funzione):
+        """
+        funzione(modifiche) verrà chiamata dopo ogni aggiornamento.
+        """
+        self.osservatori.append(funzione)
+
+    def _notifica(self, modifiche):
+        if modifiche.vuota():
+            return
+        for funzione in self.osservatori:
+            funzione(modifiche)
+
+    def _imposta_costo(self, a, b, nuovo, modifiche):
+        """
+        Porta l'arco (a, b) al costo indicato (None = arco rimosso)
+        in entrambe le direzioni e registra la modifica.
+        """
+        grafo = self.grafo
+        vecchio = grafo.get(a, {}).get(b)
+
+        if vecchio == nuovo:
+            return
+
+        chiave = _coppia(a, b)
+
+        if nuovo is None:
+            for x, y in {(a, b), (b, a)}:
+                del grafo[x][y]
+                # Come in costruisci_grafo, un nodo senza archi non fa parte del grafo
+                if not grafo[x]:
+                    del grafo[x]
+                    if x in modifiche.nodi_aggiunti:
+                        modifiche.nodi_aggiunti.discard(x)
+                    else:
+                        modifiche.nodi_rimossi.add(x)
+            if modifiche.archi_aggiunti.pop(chiave, None) is None:
+                modifiche.archi_modificati.pop(chiave, None)
+                modifiche.archi_rimossi.add(chiave)
+            return
+
+        for x in (a, b):
+            if x not in grafo:
+                grafo[x] = {}
+                modifiche.nodi_aggiunti.add(x)
+        grafo[a][b] = nuovo
+        grafo[b][a] = nuovo
+
+        # Più passi sullo stesso arco nella stessa operazione
+        # vengono riassunti in un'unica modifica
+        if vecchio is None or chiave in modifiche.archi_aggiunti:
+            modifiche.archi_aggiunti[chiave] = nuovo
+        elif chiave in modifiche.archi_modificati:
+            modifiche.archi_modificati[chiave] = (modifiche.archi_modificati[chiave][0], nuovo)
+        else:
+            modifiche.archi_modificati[chiave] = (vecchio, nuovo)
+
+    def _aggiungi(self, sorgente, nome_prop, destinazione, modifiche):
+        chiave = _coppia(sorgente, destinazione)
+        conteggi = self.asserzioni_coppia.setdefault(chiave, Counter())
+        conteggi[_voce(sorgente, nome_prop, destinazione)] += 1
+        self._imposta_costo(sorgente, destinazione, _costo_arco(conteggi), modifiche)
+
+    def _rimuovi(self, sorgente, nome_prop, destinazione, modifiche):
+        chiave = _coppia(sorgente, destinazione)
+        conteggi = self.asserzioni_coppia.get(chiave)
+        if not conteggi:
+            return False
+
+        voce = _voce(sorgente, nome_prop, destinazione)
+        if voce not in conteggi:
+            # Arco noto senza le sue asserzioni: vale la voce anonima con lo stesso costo
+            voce = (voce[0], None)
+            if voce not in conteggi:
+                return False
+
+        conteggi[voce] -= 1
+        if conteggi[voce] == 0:
+            del conteggi[voce]
+
+        if conteggi:
+            self._imposta_costo(sorgente, destinazione, _costo_arco(conteggi), modifiche)
+        else:
+            del self.asserzioni_coppia[chiave]
+            self._imposta_costo(sorgente, destinazione, None, modifiche)
+
+        return True
+
+    def aggiungi_asserzione(self, sorgente, nome_prop, destinazione):
+        """
+        Aggiunge un'asserzione, ad esempio (Anna, haPrestito, Prestito12).
+        """
+        modifiche = ModificheGrafo()
+        self._aggiungi(sorgente, nome_prop, destinazione, modifiche)
+        self._notifica(modifiche)
+        return modifiche
+
+    def rimuovi_asserzione(self, sorgente, nome_prop, destinazione):
+        """
+        Rimuove un'asserzione. Se non era presente non cambia nulla.
+        """
+        modifiche = ModificheGrafo()
+        self._rimuovi(sorgente, nome_prop, destinazione, modifiche)
+        self._notifica(modifiche)
+        return modifiche
+
+    def aggiungi_individuo(self, nome, relazioni=(), tipo=None):
+        """
+        Aggiunge un individuo con le sue asserzioni in uscita,
+        date come coppie (proprietà, destinazione).
+
+        Come in costruisci_grafo, un individuo senza relazioni
+        non compare nel grafo.
+
+        Il tipo (TIPO_*), se indicato, viene registrato nella tabella tipi.
+        """
+        if tipo is not None and self.tipi is not None:
+            self.tipi[nome] = tipo
+
+        modifiche = ModificheGrafo()
+        for nome_prop, destinazione in relazioni:
+            self._aggiungi(nome, nome_prop, destinazione, modifiche)
+        self._notifica(modifiche)
+        return modifiche
+
+    def rimuovi_individuo(self, nome):
+        """
+        Rimuove un individuo e tutte le asserzioni che lo riguardano.
+        """
+        modifiche = ModificheGrafo()
+
+        for vicino in list(self.grafo.get(nome, {}).keys()):
+            self.asserzioni_coppia.pop(_coppia(nome, vicino), None)
+            self._imposta_costo(nome, vicino, None, modifiche)
+
+        if self.tipi is not None:
+            self.tipi.pop(nome, None)
+
+        self._notifica(modifiche)
+        return modifiche
@@ -0,0 +1,126 @@
+from pathlib import Path
+
+from integrazione_kb.cache_pickle import impronta_file, leggi_cache, scrivi_cache
+from integrazione_kb.chiusura_categorie import tassonomia_da_asserzioni
+from integrazione_kb.costruisci_grafo import (
+    COSTI_PROPRIETA,
+    COSTO_BASE,
+    VERSIONE_COSTRUTTORE,
+    asserzioni_ontologia,
+    costruisci_grafo,
+    raggruppa_nodi_per_tipo,
+    tipi_ontologia,
+)
+from integrazione_kb.grafo_mmap import GrafoMappato, scrivi_grafo_mmap
+
+
+# Versione dei dati salvati nella cache del grafo (non delle regole del grafo).
+# Entra solo nella chiave di quella cache: cambiarla non invalida le altre.
+VERSIONE_FORMATO = 5
+
+
+def percorso_cache(percorso_owl):
+    """
+    Il file di cache sta accanto all'ontologia:
+    ontologia/biblioteca.owl -> ontologia/biblioteca.grafo.cache
+    """
+    percorso_owl = Path(percorso_owl)
+    return percorso_owl.with_name(percorso_owl.stem + ".grafo.cache")
+
+
+def percorso_grafo_mmap(percorso_owl):
+    """
+    ontologia/biblioteca.owl -> ontologia/biblioteca.grafo.mmap
+    """
+    percorso_owl = Path(percorso_owl)
+    return percorso_owl.with_name(percorso_owl.stem + ".grafo.mmap")
+
+
+def chiave_cache(percorso_owl):
+    """
+    La chiave combina il contenuto dell'ontologia e le regole usate
+    per costruire il grafo: se cambia l'una o le altre,
+    la cache non è più valida.
+    """
+    regole = repr((VERSIONE_COSTRUTTORE, COSTO_BASE, sorted(COSTI_PROPRIETA.items())))
+    return f"{impronta_file(percorso_owl)}:{regole}"
+
+
+def _costruisci_dati(percorso_owl):
+    """
+    Percorso lento: carica l'ontologia con owlready2 e costruisce tutto.
+    """
+    # Importato qui: con la cache valida owlready2 non viene nemmeno caricato
+    from owlready2 import get_ontology
+
+    ontologia = get_ontology(str(Path(percorso_owl).resolve())).load()
+
+    grafo = costruisci_grafo(ontologia)
+    tipi = tipi_ontologia(ontologia)
+    gruppi = raggruppa_nodi_per_tipo(tipi.keys(), tipi)
+    tassonomia = tassonomia_da_asserzioni(asserzioni_ontologia(ontologia))
+
+    return {
+        "grafo": grafo,
+        "tipi": tipi,
+        "gruppi": gruppi,
+        "tassonomia": tassonomia,
+    }
+
+
+def carica_grafo_biblioteca(percorso_owl, usa_cache=True):
+    """
+    Restituisce il grafo della biblioteca e i dati collegati:
+      {"grafo": ..., "tipi": ..., "gruppi": ..., "tassonomia": ...}
+
+    - grafo: dizionario prodotto da costruisci_grafo
+    - tipi: tipo (TIPO_*) di ogni individuo, dalle sue classi OWL
+    - gruppi: elenchi ordinati di individui per il menu
+    - tassonomia: (madri, categorie_libro) per IndiceChiusura
+
+    Se esiste una cache valida per questa ontologia la uso
+    senza toccare owlready2, altrimenti ricostruisco e salvo.
+    """
+    percorso_owl = Path(percorso_owl)
+    percorso = percorso_cache(percorso_owl)
+    chiave = chiave_cache(percorso_owl)
+
+    if usa_cache:
+        dati = leggi_cache(percorso, f"{chiave}:{VERSIONE_FORMATO}")
+        if dati is not None:
+            return dati
+
+    dati = _costruisci_dati(percorso_owl)
+
+    if usa_cache:
+        scrivi_cache(percorso, f"{chiave}:{VERSIONE_FORMATO}", dati)
+
+    return dati
+
+
+def apri_grafo_mappato(percorso_owl):
+    """
+    Restituisce un GrafoMappato del grafo costruito da percorso_owl.
+
+    Il file binario sta accanto all'ontologia e porta con sé la chiave
+    della cache: se l'ontologia o le regole del grafo sono cambiate
+    viene riscritto (passando per carica_grafo_biblioteca), altrimenti
+    viene solo mappato, senza costruire nulla.
+    """
+    percorso_owl = Path(percorso_owl)
+    percorso = percorso_grafo_mmap(percorso_owl)
+    chiave = chiave_cache(percorso_owl)
+
+    try:
+        grafo = GrafoMappato(percorso)
+    except (OSError, ValueError):
+        grafo = None
+
+    if grafo is not None:
+        if grafo.chiave == chiave:
+            return grafo
+        grafo.chiudi()
+
+    dati = carica_grafo_biblioteca(percorso_owl)
+    scrivi_grafo_mmap(percorso, dati["grafo"], dati["tipi"], chiave)
+    return GrafoMappato(percorso)
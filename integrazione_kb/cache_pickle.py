@@ -0,0 +1,67 @@
+import hashlib
+import os
+import pickle
+
+
+# Versione del contenitore (dizionario con versione, chiave e dati),
+# non di quello che ci viene salvato dentro: chi salva qualcosa mette
+# la versione dei propri dati nella chiave.
+VERSIONE_CONTENITORE = 1
+
+
+def impronta_file(percorso_file, dimensione_blocco=1 << 20):
+    """
+    Calcola l'hash SHA-256 del contenuto di un file, leggendolo a blocchi.
+    """
+    h = hashlib.sha256()
+    with open(percorso_file, "rb") as f:
+        for blocco in iter(lambda: f.read(dimensione_blocco), b""):
+            h.update(blocco)
+    return h.hexdigest()
+
+
+def leggi_cache(percorso, chiave):
+    """
+    Restituisce i dati salvati con scrivi_cache, oppure None se il file
+    manca, è illeggibile o è stato scritto con una chiave diversa.
+    """
+    try:
+        with open(percorso, "rb") as f:
+            contenuto = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+
+    if not isinstance(contenuto, dict):
+        return None
+    if contenuto.get("versione_contenitore") != VERSIONE_CONTENITORE:
+        return None
+    if contenuto.get("chiave") != chiave:
+        return None
+
+    return contenuto.get("dati")
+
+
+def scrivi_cache(percorso, chiave, dati):
+    """
+    Salva i dati insieme alla chiave che li rende validi.
+    Se il file non si può scrivere non succede nulla: la cache è facoltativa.
+    """
+    contenuto = {
+        "versione_contenitore": VERSIONE_CONTENITORE,
+        "chiave": chiave,
+        "dati": dati,
+    }
+
+    # Scrivo su un file temporaneo e poi lo rinomino,
+    # così un'interruzione non lascia una cache a metà.
+    temporaneo = percorso.with_name(percorso.name + f".{os.getpid()}.tmp")
+    try:
+        with open(temporaneo, "wb") as f:
+            pickle.dump(contenuto, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaneo, percorso)
+    except OSError:
+        # Se non posso scrivere la cache proseguo comunque
+        try:
+            os.remove(temporaneo)
+        except OSError:
+            pass
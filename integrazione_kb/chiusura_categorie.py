@@ -0,0 +1,235 @@
+from collections import deque
+
+
+PROPRIETA_SOTTOCATEGORIA = "sottoCategoriaDi"
+PROPRIETA_CATEGORIA_LIBRO = "appartieneCategoria"
+
+
+def tassonomia_da_asserzioni(asserzioni):
+    """
+    Estrae dalle asserzioni (sorgente, proprietà, destinazione) le parti
+    orientate che il grafo simmetrico non conserva:
+    - madri: categoria -> categorie di cui è sottocategoria diretta
+    - categorie_libro: libro -> categorie a cui appartiene
+    """
+    madri = {}
+    categorie_libro = {}
+
+    for sorgente, nome_prop, destinazione in asserzioni:
+        if nome_prop == PROPRIETA_SOTTOCATEGORIA:
+            madri.setdefault(sorgente, []).append(destinazione)
+            madri.setdefault(destinazione, [])
+        elif nome_prop == PROPRIETA_CATEGORIA_LIBRO:
+            categorie_libro.setdefault(sorgente, []).append(destinazione)
+            madri.setdefault(destinazione, [])
+
+    return madri, categorie_libro
+
+
+class IndiceChiusura:
+    """
+    Chiusura transitiva di sottoCategoriaDi: dice in tempo costante se
+    una categoria sta sotto un'altra, senza visite della tassonomia.
+
+    Due rappresentazioni, scelte alla costruzione:
+    - "intervalli": se ogni categoria ha al più una madre (una foresta),
+      numero le categorie in ordine di visita in profondità; i discendenti
+      di a sono quelli con numero in [inizio[a], fine[a])
+    - "bitset": se qualche categoria ha più madri, ogni categoria ha un
+      intero i cui bit sono i suoi antenati (lei compresa)
+
+    Con categorie_libro risponde anche per i libri: un libro sta sotto
+    una categoria se vi sta almeno una delle sue categorie.
+    """
+
+    def __init__(self, madri, categorie_libro=None):
+        self.madri = {c: list(m) for c, m in madri.items()}
+        for elenco in list(self.madri.values()):
+            for m in elenco:
+                self.madri.setdefault(m, [])
+
+        self.figlie = {c: [] for c in self.madri}
+        for c, elenco in self.madri.items():
+            for m in elenco:
+                self.figlie[m].append(c)
+
+        self.categorie_libro = {l: list(c) for l, c in (categorie_libro or {}).items()}
+        self.libri_categoria = {}
+        for libro, categorie in self.categorie_libro.items():
+            for c in categorie:
+                self.libri_categoria.setdefault(c, []).append(libro)
+
+        self.inizio = {}
+        self.fine = {}
+        self.ordine = []
+        self.antenati = {}
+        self.bit = {}
+
+        if all(len(m) <= 1 for m in self.madri.values()) and self._numera_foresta():
+            self.modo = "intervalli"
+        else:
+            self.modo = "bitset"
+            self._calcola_antenati()
+
+    def _numera_foresta(self):
+        """
+        Visita in profondità dalle radici assegnando gli intervalli.
+        Restituisce False se qualche categoria non è raggiungibile
+        da una radice (c'è un ciclo).
+        """
+        for radice in self.madri:
+            if self.madri[radice]:
+                continue
+
+            self.inizio[radice] = len(self.ordine)
+            self.ordine.append(radice)
+            pila = [(radice, iter(self.figlie[radice]))]
+
+            while pila:
+                nodo, figlie = pila[-1]
+                figlia = next(figlie, None)
+                if figlia is None:
+                    self.fine[nodo] = len(self.ordine)
+                    pila.pop()
+                else:
+                    self.inizio[figlia] = len(self.ordine)
+                    self.ordine.append(figlia)
+                    pila.append((figlia, iter(self.figlie[figlia])))
+
+        if len(self.ordine) == len(self.madri):
+            return True
+
+        self.inizio, self.fine, self.ordine = {}, {}, []
+        return False
+
+    def _calcola_antenati(self):
+        """
+        Antenati come bitset, in ordine topologico dalle radici:
+        gli antenati di una categoria sono lei più quelli delle madri.
+        """
+        self.bit = {c: 1 << i for i, c in enumerate(self.madri)}
+
+        da_visitare = {c: len(m) for c, m in self.madri.items()}
+        coda = deque(c for c, k in da_visitare.items() if k == 0)
+
+        while coda:
+            c = coda.popleft()
+            antenati = self.bit[c]
+            for m in self.madri[c]:
+                antenati |= self.antenati[m]
+            self.antenati[c] = antenati
+
+            for f in self.figlie[c]:
+                da_visitare[f] -= 1
+                if da_visitare[f] == 0:
+                    coda.append(f)
+
+        # Categorie in un ciclo: risalgo le madri con una visita
+        for c in self.madri:
+            if c in self.antenati:
+                continue
+            antenati = 0
+            visti = {c}
+            coda = deque([c])
+            while coda:
+                x = coda.popleft()
+                antenati |= self.bit[x]
+                for m in self.madri[x]:
+                    if m not in visti:
+                        visti.add(m)
+                        coda.append(m)
+            self.antenati[c] = antenati
+
+    def e_categoria(self, nome):
+        return nome in self.madri
+
+    def e_discendente(self, categoria, antenato):
+        """
+        True se categoria è antenato o sta (anche indirettamente) sotto.
+        """
+        if self.modo == "intervalli":
+            i = self.inizio.get(categoria)
+            if i is None or antenato not in self.inizio:
+                return False
+            return self.inizio[antenato] <= i < self.fine[antenato]
+
+        antenati = self.antenati.get(categoria)
+        bit = self.bit.get(antenato)
+        if antenati is None or bit is None:
+            return False
+        return antenati & bit != 0
+
+    def sotto(self, nodo, categoria):
+        """
+        True se nodo è una categoria del sottoalbero di categoria
+        oppure un libro che appartiene a una di quelle categorie.
+        """
+        if nodo in self.madri:
+            return self.e_discendente(nodo, categoria)
+
+        for c in self.categorie_libro.get(nodo, ()):
+            if self.e_discendente(c, categoria):
+                return True
+        return False
+
+    def discendenti(self, categoria):
+        """
+        Categorie del sottoalbero, categoria compresa.
+        """
+        if categoria not in self.madri:
+            return []
+
+        if self.modo == "intervalli":
+            return self.ordine[self.inizio[categoria]:self.fine[categoria]]
+
+        risultato = [categoria]
+        visti = {categoria}
+        coda = deque([categoria])
+        while coda:
+            for f in self.figlie[coda.popleft()]:
+                if f not in visti:
+                    visti.add(f)
+                    risultato.append(f)
+                    coda.append(f)
+        return risultato
+
+    def libri_sotto(self, categoria):
+        """
+        Libri che appartengono a una categoria del sottoalbero.
+        """
+        libri = {}
+        for c in self.discendenti(categoria):
+            for libro in self.libri_categoria.get(c, ()):
+                libri[libro] = None
+        return list(libri)
+
+
+class ObiettivoSottoalbero:
+    """
+    Obiettivo "qualsiasi libro (e/o categoria) sotto radice" per
+    ProblemaBiblioteca: il test di appartenenza interroga l'indice,
+    così l'insieme degli obiettivi non viene mai costruito.
+    """
+
+    def __init__(self, indice, radice, libri=True, categorie=False):
+        self.indice = indice
+        self.radice = radice
+        self.libri = libri
+        self.categorie = categorie
+
+    def __contains__(self, nodo):
+        if self.indice.e_categoria(nodo):
+            return self.categorie and self.indice.e_discendente(nodo, self.radice)
+        return self.libri and self.indice.sotto(nodo, self.radice)
+
+    def elenca(self):
+        """
+        Tutti gli obiettivi, per gli algoritmi che devono partire da
+        essi (ricerca bidirezionale, gerarchie di contrazione).
+        """
+        obiettivi = []
+        if self.categorie:
+            obiettivi += self.indice.discendenti(self.radice)
+        if self.libri:
+            obiettivi += self.indice.libri_sotto(self.radice)
+        return obiettivi
@@ -1,27 +1,163 @@
-def costruisci_grafo(ontologia):
+# Versione delle regole di costruzione del grafo.
+# Va incrementata ogni volta che cambia il modo in cui gli archi
+# vengono generati: serve a invalidare le cache già salvate su disco.
+VERSIONE_COSTRUTTORE = 1
+
+# Costo base di ogni relazione e costi particolari per proprietà.
+# La relazione "sottoCategoriaDi" viene resa leggermente
+# più leggera per favorire percorsi tra categorie.
+COSTO_BASE = 1.0
+COSTI_PROPRIETA = {
+    "sottoCategoriaDi": 0.5,
+}
+
+
+# Tipi dei nodi, salvati come piccoli interi così da poterli tenere
+# in un array compatto e confrontarli senza manipolare stringhe.
+TIPO_ALTRO = 0
+TIPO_PERSONA = 1
+TIPO_LIBRO = 2
+TIPO_PRESTITO = 3
+TIPO_CATEGORIA = 4
+
+# Classe OWL corrispondente a ogni tipo
+CLASSI_TIPO = {
+    "Persona": TIPO_PERSONA,
+    "Libro": TIPO_LIBRO,
+    "Prestito": TIPO_PRESTITO,
+    "Categoria": TIPO_CATEGORIA,
+}
+
+# Gruppo del menu per ogni tipo
+GRUPPI_TIPO = {
+    TIPO_PERSONA: "Persone",
+    TIPO_LIBRO: "Libri",
+    TIPO_CATEGORIA: "Categorie",
+    TIPO_PRESTITO: "Prestiti",
+    TIPO_ALTRO: "Altro",
+}
+
+
+def costo_proprieta(nome_prop):
     """
-    Costruisce un grafo a partire dall'ontologia.
-    Ogni individuo diventa un nodo e ogni object property genera un arco tra due nodi.
+    Restituisce il costo dell'arco generato da una object property.
     """
+    return COSTI_PROPRIETA.get(nome_prop, COSTO_BASE)
 
-    grafo = {}
 
-    # Recupero tutte le object property definite nell'ontologia.
-    # Saranno le relazioni che collegano i nodi del grafo.
-    proprieta = list(ontologia.object_properties())
+def aggiungi_arco(grafo, sorgente, destinazione, costo):
+    """
+    Aggiunge un arco orientato al grafo.
+    Se l'arco esiste già, mantiene il costo più basso.
+    """
+    if sorgente not in grafo:
+        grafo[sorgente] = {}
+    if destinazione not in grafo:
+        grafo[destinazione] = {}
+
+    costo_vecchio = grafo[sorgente].get(destinazione)
 
-    # Funzione interna per aggiungere un arco al grafo.
-    # Se l'arco esiste già, mantiene il costo più basso.
-    def aggiungi_arco(sorgente, destinazione, costo):
-        if sorgente not in grafo:
-            grafo[sorgente] = {}
-        if destinazione not in grafo:
-            grafo[destinazione] = {}
+    if costo_vecchio is None or costo < costo_vecchio:
+        grafo[sorgente][destinazione] = float(costo)
 
-        costo_vecchio = grafo[sorgente].get(destinazione)
 
-        if costo_vecchio is None or costo < costo_vecchio:
-            grafo[sorgente][destinazione] = float(costo)
+def aggiungi_relazione(grafo, nome_sorgente, nome_prop, nome_dest):
+    """
+    Traduce un'asserzione (sorgente, proprietà, destinazione)
+    in archi del grafo, applicando le regole di costo.
+    """
+    costo = costo_proprieta(nome_prop)
+
+    # Aggiungo l'arco in entrambe le direzioni
+    # per garantire connettività nel grafo.
+    aggiungi_arco(grafo, nome_sorgente, nome_dest, costo)
+    aggiungi_arco(grafo, nome_dest, nome_sorgente, costo)
+
+
+def tipo_da_prefisso(nome):
+    """
+    Tipo di un nodo dedotto dalla convenzione sui prefissi dei nomi
+    (cat_, Libro, Prestito; tutto il resto è una persona).
+    Serve solo quando non si conoscono le classi OWL degli individui.
+    """
+    basso = nome.lower()
+
+    if basso.startswith("cat_"):
+        return TIPO_CATEGORIA
+    if basso.startswith("prestito"):
+        return TIPO_PRESTITO
+    if basso.startswith("libro"):
+        return TIPO_LIBRO
+    return TIPO_PERSONA
+
+
+def tipo_da_classi(nomi_classi):
+    """
+    Tipo di un individuo a partire dai nomi delle sue classi OWL
+    (comprese le superclassi). TIPO_ALTRO se nessuna è riconosciuta.
+    """
+    for nome_classe in nomi_classi:
+        tipo = CLASSI_TIPO.get(nome_classe)
+        if tipo is not None:
+            return tipo
+    return TIPO_ALTRO
+
+
+def tipi_da_prefissi(nomi):
+    """
+    Tabella nome -> tipo costruita con tipo_da_prefisso.
+    """
+    return {nome: tipo_da_prefisso(nome) for nome in nomi}
+
+
+def tipi_ontologia(ontologia):
+    """
+    Tabella nome -> tipo per tutti gli individui dell'ontologia,
+    calcolata dall'appartenenza alle classi OWL e non dai nomi.
+    """
+    tipi = {}
+
+    for individuo in ontologia.individuals():
+        nomi_classi = []
+        for classe in individuo.is_a:
+            try:
+                nomi_classi.extend(c.name for c in classe.ancestors())
+            except AttributeError:
+                # Restrizioni e altre espressioni non hanno antenati
+                continue
+        tipi[individuo.name] = tipo_da_classi(nomi_classi)
+
+    return tipi
+
+
+def raggruppa_nodi_per_tipo(nomi, tipi=None):
+    """
+    Divide i nomi degli individui in gruppi leggibili.
+
+    Se viene passata la tabella dei tipi la uso, altrimenti
+    ricado sulla convenzione sui prefissi dei nomi.
+    """
+    gruppi = {nome_gruppo: [] for nome_gruppo in GRUPPI_TIPO.values()}
+
+    for nome in nomi:
+        tipo = tipi.get(nome, TIPO_ALTRO) if tipi is not None else tipo_da_prefisso(nome)
+        gruppi[GRUPPI_TIPO[tipo]].append(nome)
+
+    for elenco in gruppi.values():
+        elenco.sort()
+
+    return gruppi
+
+
+def asserzioni_ontologia(ontologia):
+    """
+    Scorre le asserzioni di object property dell'ontologia
+    e le restituisce come terne (sorgente, proprietà, destinazione).
+    """
+
+    # Recupero tutte le object property definite nell'ontologia.
+    # Saranno le relazioni che collegano i nodi del grafo.
+    proprieta = list(ontologia.object_properties())
 
     # Per ogni individuo dell'ontologia cerco le relazioni
     # che lo collegano ad altri individui.
@@ -45,19 +181,18 @@ def costruisci_grafo(ontologia):
                 if valore is None:
                     continue
 
-                nome_dest = valore.name
+                yield nome_sorgente, nome_prop, valore.name
+
 
-                # Costo base per ogni relazione.
-                costo = 1.0
+def costruisci_grafo(ontologia):
+    """
+    Costruisce un grafo a partire dall'ontologia.
+    Ogni individuo diventa un nodo e ogni object property genera un arco tra due nodi.
+    """
 
-                # La relazione "sottoCategoriaDi" viene resa leggermente
-                # più leggera per favorire percorsi tra categorie.
-                if nome_prop == "sottoCategoriaDi":
-                    costo = 0.5
+    grafo = {}
 
-                # Aggiungo l'arco in entrambe le direzioni
-                # per garantire connettività nel grafo.
-                aggiungi_arco(nome_sorgente, nome_dest, costo)
-                aggiungi_arco(nome_dest, nome_sorgente, costo)
+    for nome_sorgente, nome_prop, nome_dest in asserzioni_ontologia(ontologia):
+        aggiungi_relazione(grafo, nome_sorgente, nome_prop, nome_dest)
 
     return grafo
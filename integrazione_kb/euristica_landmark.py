@@ -0,0 +1,424 @@
+import heapq
+from array import array
+
+from integrazione_kb.grafo_compatto import compila_grafo
+
+
+INFINITO = float("inf")
+
+
+def _dijkstra_compatto(grafo_compatto, sorgente):
+    """
+    Calcola le distanze minime (con i costi degli archi)
+    da un nodo sorgente verso tutti gli altri nodi.
+
+    Restituisce un array di float indicizzato per id:
+    i nodi non raggiungibili restano a infinito.
+    """
+    offset = grafo_compatto.offset
+    destinazioni = grafo_compatto.destinazioni
+    costi = grafo_compatto.costi
+
+    dist = array("d", [INFINITO]) * grafo_compatto.numero_nodi()
+    dist[sorgente] = 0.0
+
+    coda = [(0.0, sorgente)]
+
+    while coda:
+        d, corrente = heapq.heappop(coda)
+        if d > dist[corrente]:
+            continue
+
+        for k in range(offset[corrente], offset[corrente + 1]):
+            vicino = destinazioni[k]
+            nuova = d + costi[k]
+            if nuova < dist[vicino]:
+                dist[vicino] = nuova
+                heapq.heappush(coda, (nuova, vicino))
+
+    return dist
+
+
+def _abbassa_distanze(grafo_compatto, dist, semi):
+    """
+    Aggiorna sul posto le distanze dist dopo che alcuni archi sono
+    stati aggiunti o resi più economici (nessuna distanza può crescere).
+
+    semi contiene le coppie (id, nuova distanza candidata) date dagli
+    archi cambiati: da lì il Dijkstra prosegue solo finché trova
+    distanze più basse, quindi visita solo i nodi che migliorano.
+    """
+    offset = grafo_compatto.offset
+    destinazioni = grafo_compatto.destinazioni
+    costi = grafo_compatto.costi
+
+    coda = []
+    for nodo, d in semi:
+        if d < dist[nodo]:
+            dist[nodo] = d
+            coda.append((d, nodo))
+    heapq.heapify(coda)
+
+    while coda:
+        d, corrente = heapq.heappop(coda)
+        if d > dist[corrente]:
+            continue
+
+        for k in range(offset[corrente], offset[corrente + 1]):
+            vicino = destinazioni[k]
+            nuova = d + costi[k]
+            if nuova < dist[vicino]:
+                dist[vicino] = nuova
+                heapq.heappush(coda, (nuova, vicino))
+
+
+def _alza_distanze(grafo_compatto, dist, radici):
+    """
+    Aggiorna sul posto le distanze dist di un grafo simmetrico dopo che
+    alcuni archi sono stati rimossi o resi più costosi (nessuna distanza
+    può diminuire).
+
+    radici sono i nodi che ricevevano la loro distanza da uno di quegli
+    archi. In ordine di distanza cerco i nodi che non hanno più un vicino
+    valido da cui ottenere lo stesso valore: solo questi (e quelli appesi
+    a loro) cambiano. Li riparto dai vicini rimasti validi con
+    _abbassa_distanze. Presuppone costi positivi.
+    """
+    offset = grafo_compatto.offset
+    destinazioni = grafo_compatto.destinazioni
+    costi = grafo_compatto.costi
+
+    colpiti = set()
+    visti = set(radici)
+    coda = [(dist[nodo], nodo) for nodo in visti]
+    heapq.heapify(coda)
+
+    while coda:
+        d, corrente = heapq.heappop(coda)
+
+        # Con costi positivi i vicini più vicini alla sorgente sono già decisi
+        sostenuto = False
+        for k in range(offset[corrente], offset[corrente + 1]):
+            vicino = destinazioni[k]
+            if vicino not in colpiti and dist[vicino] + costi[k] == d:
+                sostenuto = True
+                break
+        if sostenuto:
+            continue
+
+        colpiti.add(corrente)
+        for k in range(offset[corrente], offset[corrente + 1]):
+            vicino = destinazioni[k]
+            if vicino not in visti and d + costi[k] == dist[vicino]:
+                visti.add(vicino)
+                heapq.heappush(coda, (dist[vicino], vicino))
+
+    for nodo in colpiti:
+        dist[nodo] = INFINITO
+
+    semi = []
+    for nodo in colpiti:
+        for k in range(offset[nodo], offset[nodo + 1]):
+            vicino = destinazioni[k]
+            if vicino not in colpiti and dist[vicino] != INFINITO:
+                semi.append((nodo, dist[vicino] + costi[k]))
+
+    _abbassa_distanze(grafo_compatto, dist, semi)
+
+
+def _grafo_inverso(grafo):
+    """
+    Restituisce il grafo con tutti gli archi invertiti.
+    """
+    inverso = {nodo: {} for nodo in grafo.keys()}
+    for sorgente, vicini in grafo.items():
+        for destinazione, costo in vicini.items():
+            inverso.setdefault(destinazione, {})[sorgente] = costo
+    return inverso
+
+
+def scegli_landmark(grafo_compatto, k, nodo_partenza=0):
+    """
+    Sceglie k landmark con la strategia farthest-point:
+    ogni nuovo landmark è il nodo più lontano da quelli già scelti.
+
+    Un nodo non raggiungibile da nessun landmark conta come
+    "infinitamente lontano", quindi ogni componente connessa
+    riceve almeno un landmark (finché k lo permette).
+
+    Restituisce la lista degli id scelti e le loro distanze.
+    """
+    n = grafo_compatto.numero_nodi()
+    if n == 0 or k <= 0:
+        return [], []
+
+    # Il primo landmark è il nodo più lontano dal nodo di partenza
+    dist_partenza = _dijkstra_compatto(grafo_compatto, nodo_partenza)
+    primo = max(
+        range(n),
+        key=lambda i: dist_partenza[i] if dist_partenza[i] != INFINITO else -1.0
+    )
+
+    landmark = [primo]
+    distanze = [_dijkstra_compatto(grafo_compatto, primo)]
+    minime = array("d", distanze[0])
+
+    while len(landmark) < min(k, n):
+        candidato = max(range(n), key=lambda i: minime[i])
+
+        # Tutti i nodi coincidono già con un landmark
+        if minime[candidato] == 0.0:
+            break
+
+        dist = _dijkstra_compatto(grafo_compatto, candidato)
+        landmark.append(candidato)
+        distanze.append(dist)
+
+        for i in range(n):
+            if dist[i] < minime[i]:
+                minime[i] = dist[i]
+
+    return landmark, distanze
+
+
+class EuristicaLandmark:
+    """
+    Euristica ALT (A*, Landmark, disuguaglianza Triangolare).
+
+    Per ogni landmark L conosco le distanze esatte d(L, v) e d(v, L).
+    Per la disuguaglianza triangolare vale:
+      d(v, t) >= d(L, t) - d(L, v)
+      d(v, t) >= d(v, L) - d(t, L)
+    quindi il massimo di questi limiti sui landmark è una stima
+    ammissibile per qualsiasi coppia partenza/obiettivo,
+    anche quando l'obiettivo non è una categoria.
+
+    Il grafo di costruisci_grafo è simmetrico, perciò le distanze
+    "da" e "verso" un landmark coincidono e vengono salvate una volta sola.
+    """
+
+    def __init__(self, grafo, k=8, simmetrico=True):
+        self.k = k
+        self.simmetrico = simmetrico
+        self._prepara(grafo)
+
+    def _prepara(self, grafo):
+        k = self.k
+        simmetrico = self.simmetrico
+
+        self.grafo = grafo
+        self.grafo_compatto = compila_grafo(grafo)
+
+        self.landmark, self.distanze_da = scegli_landmark(self.grafo_compatto, k)
+
+        if simmetrico:
+            self._inverso = None
+            self.distanze_verso = self.distanze_da
+        else:
+            self._inverso = compila_grafo(_grafo_inverso(grafo))
+            self.distanze_verso = [self._distanze_verso(l) for l in self.landmark]
+
+    def _distanze_verso(self, landmark):
+        """
+        Distanze d(v, L) verso il landmark, calcolate sul grafo inverso.
+        """
+        inverso = self._inverso
+        dist_inv = _dijkstra_compatto(inverso, inverso.indice(self.grafo_compatto.nome(landmark)))
+
+        # Nel grafo inverso gli id possono cambiare: riallineo per nome
+        allineate = array("d", [INFINITO]) * self.grafo_compatto.numero_nodi()
+        for i, nome in enumerate(self.grafo_compatto.nomi):
+            j = inverso.indice(nome)
+            if j is not None:
+                allineate[i] = dist_inv[j]
+        return allineate
+
+    def _archi_stretti(self, i, archi):
+        """
+        Archi (a, b, costo a -> b, costo b -> a, con i costi di prima
+        della modifica) che l'albero dei cammini minimi del landmark i
+        può usare. Restituisce (verso_landmark, x, y) per ogni arco x -> y
+        "stretto", cioè con d(L, x) + costo = d(L, y) (la stessa somma
+        fatta da Dijkstra) o, per le distanze verso L, d(x, L) = costo + d(y, L).
+
+        Un arco stretto fuori dall'albero fa solo controllare qualche nodo in più.
+        """
+        da = self.distanze_da[i]
+        verso = None if self.simmetrico else self.distanze_verso[i]
+
+        stretti = []
+        for a, b, costo_ab, costo_ba in archi:
+            for x, y, costo in ((a, b, costo_ab), (b, a, costo_ba)):
+                if costo is None:
+                    continue
+                if da[x] != INFINITO and da[x] + costo == da[y]:
+                    stretti.append((False, x, y))
+                if verso is not None and verso[y] != INFINITO and verso[y] + costo == verso[x]:
+                    stretti.append((True, x, y))
+        return stretti
+
+    def aggiorna(self, modifiche):
+        """
+        Osservatore per AggiornatoreGrafo.
+
+        I landmark restano quelli scelti all'inizio e il grafo compatto
+        viene aggiornato sul posto. Poi, con lo stesso criterio di
+        CacheCampiDistanza.aggiorna:
+        - se gli archi sono solo stati rimossi o resi più costosi, tocco
+          solo i landmark il cui albero dei cammini minimi poteva usarli;
+          con il grafo simmetrico ricalcolo solo i nodi appesi a quegli
+          archi (_alza_distanze), altrimenti rifaccio Dijkstra
+        - se sono solo stati aggiunti o resi più economici, con il grafo
+          simmetrico propago le diminuzioni dagli archi cambiati
+          (_abbassa_distanze), altrimenti rifaccio Dijkstra
+        - con modifiche di entrambi i tipi rifaccio Dijkstra da tutti i landmark
+
+        Le funzioni h già restituite da funzione_per vanno richieste di nuovo.
+        """
+        compatto = self.grafo_compatto
+        tutti = range(len(self.landmark))
+
+        peggioramenti = modifiche.solo_peggioramenti()
+        miglioramenti = not modifiche.archi_rimossi and all(
+            nuovo <= vecchio for vecchio, nuovo in modifiche.archi_modificati.values()
+        )
+
+        stretti = {}
+        if peggioramenti:
+            # I costi vecchi vanno letti prima di aggiornare il grafo compatto
+            archi = []
+            for a, b in list(modifiche.archi_rimossi) + list(modifiche.archi_modificati):
+                ia = compatto.indice(a)
+                ib = compatto.indice(b)
+                archi.append((ia, ib, compatto.costo_arco(ia, ib), compatto.costo_arco(ib, ia)))
+            for i in tutti:
+                archi_stretti = self._archi_stretti(i, archi)
+                if archi_stretti:
+                    stretti[i] = archi_stretti
+
+        compatto.applica_modifiche(modifiche)
+        if self._inverso is not None:
+            self._inverso.applica_modifiche(modifiche)
+
+        # Le distanze già calcolate vanno allungate per gli id nuovi
+        n = compatto.numero_nodi()
+        tabelle = self.distanze_da if self.simmetrico else self.distanze_da + self.distanze_verso
+        for distanze in tabelle:
+            if len(distanze) < n:
+                distanze.extend(array("d", [INFINITO]) * (n - len(distanze)))
+
+        if self.simmetrico and peggioramenti:
+            for i, archi_stretti in stretti.items():
+                _alza_distanze(compatto, self.distanze_da[i], [y for _, _, y in archi_stretti])
+            return
+
+        if self.simmetrico and miglioramenti:
+            archi = [
+                (compatto.indice(a), compatto.indice(b), float(costo))
+                for (a, b), costo in modifiche.archi_aggiunti.items()
+            ] + [
+                (compatto.indice(a), compatto.indice(b), float(nuovo))
+                for (a, b), (_, nuovo) in modifiche.archi_modificati.items()
+            ]
+            for dist in self.distanze_da:
+                semi = []
+                for a, b, costo in archi:
+                    semi.append((b, dist[a] + costo))
+                    semi.append((a, dist[b] + costo))
+                _abbassa_distanze(compatto, dist, semi)
+            return
+
+        for i in (stretti if peggioramenti else tutti):
+            self.distanze_da[i] = _dijkstra_compatto(compatto, self.landmark[i])
+            if not self.simmetrico:
+                self.distanze_verso[i] = self._distanze_verso(self.landmark[i])
+
+    def nomi_landmark(self):
+        return [self.grafo_compatto.nome(l) for l in self.landmark]
+
+    def stima_id(self, id_stato, id_obiettivo):
+        """
+        Limite inferiore della distanza tra due nodi, dati i loro id.
+        """
+        if id_stato == id_obiettivo:
+            return 0.0
+
+        migliore = 0.0
+
+        for da, verso in zip(self.distanze_da, self.distanze_verso):
+            d_lt = da[id_obiettivo]
+            d_lv = da[id_stato]
+            if d_lt != INFINITO and d_lv != INFINITO:
+                if d_lt - d_lv > migliore:
+                    migliore = d_lt - d_lv
+
+            d_vl = verso[id_stato]
+            d_tl = verso[id_obiettivo]
+            if d_vl != INFINITO and d_tl != INFINITO:
+                if d_vl - d_tl > migliore:
+                    migliore = d_vl - d_tl
+
+        return migliore
+
+    def stima(self, stato_corrente, obiettivo):
+        """
+        Stessa firma delle altre euristiche a nomi.
+        Per nodi sconosciuti al grafo non posso dire nulla e restituisco 0.
+        """
+        if stato_corrente == obiettivo:
+            return 0.0
+
+        id_stato = self.grafo_compatto.indice(stato_corrente)
+        id_obiettivo = self.grafo_compatto.indice(obiettivo)
+
+        if id_stato is None or id_obiettivo is None:
+            return 0.0
+
+        return self.stima_id(id_stato, id_obiettivo)
+
+    def funzione_per_id(self, id_obiettivo):
+        """
+        Restituisce h(id) per a_stella_compatto.
+
+        Le distanze dell'obiettivo dai landmark vengono lette una volta
+        sola, così ogni chiamata fa solo le sottrazioni necessarie.
+        """
+        righe = []
+        for da, verso in zip(self.distanze_da, self.distanze_verso):
+            d_lt = da[id_obiettivo]
+            d_tl = verso[id_obiettivo]
+            righe.append((da, verso, d_lt, d_tl))
+
+        def h(id_stato):
+            migliore = 0.0
+            for da, verso, d_lt, d_tl in righe:
+                d_lv = da[id_stato]
+                if d_lt != INFINITO and d_lv != INFINITO and d_lt - d_lv > migliore:
+                    migliore = d_lt - d_lv
+                d_vl = verso[id_stato]
+                if d_vl != INFINITO and d_tl != INFINITO and d_vl - d_tl > migliore:
+                    migliore = d_vl - d_tl
+            return migliore
+
+        return h
+
+    def funzione_per(self, obiettivo):
+        """
+        Restituisce la funzione h(stato) da passare ad a_stella.
+        """
+        id_obiettivo = self.grafo_compatto.indice(obiettivo)
+        if id_obiettivo is None:
+            return lambda stato: 0.0
+
+        h_id = self.funzione_per_id(id_obiettivo)
+        indici = self.grafo_compatto.indici
+
+        def h(stato):
+            if stato == obiettivo:
+                return 0.0
+            id_stato = indici.get(stato)
+            if id_stato is None:
+                return 0.0
+            return h_id(id_stato)
+
+        return h
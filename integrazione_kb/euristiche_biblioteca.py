@@ -1,5 +1,15 @@
 from collections import deque
 
+from integrazione_kb.costruisci_grafo import (
+    TIPO_ALTRO,
+    TIPO_CATEGORIA,
+    TIPO_LIBRO,
+    TIPO_PERSONA,
+    TIPO_PRESTITO,
+    tipi_da_prefissi,
+    tipo_da_prefisso,
+)
+
 
 def _bfs_distanze(grafo, sorgenti, max_passi=25, filtro_nodo=None):
     """
@@ -62,7 +72,34 @@ def _e_persona(nome):
     )
 
 
-def euristica_informata_tassonomia(grafo, stato_corrente, obiettivo):
+def _tipo_nodo(tipi, nome):
+    """
+    Tipo del nodo letto dalla tabella dei tipi.
+    Per i nodi che non compaiono nella tabella ricado sui prefissi.
+    """
+    tipo = tipi.get(nome)
+    if tipo is None:
+        return tipo_da_prefisso(nome) if isinstance(nome, str) else TIPO_ALTRO
+    return tipo
+
+
+def _predicati_tipo(tipi):
+    """
+    Restituisce le funzioni (e_categoria, e_libro, e_prestito, e_persona):
+    basate sulla tabella dei tipi se c'è, altrimenti sui prefissi dei nomi.
+    """
+    if tipi is None:
+        return _e_categoria, _e_libro, _e_prestito, _e_persona
+
+    return (
+        lambda n: _tipo_nodo(tipi, n) == TIPO_CATEGORIA,
+        lambda n: _tipo_nodo(tipi, n) == TIPO_LIBRO,
+        lambda n: _tipo_nodo(tipi, n) == TIPO_PRESTITO,
+        lambda n: _tipo_nodo(tipi, n) == TIPO_PERSONA,
+    )
+
+
+def euristica_informata_tassonomia(grafo, stato_corrente, obiettivo, tipi=None):
     """
     Euristica pensata per quando l'obiettivo è una categoria
 
@@ -74,25 +111,30 @@ def euristica_informata_tassonomia(grafo, stato_corrente, obiettivo):
 
     Se non è possibile stimare in modo sensato, viene restituito
     un valore costante di fallback.
+
+    Se viene passata la tabella dei tipi (nome -> TIPO_*) il tipo dei
+    nodi viene letto da lì, altrimenti dai prefissi dei nomi.
     """
 
+    e_categoria, e_libro, e_prestito, e_persona = _predicati_tipo(tipi)
+
     # Se siamo già al goal, la distanza stimata è zero.
     if stato_corrente == obiettivo:
         return 0.0
 
     # Se l'obiettivo non è una categoria,
     # questa euristica non è adatta: uso stima semplice.
-    if not _e_categoria(obiettivo):
+    if not e_categoria(obiettivo):
         return 1.0
 
     # Caso 1: siamo già su una categoria.
     # Cerco la distanza nella tassonomia.
-    if _e_categoria(stato_corrente):
+    if e_categoria(stato_corrente):
         dist = _bfs_distanze(
             grafo,
             [stato_corrente],
             max_passi=30,
-            filtro_nodo=_e_categoria
+            filtro_nodo=e_categoria
         )
 
         if obiettivo in dist:
@@ -102,15 +144,15 @@ def euristica_informata_tassonomia(grafo, stato_corrente, obiettivo):
 
     # Caso 2: siamo su un libro.
     # Provo a raggiungere una categoria e poi salire nella tassonomia.
-    if _e_libro(stato_corrente):
+    if e_libro(stato_corrente):
         dist_libro = _bfs_distanze(
             grafo,
             [stato_corrente],
             max_passi=3,
-            filtro_nodo=lambda x: _e_categoria(x) or _e_libro(x)
+            filtro_nodo=lambda x: e_categoria(x) or e_libro(x)
         )
 
-        categorie = [n for n in dist_libro.keys() if _e_categoria(n)]
+        categorie = [n for n in dist_libro.keys() if e_categoria(n)]
         if not categorie:
             return 2.0
 
@@ -120,7 +162,7 @@ def euristica_informata_tassonomia(grafo, stato_corrente, obiettivo):
                 grafo,
                 [c],
                 max_passi=30,
-                filtro_nodo=_e_categoria
+                filtro_nodo=e_categoria
             )
 
             if obiettivo in dist_cat:
@@ -132,19 +174,19 @@ def euristica_informata_tassonomia(grafo, stato_corrente, obiettivo):
 
     # Caso 3: siamo su un prestito.
     # Passo prima al libro, poi applico la stessa logica.
-    if _e_prestito(stato_corrente):
+    if e_prestito(stato_corrente):
         dist_prestito = _bfs_distanze(
             grafo,
             [stato_corrente],
             max_passi=4,
-            filtro_nodo=lambda x: _e_libro(x) or _e_categoria(x) or _e_prestito(x)
+            filtro_nodo=lambda x: e_libro(x) or e_categoria(x) or e_prestito(x)
         )
 
-        libri = [n for n in dist_prestito.keys() if _e_libro(n)]
+        libri = [n for n in dist_prestito.keys() if e_libro(n)]
 
         best = None
         for libro in libri:
-            h_libro = euristica_informata_tassonomia(grafo, libro, obiettivo)
+            h_libro = euristica_informata_tassonomia(grafo, libro, obiettivo, tipi)
             valore = dist_prestito[libro] + h_libro
 
             if best is None or valore < best:
@@ -154,19 +196,19 @@ def euristica_informata_tassonomia(grafo, stato_corrente, obiettivo):
 
     # Caso 4: siamo su una persona.
     # Passo ai prestiti, poi ai libri e infine alle categorie.
-    if _e_persona(stato_corrente):
+    if e_persona(stato_corrente):
         dist_persona = _bfs_distanze(
             grafo,
             [stato_corrente],
             max_passi=3,
-            filtro_nodo=lambda x: _e_prestito(x) or _e_persona(x)
+            filtro_nodo=lambda x: e_prestito(x) or e_persona(x)
         )
 
-        prestiti = [n for n in dist_persona.keys() if _e_prestito(n)]
+        prestiti = [n for n in dist_persona.keys() if e_prestito(n)]
 
         best = None
         for p in prestiti:
-            h_p = euristica_informata_tassonomia(grafo, p, obiettivo)
+            h_p = euristica_informata_tassonomia(grafo, p, obiettivo, tipi)
             valore = dist_persona[p] + h_p
 
             if best is None or valore < best:
@@ -176,3 +218,248 @@ def euristica_informata_tassonomia(grafo, stato_corrente, obiettivo):
 
     # Fallback finale se il nodo non rientra nei casi previsti.
     return 1.0
+
+
+class EuristicaTassonomia:
+    """
+    Versione precalcolata di euristica_informata_tassonomia.
+
+    Viene costruita una sola volta per grafo e restituisce esattamente
+    gli stessi valori della funzione, ma senza lanciare BFS a ogni chiamata:
+    - per ogni libro salvo le categorie raggiungibili e la loro distanza
+    - per ogni prestito salvo i libri raggiungibili e la loro distanza
+    - per ogni persona salvo i prestiti raggiungibili e la loro distanza
+    - le distanze tra categorie nella tassonomia vengono calcolate
+      una volta per ogni categoria obiettivo e poi riusate
+
+    Dopo la prima stima verso un obiettivo, ogni chiamata successiva
+    è una semplice lettura da tabella.
+
+    Il tipo dei nodi viene letto dalla tabella tipi (nome -> TIPO_*),
+    calcolata una volta alla costruzione del grafo. Senza tabella
+    la ricavo dai prefissi dei nomi, come fa la funzione.
+
+    Presuppone un grafo simmetrico, come quello di costruisci_grafo.
+    """
+
+    def __init__(self, grafo, tipi=None):
+        self.grafo = grafo
+
+        if tipi is None:
+            tipi = tipi_da_prefissi(grafo.keys())
+        self.tipi = tipi
+
+        # Offset verso il "livello successivo" della catena
+        # Persona -> Prestito -> Libro -> Categoria
+        self.categorie_libro = {}
+        self.libri_prestito = {}
+        self.prestiti_persona = {}
+
+        # Distanze nella tassonomia, una tabella per categoria obiettivo
+        self.distanze_categorie = {}
+
+        # Valori già calcolati, una tabella per obiettivo
+        self.valori = {}
+
+        for nodo in grafo.keys():
+            self._calcola_offset(nodo)
+
+    def _tipo(self, nome):
+        return _tipo_nodo(self.tipi, nome)
+
+    def _calcola_offset(self, nodo):
+        """
+        Calcola (o ricalcola) le tabelle del singolo nodo.
+        """
+        grafo = self.grafo
+        tipo = self._tipo
+
+        self.categorie_libro.pop(nodo, None)
+        self.libri_prestito.pop(nodo, None)
+        self.prestiti_persona.pop(nodo, None)
+
+        if nodo not in grafo:
+            return
+
+        tipo_nodo = tipo(nodo)
+
+        if tipo_nodo == TIPO_LIBRO:
+            dist = _bfs_distanze(
+                grafo,
+                [nodo],
+                max_passi=3,
+                filtro_nodo=lambda x: tipo(x) in (TIPO_CATEGORIA, TIPO_LIBRO)
+            )
+            self.categorie_libro[nodo] = [
+                (n, d) for n, d in dist.items() if tipo(n) == TIPO_CATEGORIA
+            ]
+
+        elif tipo_nodo == TIPO_PRESTITO:
+            dist = _bfs_distanze(
+                grafo,
+                [nodo],
+                max_passi=4,
+                filtro_nodo=lambda x: tipo(x) in (TIPO_LIBRO, TIPO_CATEGORIA, TIPO_PRESTITO)
+            )
+            self.libri_prestito[nodo] = [
+                (n, d) for n, d in dist.items() if tipo(n) == TIPO_LIBRO
+            ]
+
+        elif tipo_nodo == TIPO_PERSONA:
+            dist = _bfs_distanze(
+                grafo,
+                [nodo],
+                max_passi=3,
+                filtro_nodo=lambda x: tipo(x) in (TIPO_PRESTITO, TIPO_PERSONA)
+            )
+            self.prestiti_persona[nodo] = [
+                (n, d) for n, d in dist.items() if tipo(n) == TIPO_PRESTITO
+            ]
+
+    def aggiorna(self, modifiche):
+        """
+        Osservatore per AggiornatoreGrafo.
+
+        Le tabelle di un nodo dipendono solo dai nodi entro 4 archi,
+        quindi ricalcolo soltanto i nodi vicini a quelli toccati.
+        Le distanze nella tassonomia vengono scartate solo se è
+        cambiato un arco tra due categorie.
+        """
+        toccati = modifiche.nodi_toccati()
+
+        vicini = _bfs_distanze(self.grafo, [n for n in toccati if n in self.grafo], max_passi=4)
+        for nodo in set(vicini) | toccati:
+            self._calcola_offset(nodo)
+
+        archi = (
+            list(modifiche.archi_aggiunti)
+            + list(modifiche.archi_rimossi)
+            + list(modifiche.archi_modificati)
+        )
+        tipo = self._tipo
+        if any(tipo(a) == TIPO_CATEGORIA and tipo(b) == TIPO_CATEGORIA for a, b in archi):
+            self.distanze_categorie.clear()
+
+        # I valori memorizzati possono dipendere da qualsiasi tabella
+        self.valori.clear()
+
+    def _tassonomia(self, obiettivo):
+        """
+        Distanze (in archi) di ogni categoria dall'obiettivo,
+        muovendosi solo tra categorie.
+        """
+        dist = self.distanze_categorie.get(obiettivo)
+
+        if dist is None:
+            # Il grafo è simmetrico: la BFS dall'obiettivo dà le stesse
+            # distanze di una BFS da ciascuna categoria verso l'obiettivo.
+            dist = _bfs_distanze(
+                self.grafo,
+                [obiettivo],
+                max_passi=30,
+                filtro_nodo=lambda x: self._tipo(x) == TIPO_CATEGORIA
+            )
+            self.distanze_categorie[obiettivo] = dist
+
+        return dist
+
+    def precalcola(self, obiettivi=None):
+        """
+        Calcola in anticipo le tabelle della tassonomia
+        (di default per tutte le categorie del grafo).
+        """
+        if obiettivi is None:
+            obiettivi = [n for n in self.grafo.keys() if self._tipo(n) == TIPO_CATEGORIA]
+
+        for obiettivo in obiettivi:
+            self._tassonomia(obiettivo)
+
+    def _stima_libro(self, libro, dist_tassonomia, valori):
+        valore = valori.get(libro)
+        if valore is not None:
+            return valore
+
+        categorie = self.categorie_libro.get(libro)
+        if not categorie:
+            valore = 2.0
+        else:
+            best = None
+            for c, d in categorie:
+                d_cat = dist_tassonomia.get(c)
+                if d_cat is not None:
+                    v = d + d_cat
+                    if best is None or v < best:
+                        best = v
+            valore = float(best) if best is not None else 2.0
+
+        valori[libro] = valore
+        return valore
+
+    def _stima_prestito(self, prestito, dist_tassonomia, valori):
+        valore = valori.get(prestito)
+        if valore is not None:
+            return valore
+
+        best = None
+        for libro, d in self.libri_prestito.get(prestito, []):
+            v = d + self._stima_libro(libro, dist_tassonomia, valori)
+            if best is None or v < best:
+                best = v
+
+        valore = float(best) if best is not None else 3.0
+        valori[prestito] = valore
+        return valore
+
+    def stima(self, stato_corrente, obiettivo):
+        """
+        Stessa firma (a parte il grafo) e stessi valori di
+        euristica_informata_tassonomia.
+        """
+
+        if stato_corrente == obiettivo:
+            return 0.0
+
+        if self._tipo(obiettivo) != TIPO_CATEGORIA:
+            return 1.0
+
+        valori = self.valori.get(obiettivo)
+        if valori is None:
+            valori = {}
+            self.valori[obiettivo] = valori
+
+        valore = valori.get(stato_corrente)
+        if valore is not None:
+            return valore
+
+        dist_tassonomia = self._tassonomia(obiettivo)
+        tipo_stato = self._tipo(stato_corrente)
+
+        if tipo_stato == TIPO_CATEGORIA:
+            d = dist_tassonomia.get(stato_corrente)
+            valore = float(d) if d is not None else 2.0
+
+        elif tipo_stato == TIPO_LIBRO:
+            valore = self._stima_libro(stato_corrente, dist_tassonomia, valori)
+
+        elif tipo_stato == TIPO_PRESTITO:
+            valore = self._stima_prestito(stato_corrente, dist_tassonomia, valori)
+
+        elif tipo_stato == TIPO_PERSONA:
+            best = None
+            for p, d in self.prestiti_persona.get(stato_corrente, []):
+                v = d + self._stima_prestito(p, dist_tassonomia, valori)
+                if best is None or v < best:
+                    best = v
+            valore = float(best) if best is not None else 4.0
+
+        else:
+            valore = 1.0
+
+        valori[stato_corrente] = valore
+        return valore
+
+    def funzione_per(self, obiettivo):
+        """
+        Restituisce la funzione h(stato) da passare ad a_stella.
+        """
+        return lambda stato: self.stima(stato, obiettivo)
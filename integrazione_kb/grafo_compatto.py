@@ -0,0 +1,190 @@
+from array import array
+
+from integrazione_kb.costruisci_grafo import tipo_da_prefisso
+
+
+# Costo dei posti lasciati liberi dagli archi rimossi (vedi applica_modifiche)
+INFINITO = float("inf")
+
+
+class GrafoCompatto:
+    """
+    Rappresentazione compatta del grafo della biblioteca.
+
+    I nomi degli individui vengono convertiti una sola volta in
+    identificativi interi (0..n-1) e le adiacenze sono salvate in
+    formato CSR (Compressed Sparse Row):
+    - offset[i] .. offset[i + 1] delimita i vicini del nodo i
+    - destinazioni[k] è l'id del vicino k-esimo
+    - costi[k] è il costo dell'arco k-esimo
+
+    - tipi[i] è il tipo (TIPO_*) del nodo i
+
+    Rispetto al dizionario di dizionari occupa pochi byte per arco
+    e durante la ricerca lavora solo con interi.
+    """
+
+    __slots__ = ("nomi", "indici", "offset", "destinazioni", "costi", "tipi")
+
+    def __init__(self, nomi, offset, destinazioni, costi, tipi):
+        self.nomi = nomi
+        self.indici = {nome: i for i, nome in enumerate(nomi)}
+        self.offset = offset
+        self.destinazioni = destinazioni
+        self.costi = costi
+        self.tipi = tipi
+
+    def numero_nodi(self):
+        return len(self.nomi)
+
+    def numero_archi(self):
+        return len(self.destinazioni)
+
+    def indice(self, nome):
+        """
+        Restituisce l'id intero associato al nome (oppure None).
+        """
+        return self.indici.get(nome)
+
+    def nome(self, indice):
+        return self.nomi[indice]
+
+    def tipo(self, indice):
+        return self.tipi[indice]
+
+    def vicini(self, indice):
+        """
+        Restituisce le coppie (id_vicino, costo) del nodo indicato.
+        """
+        inizio = self.offset[indice]
+        fine = self.offset[indice + 1]
+        return (
+            (j, c)
+            for j, c in zip(self.destinazioni[inizio:fine], self.costi[inizio:fine])
+            if c != INFINITO
+        )
+
+    def costo_arco(self, a, b):
+        """
+        Costo dell'arco dall'id a all'id b, oppure None se non esiste.
+        """
+        destinazioni = self.destinazioni
+        for k in range(self.offset[a], self.offset[a + 1]):
+            if destinazioni[k] == b and self.costi[k] != INFINITO:
+                return self.costi[k]
+        return None
+
+    def in_dizionario(self):
+        """
+        Ricostruisce il grafo nel formato dizionario di dizionari
+        prodotto da costruisci_grafo.
+        """
+        grafo = {}
+        for i, nome in enumerate(self.nomi):
+            vicini = {self.nomi[j]: float(c) for j, c in self.vicini(i)}
+            # Come in costruisci_grafo, un nodo senza archi non fa parte del grafo
+            if vicini:
+                grafo[nome] = vicini
+        return grafo
+
+    def _imposta_arco(self, a, b, costo):
+        """
+        Porta l'arco a -> b al costo indicato (INFINITO = arco rimosso).
+
+        Un arco rimosso diventa un posto libero della riga (un cappio
+        a costo infinito, che nessuna visita percorre) e viene riusato
+        dal prossimo arco nuovo dello stesso nodo. Solo se la riga non
+        ha posti liberi la allargo, spostando la coda degli array.
+        """
+        destinazioni = self.destinazioni
+        costi = self.costi
+        inizio = self.offset[a]
+        fine = self.offset[a + 1]
+
+        libero = None
+        for k in range(inizio, fine):
+            if destinazioni[k] == b and costi[k] != INFINITO:
+                if costo == INFINITO:
+                    destinazioni[k] = a
+                costi[k] = costo
+                return
+            if libero is None and costi[k] == INFINITO:
+                libero = k
+
+        if costo == INFINITO:
+            return
+
+        if libero is not None:
+            destinazioni[libero] = b
+            costi[libero] = costo
+            return
+
+        destinazioni.insert(fine, b)
+        costi.insert(fine, costo)
+        offset = self.offset
+        for i in range(a + 1, len(offset)):
+            offset[i] += 1
+
+    def applica_modifiche(self, modifiche):
+        """
+        Applica sul posto un ModificheGrafo di AggiornatoreGrafo,
+        toccando solo le righe dei nodi coinvolti.
+
+        Gli id già assegnati non cambiano, così gli array indicizzati
+        per id restano validi: i nodi nuovi ricevono gli id successivi
+        (con una riga vuota in fondo) e i nodi rimossi restano con una
+        riga senza archi. Gli archi sono simmetrici, come nel ModificheGrafo.
+        """
+        for nome in modifiche.nodi_aggiunti:
+            if nome not in self.indici:
+                self.indici[nome] = len(self.nomi)
+                self.nomi.append(nome)
+                self.tipi.append(tipo_da_prefisso(nome))
+                self.offset.append(self.offset[-1])
+
+        # Prima le rimozioni, così gli archi nuovi trovano i posti liberi
+        indici = self.indici
+        for a, b in modifiche.archi_rimossi:
+            self._imposta_arco(indici[a], indici[b], INFINITO)
+            self._imposta_arco(indici[b], indici[a], INFINITO)
+        for (a, b), (_, costo) in modifiche.archi_modificati.items():
+            self._imposta_arco(indici[a], indici[b], float(costo))
+            self._imposta_arco(indici[b], indici[a], float(costo))
+        for (a, b), costo in modifiche.archi_aggiunti.items():
+            self._imposta_arco(indici[a], indici[b], float(costo))
+            self._imposta_arco(indici[b], indici[a], float(costo))
+
+
+def compila_grafo(grafo, tipi=None):
+    """
+    Converte il grafo prodotto da costruisci_grafo in un GrafoCompatto.
+
+    L'ordine dei nodi e dei vicini è quello del dizionario di partenza,
+    così la ricerca sul grafo compatto espande i nodi nello stesso
+    ordine della versione a stringhe.
+
+    I tipi dei nodi vengono presi dalla tabella tipi; per i nodi
+    che non vi compaiono (o senza tabella) uso i prefissi dei nomi.
+    """
+
+    nomi = list(grafo.keys())
+    indici = {nome: i for i, nome in enumerate(nomi)}
+
+    # Uso interi a 32 bit finché bastano, altrimenti passo a 64 bit.
+    tipo_id = "i" if len(nomi) < 2 ** 31 else "q"
+
+    offset = array("q", [0])
+    destinazioni = array(tipo_id)
+    costi = array("d")
+    tabella_tipi = array("b")
+
+    for nome in nomi:
+        for vicino, costo in grafo[nome].items():
+            destinazioni.append(indici[vicino])
+            costi.append(float(costo))
+        offset.append(len(destinazioni))
+
+        tipo = tipi.get(nome) if tipi is not None else None
+        tabella_tipi.append(tipo if tipo is not None else tipo_da_prefisso(nome))
+
+    return GrafoCompatto(nomi, offset, destinazioni, costi, tabella_tipi)
@@ -0,0 +1,311 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from integrazione_kb.grafo_compatto import compila_grafo
+
+
+# Formato del file (tutti i numeri nell'ordine di byte della macchina
+# che lo ha scritto, indicato nell'intestazione):
+#
+#   intestazione   MAGIA, versione, ordine byte, n nodi, m archi,
+#                  lunghezza della chiave, poi (inizio, lunghezza)
+#                  di ogni sezione
+#   chiave         byte liberi (ad esempio la chiave della cache)
+#   offset         int64[n + 1]   CSR: vicini del nodo i in offset[i]..offset[i+1]
+#   destinazioni   int32[m]
+#   costi          float64[m]
+#   tipi           int8[n]        TIPO_* di ogni nodo
+#   inizio_nomi    int64[n + 1]   nome del nodo i in nomi[inizio_nomi[i]..inizio_nomi[i+1]]
+#   ordine_nomi    int32[n]       id dei nodi in ordine di nome (ricerca binaria)
+#   nomi           utf-8
+#
+# Ogni sezione inizia a un multiplo di 8 byte, così le viste tipizzate
+# sono allineate.
+MAGIA = b"BIBGRAFO"
+VERSIONE_FILE = 1
+
+SEZIONI = ("chiave", "offset", "destinazioni", "costi", "tipi", "inizio_nomi", "ordine_nomi", "nomi")
+FORMATI = {
+    "offset": "q",
+    "destinazioni": "i",
+    "costi": "d",
+    "tipi": "b",
+    "inizio_nomi": "q",
+    "ordine_nomi": "i",
+}
+
+_INTESTAZIONE = struct.Struct("<8sIBxxxQQ" + "QQ" * len(SEZIONI))
+_ORDINI_BYTE = {"little": 0, "big": 1}
+
+
+class FormatoNonValido(ValueError):
+    """
+    Il file non è un grafo mappabile leggibile su questa macchina.
+    """
+
+
+def _allinea(posizione):
+    return (posizione + 7) & ~7
+
+
+def scrivi_grafo_mmap(percorso, grafo, tipi=None, chiave=""):
+    """
+    Salva il grafo prodotto da costruisci_grafo nel formato binario
+    letto da GrafoMappato.
+
+    L'ordine dei nodi e dei vicini è quello di compila_grafo, quindi
+    gli id coincidono con quelli di un GrafoCompatto dello stesso grafo.
+    """
+    percorso = Path(percorso)
+    compatto = compila_grafo(grafo, tipi)
+    n = compatto.numero_nodi()
+
+    nomi_utf8 = [nome.encode("utf-8") for nome in compatto.nomi]
+    inizio_nomi = array("q", [0])
+    for nome in nomi_utf8:
+        inizio_nomi.append(inizio_nomi[-1] + len(nome))
+
+    # Ordino per byte utf-8: è lo stesso confronto fatto in lettura
+    ordine_nomi = array("i", sorted(range(n), key=nomi_utf8.__getitem__))
+
+    destinazioni = compatto.destinazioni
+    if destinazioni.typecode != "i":
+        raise ValueError("grafo troppo grande per il formato mappato (id a 32 bit)")
+
+    contenuti = {
+        "chiave": chiave.encode("utf-8"),
+        "offset": compatto.offset.tobytes(),
+        "destinazioni": destinazioni.tobytes(),
+        "costi": compatto.costi.tobytes(),
+        "tipi": compatto.tipi.tobytes(),
+        "inizio_nomi": inizio_nomi.tobytes(),
+        "ordine_nomi": ordine_nomi.tobytes(),
+        "nomi": b"".join(nomi_utf8),
+    }
+
+    posizione = _allinea(_INTESTAZIONE.size)
+    estremi = []
+    for sezione in SEZIONI:
+        estremi += [posizione, len(contenuti[sezione])]
+        posizione = _allinea(posizione + len(contenuti[sezione]))
+
+    intestazione = _INTESTAZIONE.pack(
+        MAGIA, VERSIONE_FILE, _ORDINI_BYTE[sys.byteorder],
+        n, compatto.numero_archi(), *estremi,
+    )
+
+    # Scrivo su un file temporaneo e poi lo rinomino: i processi che
+    # hanno già mappato il file precedente continuano a leggere quello.
+    temporaneo = percorso.with_name(percorso.name + f".{os.getpid()}.tmp")
+    try:
+        with open(temporaneo, "wb") as f:
+            f.write(intestazione)
+            for sezione, inizio in zip(SEZIONI, estremi[::2]):
+                f.write(b"\0" * (inizio - f.tell()))
+                f.write(contenuti[sezione])
+        os.replace(temporaneo, percorso)
+    except BaseException:
+        try:
+            os.remove(temporaneo)
+        except OSError:
+            pass
+        raise
+
+
+class TabellaNomi:
+    """
+    Sequenza dei nomi dei nodi letta dal file mappato:
+    ogni nome viene decodificato solo quando serve.
+    """
+
+    __slots__ = ("_inizio", "_nomi")
+
+    def __init__(self, inizio_nomi, nomi):
+        self._inizio = inizio_nomi
+        self._nomi = nomi
+
+    def __len__(self):
+        return len(self._inizio) - 1
+
+    def __getitem__(self, indice):
+        return self.byte(indice).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def byte(self, indice):
+        return bytes(self._nomi[self._inizio[indice]:self._inizio[indice + 1]])
+
+
+class _ChiaviOrdinate:
+    """
+    Vista dei nomi in ordine alfabetico, per usare bisect senza
+    costruire la lista.
+    """
+
+    __slots__ = ("_nomi", "_ordine")
+
+    def __init__(self, nomi, ordine):
+        self._nomi = nomi
+        self._ordine = ordine
+
+    def __len__(self):
+        return len(self._ordine)
+
+    def __getitem__(self, posizione):
+        return self._nomi.byte(self._ordine[posizione])
+
+
+class GrafoMappato:
+    """
+    Grafo letto direttamente da un file scritto con scrivi_grafo_mmap.
+
+    Il file viene mappato in memoria in sola lettura e le sezioni sono
+    esposte come memoryview tipizzate, senza copie: l'apertura costa
+    qualche millisecondo qualunque sia la dimensione del grafo, e più
+    processi che aprono lo stesso file condividono le stesse pagine
+    della page cache.
+
+    Espone gli stessi attributi e metodi di GrafoCompatto (offset,
+    destinazioni, costi, tipi, nomi, indice, vicini, ...), quindi
+    funziona con a_stella_compatto. La tabella indici di GrafoCompatto
+    non c'è: indice(nome) fa una ricerca binaria sui nomi ordinati.
+    """
+
+    def __init__(self, percorso):
+        self.percorso = Path(percorso)
+
+        with open(self.percorso, "rb") as f:
+            self._mappa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._leggi_sezioni()
+        except BaseException:
+            self._mappa.close()
+            raise
+
+    def _leggi_sezioni(self):
+        if len(self._mappa) < _INTESTAZIONE.size:
+            raise FormatoNonValido(f"{self.percorso}: file troppo corto")
+
+        magia, versione, ordine, n, m, *estremi = _INTESTAZIONE.unpack_from(self._mappa)
+        if magia != MAGIA:
+            raise FormatoNonValido(f"{self.percorso}: non è un grafo mappato")
+        if versione != VERSIONE_FILE:
+            raise FormatoNonValido(f"{self.percorso}: versione {versione} non supportata")
+        if ordine != _ORDINI_BYTE[sys.byteorder]:
+            raise FormatoNonValido(f"{self.percorso}: scritto con un ordine dei byte diverso")
+
+        vista = memoryview(self._mappa)
+        self._viste = [vista]
+        sezioni = {}
+        for sezione, inizio, lunghezza in zip(SEZIONI, estremi[::2], estremi[1::2]):
+            parte = vista[inizio:inizio + lunghezza]
+            if sezione in FORMATI:
+                parte = parte.cast(FORMATI[sezione])
+            self._viste.append(parte)
+            sezioni[sezione] = parte
+
+        if len(sezioni["offset"]) != n + 1 or len(sezioni["destinazioni"]) != m:
+            raise FormatoNonValido(f"{self.percorso}: sezioni incoerenti")
+
+        self.chiave = bytes(sezioni["chiave"]).decode("utf-8")
+        self.offset = sezioni["offset"]
+        self.destinazioni = sezioni["destinazioni"]
+        self.costi = sezioni["costi"]
+        self.tipi = sezioni["tipi"]
+        self.nomi = TabellaNomi(sezioni["inizio_nomi"], sezioni["nomi"])
+        self._ordinati = _ChiaviOrdinate(self.nomi, sezioni["ordine_nomi"])
+        self._ordine_nomi = sezioni["ordine_nomi"]
+
+    def chiudi(self):
+        """
+        Rilascia la mappatura. Dopo la chiusura il grafo e le viste
+        ottenute prima non vanno più usati.
+
+        Gli array di come_numpy() e gli iteratori di vicini() non ancora
+        consumati leggono la stessa memoria: finché ne esiste uno la
+        mappatura non può essere chiusa. In quel caso la chiusura viene
+        rimandata e avviene quando l'ultimo di questi oggetti e il grafo
+        spariscono; per liberarla subito vanno eliminati prima di chiudere.
+        """
+        if self._mappa.closed or not self._viste:
+            return
+
+        viste, self._viste = self._viste, []
+        try:
+            for vista in reversed(viste):
+                vista.release()
+            self._mappa.close()
+        except BufferError:
+            # Memoria ancora esportata: ci pensa il garbage collector
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.chiudi()
+
+    def numero_nodi(self):
+        return len(self.offset) - 1
+
+    def numero_archi(self):
+        return len(self.destinazioni)
+
+    def indice(self, nome):
+        """
+        Restituisce l'id intero associato al nome (oppure None).
+        """
+        chiave = nome.encode("utf-8")
+        posizione = bisect_left(self._ordinati, chiave)
+        if posizione < len(self._ordinati) and self._ordinati[posizione] == chiave:
+            return self._ordine_nomi[posizione]
+        return None
+
+    def nome(self, indice):
+        return self.nomi[indice]
+
+    def tipo(self, indice):
+        return self.tipi[indice]
+
+    def vicini(self, indice):
+        """
+        Restituisce le coppie (id_vicino, costo) del nodo indicato.
+        """
+        inizio = self.offset[indice]
+        fine = self.offset[indice + 1]
+        return zip(self.destinazioni[inizio:fine], self.costi[inizio:fine])
+
+    def come_numpy(self):
+        """
+        Le sezioni CSR come array numpy che leggono la stessa memoria
+        (nessuna copia): offset, destinazioni, costi, tipi.
+        """
+        import numpy as np
+
+        return {
+            "offset": np.frombuffer(self.offset, dtype=np.int64),
+            "destinazioni": np.frombuffer(self.destinazioni, dtype=np.int32),
+            "costi": np.frombuffer(self.costi, dtype=np.float64),
+            "tipi": np.frombuffer(self.tipi, dtype=np.int8),
+        }
+
+    def in_dizionario(self):
+        """
+        Ricostruisce il grafo nel formato dizionario di dizionari
+        prodotto da costruisci_grafo.
+        """
+        nomi = list(self.nomi)
+        grafo = {}
+        for i, nome in enumerate(nomi):
+            grafo[nome] = {
+                nomi[j]: float(c) for j, c in self.vicini(i)
+            }
+        return grafo
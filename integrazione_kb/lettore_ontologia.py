@@ -1,21 +1,114 @@
-from owlready2 import get_ontology, sync_reasoner_pellet
+from pathlib import Path
 
+from owlready2 import Thing, get_ontology, sync_reasoner_pellet
 
-def carica_ontologia(percorso_file_owl, usa_reasoner=False):
+from integrazione_kb.cache_pickle import impronta_file, leggi_cache, scrivi_cache
+
+
+# Versione delle regole con cui vengono raccolte le inferenze:
+# se cambia, le inferenze salvate non sono più valide.
+VERSIONE_INFERENZE = 1
+
+
+def percorso_inferenze(percorso_owl):
+    """
+    Le inferenze del reasoner stanno accanto all'ontologia:
+    ontologia/biblioteca.owl -> ontologia/biblioteca.inferenze.cache
+    """
+    percorso_owl = Path(percorso_owl)
+    return percorso_owl.with_name(percorso_owl.stem + ".inferenze.cache")
+
+
+def _asserzioni(ontologia):
+    """
+    Insieme delle asserzioni di proprietà degli individui, come tuple
+    (iri individuo, iri proprietà, valore, valore_e_individuo).
+    Per le object property il valore è l'IRI dell'individuo collegato,
+    per le data property il letterale stesso.
+    """
+    asserzioni = set()
+
+    for individuo in ontologia.individuals():
+        for proprieta in individuo.get_properties():
+            for valore in proprieta[individuo]:
+                if isinstance(valore, Thing):
+                    asserzioni.add((individuo.iri, proprieta.iri, valore.iri, True))
+                else:
+                    asserzioni.add((individuo.iri, proprieta.iri, valore, False))
+
+    return asserzioni
+
+
+def _applica_inferenze(ontologia, inferenze):
+    """
+    Riaggiunge all'ontologia le asserzioni inferite salvate.
+    Restituisce False se qualche entità non esiste più
+    (in quel caso conviene rieseguire il reasoner).
+    """
+    mondo = ontologia.world
+
+    # Risolvo prima tutte le entità, così non applico inferenze a metà
+    risolte = []
+    for iri_individuo, iri_proprieta, valore, valore_e_individuo in inferenze:
+        individuo = mondo[iri_individuo]
+        proprieta = mondo[iri_proprieta]
+        if valore_e_individuo:
+            valore = mondo[valore]
+        if individuo is None or proprieta is None or valore is None:
+            return False
+        risolte.append((individuo, proprieta, valore))
+
+    with ontologia:
+        for individuo, proprieta, valore in risolte:
+            valori = proprieta[individuo]
+            if valore not in valori:
+                valori.append(valore)
+
+    return True
+
+
+def _esegui_reasoner(ontologia):
+    """
+    Esegue Pellet e restituisce le asserzioni che ha aggiunto.
+    """
+    prima = _asserzioni(ontologia)
+
+    with ontologia:
+        sync_reasoner_pellet(
+            infer_property_values=True,
+            infer_data_property_values=True
+        )
+
+    return sorted(_asserzioni(ontologia) - prima, key=repr)
+
+
+def carica_ontologia(percorso_file_owl, usa_reasoner=False, forza_reasoner=False, usa_cache=True):
     """
     Carica un file OWL e restituisce l'ontologia.
 
     Se usa_reasoner=True, viene eseguito il reasoner
     per inferire nuove relazioni e proprietà.
+
+    Il reasoner (JVM + classificazione completa) è lento, quindi le
+    asserzioni di proprietà che inferisce vengono salvate accanto
+    all'ontologia, con l'hash del file come chiave. Ai caricamenti
+    successivi di un'ontologia invariata le riapplico senza eseguire
+    Pellet; forza_reasoner=True lo esegue comunque e aggiorna il file.
     """
 
-    ontologia = get_ontology(percorso_file_owl).load()
+    ontologia = get_ontology(str(Path(percorso_file_owl).resolve())).load()
 
     if usa_reasoner:
-        with ontologia:
-            sync_reasoner_pellet(
-                infer_property_values=True,
-                infer_data_property_values=True
-            )
+        percorso = percorso_inferenze(percorso_file_owl)
+        chiave = f"{impronta_file(percorso_file_owl)}:{VERSIONE_INFERENZE}"
+
+        inferenze = None
+        if usa_cache and not forza_reasoner:
+            inferenze = leggi_cache(percorso, chiave)
+
+        if inferenze is None or not _applica_inferenze(ontologia, inferenze):
+            inferenze = _esegui_reasoner(ontologia)
+            if usa_cache:
+                scrivi_cache(percorso, chiave, inferenze)
 
     return ontologia
@@ -0,0 +1,222 @@
+from urllib.parse import urljoin
+from xml.etree.ElementTree import iterparse
+
+from integrazione_kb.costruisci_grafo import aggiungi_relazione, tipo_da_classi
+
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+OWL = "http://www.w3.org/2002/07/owl#"
+XML_BASE = "{http://www.w3.org/XML/1998/namespace}base"
+
+RDF_ABOUT = "{" + RDF + "}about"
+RDF_RESOURCE = "{" + RDF + "}resource"
+RDF_TYPE = "{" + RDF + "}type"
+RDFS_SUBCLASS = "{http://www.w3.org/2000/01/rdf-schema#}subClassOf"
+
+# Elementi che dichiarano una object property
+TIPI_OBJECT_PROPERTY = {
+    OWL + "ObjectProperty",
+    OWL + "TransitiveProperty",
+    OWL + "SymmetricProperty",
+    OWL + "AsymmetricProperty",
+    OWL + "ReflexiveProperty",
+    OWL + "IrreflexiveProperty",
+    OWL + "InverseFunctionalProperty",
+}
+
+# Elementi di primo livello che non descrivono individui
+ELEMENTI_SCHEMA = TIPI_OBJECT_PROPERTY | {
+    OWL + "Ontology",
+    OWL + "Class",
+    OWL + "DatatypeProperty",
+    OWL + "AnnotationProperty",
+    OWL + "FunctionalProperty",
+    OWL + "AllDisjointClasses",
+    OWL + "Restriction",
+}
+
+
+def _iri_tag(tag):
+    """
+    Converte il tag di ElementTree "{namespace}locale" nell'IRI completo.
+    """
+    if tag.startswith("{"):
+        namespace, locale = tag[1:].split("}", 1)
+        return namespace + locale
+    return tag
+
+
+def nome_da_iri(iri):
+    """
+    Restituisce il nome breve di un'entità, come fa owlready2:
+    la parte dopo l'ultimo '#' oppure dopo l'ultimo '/'.
+    """
+    if "#" in iri:
+        return iri.rsplit("#", 1)[1]
+    return iri.rsplit("/", 1)[-1]
+
+
+def _antenati(classe, superclassi):
+    """
+    La classe indicata e tutte le sue superclassi (nomi brevi).
+    """
+    visti = {classe}
+    da_visitare = [classe]
+    while da_visitare:
+        for padre in superclassi.get(da_visitare.pop(), ()):
+            if padre not in visti:
+                visti.add(padre)
+                da_visitare.append(padre)
+    return visti
+
+
+def asserzioni_rdf_streaming(percorso_owl, tipi=None):
+    """
+    Legge il file RDF/XML un elemento alla volta con iterparse
+    e restituisce le asserzioni di object property come terne
+    (sorgente, proprietà, destinazione), con i nomi brevi.
+
+    Ogni individuo viene scartato appena letto, quindi la memoria
+    usata non dipende dalla dimensione del file.
+
+    Se viene passato un dizionario tipi, alla fine della lettura
+    contiene il tipo (TIPO_*) di ogni individuo, ricavato dalle sue
+    classi rdf:type e dalle loro superclassi.
+    """
+
+    base = ""
+    object_property = set()
+
+    # Classi dirette di ogni individuo e gerarchia delle classi,
+    # raccolte solo se servono i tipi
+    classi_individui = {}
+    superclassi = {}
+
+    # Asserzioni con una proprietà non ancora dichiarata:
+    # nei file prodotti da owlready2/Protégé le dichiarazioni vengono
+    # prima degli individui, quindi di solito questa lista resta vuota.
+    in_sospeso = []
+
+    radice = None
+    profondita = 0
+
+    for evento, elemento in iterparse(str(percorso_owl), events=("start", "end")):
+
+        if evento == "start":
+            if profondita == 0:
+                radice = elemento
+                base = elemento.get(XML_BASE, "")
+            profondita += 1
+            continue
+
+        profondita -= 1
+
+        # Mi interessano solo gli elementi figli diretti di rdf:RDF
+        if profondita != 1:
+            continue
+
+        tipo = _iri_tag(elemento.tag)
+        about = elemento.get(RDF_ABOUT)
+
+        if tipo in TIPI_OBJECT_PROPERTY and about is not None:
+            object_property.add(urljoin(base, about))
+
+        elif tipo == OWL + "Class" and about is not None:
+            if tipi is not None:
+                superclassi[nome_da_iri(urljoin(base, about))] = [
+                    nome_da_iri(urljoin(base, figlio.get(RDF_RESOURCE)))
+                    for figlio in elemento
+                    if figlio.tag == RDFS_SUBCLASS and figlio.get(RDF_RESOURCE) is not None
+                ]
+
+        elif tipo not in ELEMENTI_SCHEMA and about is not None:
+            nome_sorgente = nome_da_iri(urljoin(base, about))
+
+            if tipi is not None:
+                classi = classi_individui.setdefault(nome_sorgente, [])
+                # Nodo tipizzato, ad esempio <Libro rdf:about="...">
+                if tipo not in (OWL + "NamedIndividual", RDF + "Description"):
+                    classi.append(nome_da_iri(tipo))
+
+            for figlio in elemento:
+                risorsa = figlio.get(RDF_RESOURCE)
+                if risorsa is None:
+                    continue
+                if figlio.tag == RDF_TYPE:
+                    if tipi is not None:
+                        classi.append(nome_da_iri(urljoin(base, risorsa)))
+                    continue
+
+                iri_prop = _iri_tag(figlio.tag)
+                nome_dest = nome_da_iri(urljoin(base, risorsa))
+
+                if iri_prop in object_property:
+                    yield nome_sorgente, nome_da_iri(iri_prop), nome_dest
+                else:
+                    in_sospeso.append((nome_sorgente, iri_prop, nome_dest))
+
+        # Libero l'elemento appena elaborato
+        elemento.clear()
+        radice.clear()
+
+    for nome_sorgente, iri_prop, nome_dest in in_sospeso:
+        if iri_prop in object_property:
+            yield nome_sorgente, nome_da_iri(iri_prop), nome_dest
+
+    # La gerarchia delle classi è nota solo a fine file
+    if tipi is not None:
+        for nome, classi in classi_individui.items():
+            nomi_classi = set()
+            for classe in classi:
+                nomi_classi |= _antenati(classe, superclassi)
+            tipi[nome] = tipo_da_classi(nomi_classi)
+
+
+def costruisci_grafo_streaming(percorso_owl, tipi=None):
+    """
+    Costruisce lo stesso grafo di costruisci_grafo leggendo
+    direttamente il file RDF/XML, senza caricare l'ontologia con owlready2.
+
+    Valgono le stesse regole del costruttore basato su owlready2:
+    archi simmetrici, costi presi da costo_proprieta e costo minimo
+    in caso di archi duplicati.
+
+    Il dizionario tipi, se passato, viene riempito come in
+    asserzioni_rdf_streaming.
+    """
+
+    grafo = {}
+
+    for nome_sorgente, nome_prop, nome_dest in asserzioni_rdf_streaming(percorso_owl, tipi):
+        aggiungi_relazione(grafo, nome_sorgente, nome_prop, nome_dest)
+
+    return grafo
+
+
+def confronta_grafi(grafo_a, grafo_b):
+    """
+    Confronta due grafi nel formato di costruisci_grafo.
+
+    Restituisce l'elenco delle differenze trovate
+    (lista vuota se i grafi coincidono).
+    """
+    differenze = []
+
+    for nodo in sorted(set(grafo_a) | set(grafo_b)):
+        if nodo not in grafo_a:
+            differenze.append(f"nodo presente solo nel secondo grafo: {nodo}")
+            continue
+        if nodo not in grafo_b:
+            differenze.append(f"nodo presente solo nel primo grafo: {nodo}")
+            continue
+
+        vicini_a = grafo_a[nodo]
+        vicini_b = grafo_b[nodo]
+
+        for vicino in sorted(set(vicini_a) | set(vicini_b)):
+            costo_a = vicini_a.get(vicino)
+            costo_b = vicini_b.get(vicino)
+            if costo_a != costo_b:
+                differenze.append(f"arco {nodo} -> {vicino}: {costo_a} / {costo_b}")
+
+    return differenze
@@ -1,16 +1,21 @@
 from pathlib import Path
-from collections import deque
-from owlready2 import get_ontology
 
-from integrazione_kb.costruisci_grafo import costruisci_grafo
-from integrazione_kb.euristiche_biblioteca import euristica_informata_tassonomia
+from integrazione_kb.cache_grafo import carica_grafo_biblioteca
+from integrazione_kb.chiusura_categorie import IndiceChiusura, ObiettivoSottoalbero
+from integrazione_kb.costruisci_grafo import TIPO_CATEGORIA
+from integrazione_kb.euristiche_biblioteca import EuristicaTassonomia
+from integrazione_kb.euristica_landmark import EuristicaLandmark
 
+from ricerca_percorsi.cache_indici import carica_indice_componenti, carica_indice_contrazione
 from ricerca_percorsi.problema_biblioteca import ProblemaBiblioteca
 from ricerca_percorsi.algoritmo_a_stella import a_stella
+from ricerca_percorsi.algoritmo_bidirezionale import ricerca_bidirezionale
+from ricerca_percorsi.frontiera import scegli_frontiera
 
 
-# Carica il file OWL dell'ontologia.
-# Restituisce l'ontologia oppure None se il file non esiste.
+# Carica il grafo costruito dal file OWL dell'ontologia.
+# Se esiste una cache valida accanto al file, l'ontologia non viene riletta.
+# Restituisce i dati del grafo oppure None se il file non esiste.
 def carica_ontologia(percorso_file):
     percorso_file = Path(percorso_file)
 
@@ -19,8 +24,7 @@ def carica_ontologia(percorso_file):
         print("Controlla che 'biblioteca.owl' sia presente nella cartella 'ontologia'.")
         return None
 
-    ontologia = get_ontology(str(percorso_file.resolve())).load()
-    return ontologia
+    return carica_grafo_biblioteca(percorso_file)
 
 
 # Euristica sempre nulla: A* si comporta come Dijkstra.
@@ -48,41 +52,8 @@ def normalizza_output_a_stella(risultato):
     return None, None, None
 
 
-# Divide gli individui dell'ontologia in gruppi leggibili.
-def raggruppa_nodi_per_tipo(ontologia):
-    persone, libri, categorie, prestiti, altro = [], [], [], [], []
-
-    for ind in ontologia.individuals():
-        nome = ind.name
-        basso = nome.lower()
-
-        if basso.startswith("cat_"):
-            categorie.append(nome)
-        elif basso.startswith("prestito"):
-            prestiti.append(nome)
-        elif basso.startswith("libro"):
-            libri.append(nome)
-        else:
-            persone.append(nome)
-
-    persone.sort()
-    libri.sort()
-    categorie.sort()
-    prestiti.sort()
-    altro.sort()
-
-    return {
-        "Persone": persone,
-        "Libri": libri,
-        "Categorie": categorie,
-        "Prestiti": prestiti,
-        "Altro": altro
-    }
-
-
 # Costruisce il menu numerato per permettere la scelta dei nodi.
-def costruisci_menu(ontologia):
-    gruppi = raggruppa_nodi_per_tipo(ontologia)
+def costruisci_menu(gruppi):
 
     elenco = []
     for nome_gruppo in ["Persone", "Libri", "Categorie", "Prestiti", "Altro"]:
@@ -128,34 +99,18 @@ def scegli_da_menu(titolo, testo_menu, mappa_scelte):
         return mappa_scelte[numero]
 
 
-# Restituisce alcuni nodi raggiungibili dalla partenza.
-def calcola_raggiungibili(grafo, nodo_iniziale, limite=15):
-    visitati = set([nodo_iniziale])
-    coda = deque([nodo_iniziale])
-
-    while coda and len(visitati) < limite:
-        corrente = coda.popleft()
-
-        for v in grafo.get(corrente, {}).keys():
-            if v not in visitati:
-                visitati.add(v)
-                coda.append(v)
-
-            if len(visitati) >= limite:
-                break
-
-    visitati.discard(nodo_iniziale)
-    return sorted(list(visitati))
-
-
 # Presenta il risultato della ricerca in modo chiaro.
-def stampa_risultato(percorso, costo, nodi_espansi, nodo_iniziale, nodo_obiettivo, grafo):
+def stampa_risultato(percorso, costo, nodi_espansi, nodo_iniziale, nodo_obiettivo, componenti):
     if not percorso:
         print("\nNon sono riuscito a trovare un collegamento tra i due nodi.")
         print(f"Nodo di partenza: {nodo_iniziale}")
         print(f"Nodo obiettivo:   {nodo_obiettivo}")
 
-        suggeriti = calcola_raggiungibili(grafo, nodo_iniziale, limite=15)
+        if not componenti.collegati(nodo_iniziale, nodo_obiettivo):
+            print("I due nodi appartengono a parti del grafo non collegate tra loro.")
+
+        # I suggerimenti vengono dall'indice delle componenti: nessuna visita del grafo
+        suggeriti = componenti.suggerimenti(nodo_iniziale, limite=15)
         if suggeriti:
             print("\nAlcuni nodi raggiungibili dalla partenza sono:")
             for s in suggeriti:
@@ -187,16 +142,17 @@ def main():
     print("Sto caricando l'ontologia e preparando la struttura per la ricerca...\n")
 
     percorso_owl = Path("ontologia") / "biblioteca.owl"
-    ontologia = carica_ontologia(percorso_owl)
-    if ontologia is None:
+    dati = carica_ontologia(percorso_owl)
+    if dati is None:
         return
 
-    print("Ontologia caricata correttamente.")
-    print("Costruisco il grafo delle relazioni...\n")
+    print("Ontologia caricata e grafo delle relazioni pronto.\n")
 
-    grafo = costruisci_grafo(ontologia)
+    grafo = dati["grafo"]
+    tipi = dati["tipi"]
+    componenti = carica_indice_componenti(percorso_owl, grafo)
 
-    testo_menu, mappa_scelte = costruisci_menu(ontologia)
+    testo_menu, mappa_scelte = costruisci_menu(dati["gruppi"])
 
     nodo_iniziale = scegli_da_menu("Scegli il nodo di partenza:", testo_menu, mappa_scelte)
     print(f"\nHai scelto come punto di partenza: {nodo_iniziale}")
@@ -208,10 +164,13 @@ def main():
     print("  1) nulla (A* = Dijkstra)")
     print("  2) base (0 se goal, 1 altrimenti)")
     print("  3) informata (usa tassonomia sottoCategoriaDi)")
+    print("  4) landmark (ALT, valida per qualsiasi obiettivo)")
+    print("  5) bidirezionale (Dijkstra da partenza e obiettivo insieme)")
+    print("  6) gerarchie di contrazione (indice precalcolato)")
 
-    scelta_h = input("Inserisci 1, 2 oppure 3: ").strip()
+    scelta_h = input("Inserisci un numero da 1 a 6: ").strip()
 
-    goal_e_categoria = nodo_obiettivo.startswith("cat_")
+    goal_e_categoria = tipi.get(nodo_obiettivo) == TIPO_CATEGORIA
 
     if scelta_h == "1":
         nome_h = "nessuna"
@@ -221,6 +180,18 @@ def main():
         nome_h = "base"
         funzione_h = lambda s: euristica_base(s, nodo_obiettivo)
 
+    elif scelta_h == "4":
+        nome_h = "landmark"
+        funzione_h = EuristicaLandmark(grafo).funzione_per(nodo_obiettivo)
+
+    elif scelta_h == "5":
+        nome_h = "bidirezionale"
+        funzione_h = None
+
+    elif scelta_h == "6":
+        nome_h = "contrazione"
+        funzione_h = None
+
     else:
         if not goal_e_categoria:
             print("\nL'euristica informata è applicabile solo se l'obiettivo è una categoria.")
@@ -229,17 +200,44 @@ def main():
             funzione_h = lambda s: euristica_base(s, nodo_obiettivo)
         else:
             nome_h = "informata"
-            funzione_h = lambda s: euristica_informata_tassonomia(grafo, s, nodo_obiettivo)
+            funzione_h = EuristicaTassonomia(grafo, tipi).funzione_per(nodo_obiettivo)
+
+    # Con una categoria come obiettivo va bene anche arrivare a un libro
+    # della categoria o delle sue sottocategorie: il test usa l'indice
+    # della tassonomia, senza elencare tutti i possibili obiettivi.
+    sottoalbero = None
+    if goal_e_categoria:
+        risposta = input("\nVa bene anche un libro della categoria o delle sue sottocategorie? (s/n): ")
+        if risposta.strip().lower().startswith("s"):
+            indice_chiusura = IndiceChiusura(*dati["tassonomia"])
+            sottoalbero = ObiettivoSottoalbero(indice_chiusura, nodo_obiettivo, libri=True, categorie=True)
+
+            if funzione_h is not None and nome_h != "nessuna":
+                # Le stime verso la sola categoria possono superare
+                # il costo per arrivare a un libro sotto di essa
+                print("Le stime verso la categoria non valgono per i libri sotto di essa:")
+                print("in questo caso utilizzo A* senza euristica.")
+                nome_h = "nessuna"
+                funzione_h = lambda s: euristica_nulla(s, nodo_obiettivo)
 
     print(f"\nCerco un percorso da '{nodo_iniziale}' a '{nodo_obiettivo}'.")
-    print(f"Euristica selezionata: {nome_h}")
+    print(f"Strategia selezionata: {nome_h}")
     print("Avvio la ricerca...\n")
 
-    problema = ProblemaBiblioteca(grafo, nodo_iniziale, {nodo_obiettivo})
-    risultato = a_stella(problema, funzione_h)
+    problema = ProblemaBiblioteca(grafo, nodo_iniziale, {nodo_obiettivo}, sottoalbero, componenti)
+
+    if nome_h == "contrazione":
+        # L'indice viene preparato solo la prima volta e poi salvato accanto all'ontologia
+        indice = carica_indice_contrazione(percorso_owl, grafo)
+        risultato = indice.ricerca(problema)
+    elif funzione_h is None:
+        risultato = ricerca_bidirezionale(problema)
+    else:
+        # Coda a secchi se i costi degli archi sono multipli di un quanto
+        risultato = a_stella(problema, funzione_h, scegli_frontiera(grafo))
 
     percorso, costo, nodi_espansi = normalizza_output_a_stella(risultato)
-    stampa_risultato(percorso, costo, nodi_espansi, nodo_iniziale, nodo_obiettivo, grafo)
+    stampa_risultato(percorso, costo, nodi_espansi, nodo_iniziale, nodo_obiettivo, componenti)
 
 
 if __name__ == "__main__":
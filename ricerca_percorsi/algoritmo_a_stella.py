@@ -1,11 +1,20 @@
-import heapq
-from ricerca_percorsi.nodo_ricerca import NodoRicerca
+from time import perf_counter
 
+from ricerca_percorsi.frontiera import FrontieraHeap
+from ricerca_percorsi.nodo_ricerca import ricostruisci_da_padri
 
-def a_stella(problema, euristica):
+
+def a_stella(problema, euristica, frontiera=FrontieraHeap, statistiche=None):
     """
     Implementazione dell'algoritmo A*.
 
+    - frontiera: classe (o fabbrica) della coda di priorità da usare.
+      Di default un heap binario; con scegli_frontiera(grafo) si ottiene
+      la coda a secchi quando i costi degli archi lo permettono.
+    - statistiche: oggetto StatisticheRicerca da riempire con i contatori
+      della ricerca. Se manca (default) il ciclo usa direttamente
+      euristica, frontiera e successori, senza pagare nulla per le misure.
+
     Restituisce sempre una terna:
       (percorso, costo_totale, nodi_espansi)
 
@@ -14,63 +23,208 @@ def a_stella(problema, euristica):
     - nodi_espansi: numero di nodi realmente esplorati
     """
 
+    # Obiettivi in un'altra componente connessa: nessuna ricerca
+    if problema.e_irraggiungibile():
+        return None, None, 0
+
+    # Frontiera gestita come coda di priorità
+    # con voci (f, contatore, stato, costo_g)
+    frontiera = frontiera()
+
+    if statistiche is None:
+        return _ciclo_a_stella(
+            problema, euristica, frontiera,
+            frontiera.inserisci, frontiera.estrai, problema.successori
+        )
+
+    estrazioni_prima = statistiche.estrazioni
+    euristica, inserisci, estrai, successori = _strumenta(problema, euristica, frontiera, statistiche)
+    risultato = _ciclo_a_stella(problema, euristica, frontiera, inserisci, estrai, successori)
+
+    # Ogni estrazione espande uno stato, trova l'obiettivo oppure è una
+    # voce superata: le superate si ricavano senza contarle nel ciclo
+    percorso, _, nodi_espansi = risultato
+    estrazioni = statistiche.estrazioni - estrazioni_prima
+    statistiche.estrazioni_superate += estrazioni - nodi_espansi - (percorso is not None)
+
+    return risultato
+
+
+def _ciclo_a_stella(problema, euristica, frontiera, inserisci, estrai, successori):
+    """
+    Ciclo principale di A*, unico per la ricerca normale e per quella
+    strumentata: cambiano solo le funzioni ricevute (quelle della
+    frontiera e del problema, oppure le versioni di _strumenta).
+    """
     # Stato di partenza del problema
     stato_iniziale = problema.stato_iniziale()
-    nodo_iniziale = NodoRicerca(
-        stato=stato_iniziale,
-        padre=None,
-        azione=None,
-        costo_g=0.0
-    )
-
-    # Frontiera gestita come coda di priorità (min-heap)
-    frontiera = []
+
+    # Al posto di un NodoRicerca per ogni inserimento tengo due tabelle:
+    # il padre di ogni stato e il miglior costo noto per raggiungerlo.
+    # Il percorso finale viene ricostruito dalla tabella dei padri.
+    padri = {stato_iniziale: None}
+    migliori_costi = {stato_iniziale: 0.0}
+
     contatore = 0  # serve solo a evitare conflitti tra nodi con stesso f
 
-    f_iniziale = nodo_iniziale.costo_g + float(euristica(nodo_iniziale.stato))
-    heapq.heappush(frontiera, (f_iniziale, contatore, nodo_iniziale))
+    # Riferimento locale: evita lookup ripetuti nel ciclo principale
+    e_goal = problema.e_goal
 
-    # Tiene traccia del miglior costo noto per ogni stato
-    migliori_costi = {stato_iniziale: 0.0}
+    f_iniziale = 0.0 + float(euristica(stato_iniziale))
+    inserisci((f_iniziale, contatore, stato_iniziale, 0.0))
 
     nodi_espansi = 0
 
     while frontiera:
-        _, _, nodo = heapq.heappop(frontiera)
+        _, _, stato, costo_g = estrai()
 
-        # Se ho già trovato un modo migliore per arrivare qui, ignoro questo nodo
-        costo_conosciuto = migliori_costi.get(nodo.stato)
-        if costo_conosciuto is not None and nodo.costo_g > costo_conosciuto:
+        # Se ho già trovato un modo migliore per arrivare qui, ignoro questa voce
+        if costo_g > migliori_costi[stato]:
             continue
 
         # Se ho raggiunto l'obiettivo, ricostruisco il percorso
-        if problema.e_goal(nodo.stato):
-            percorso = nodo.ricostruisci_percorso()
-            return percorso, float(nodo.costo_g), nodi_espansi
+        if e_goal(stato):
+            percorso = ricostruisci_da_padri(padri, stato)
+            return percorso, float(costo_g), nodi_espansi
 
         nodi_espansi += 1
 
         # Espando i successori
-        for stato_successore, costo_arco in problema.successori(nodo.stato):
+        for stato_successore, costo_arco in successori(stato):
 
-            nuovo_costo = nodo.costo_g + float(costo_arco)
+            nuovo_costo = costo_g + float(costo_arco)
             costo_migliore = migliori_costi.get(stato_successore)
 
             # Aggiorno solo se trovo un percorso migliore
             if costo_migliore is None or nuovo_costo < costo_migliore:
                 migliori_costi[stato_successore] = nuovo_costo
-
-                nuovo_nodo = NodoRicerca(
-                    stato=stato_successore,
-                    padre=nodo,
-                    azione=None,
-                    costo_g=nuovo_costo
-                )
+                padri[stato_successore] = stato
 
                 contatore += 1
                 f = nuovo_costo + float(euristica(stato_successore))
 
-                heapq.heappush(frontiera, (f, contatore, nuovo_nodo))
+                inserisci((f, contatore, stato_successore, nuovo_costo))
 
     # Se esco dal ciclo, non esiste un percorso
     return None, None, nodi_espansi
+
+
+def _strumenta(problema, euristica, frontiera, statistiche):
+    """
+    Versioni di euristica, inserimento, estrazione e successori che
+    aggiornano statistiche. Il ciclo di A* resta lo stesso: stesso
+    ordine di espansione e stesso risultato della ricerca senza misure.
+    """
+    inserisci = frontiera.inserisci
+    estrai = frontiera.estrai
+    successori = problema.successori
+    espansi = set()
+
+    def stima(stato):
+        t0 = perf_counter()
+        valore = float(euristica(stato))
+        statistiche.tempo_euristica += perf_counter() - t0
+        statistiche.chiamate_euristica += 1
+        return valore
+
+    def metti(voce):
+        # Un inserimento dopo l'espansione dello stato è una riapertura
+        if voce[2] in espansi:
+            statistiche.riaperture += 1
+
+        t0 = perf_counter()
+        inserisci(voce)
+        statistiche.tempo_frontiera += perf_counter() - t0
+        statistiche.inserimenti += 1
+        dimensione = len(frontiera)
+        if dimensione > statistiche.max_frontiera:
+            statistiche.max_frontiera = dimensione
+
+    def togli():
+        t0 = perf_counter()
+        voce = estrai()
+        statistiche.tempo_frontiera += perf_counter() - t0
+        statistiche.estrazioni += 1
+        return voce
+
+    def vicini(stato):
+        # Il ciclo chiede i successori solo degli stati che espande
+        espansi.add(stato)
+
+        # I successori possono essere un generatore: li materializzo
+        # per misurare il tempo della sola generazione
+        t0 = perf_counter()
+        elenco = list(successori(stato))
+        statistiche.tempo_successori += perf_counter() - t0
+        return elenco
+
+    return stima, metti, togli, vicini
+
+
+def a_stella_compatto(grafo_compatto, id_iniziale, id_obiettivi, euristica, frontiera=FrontieraHeap):
+    """
+    Variante di A* che lavora sul GrafoCompatto.
+
+    Gli stati sono gli id interi dei nodi: niente hashing di stringhe
+    durante la ricerca. I nomi vengono recuperati solo alla fine,
+    quando si ricostruisce il percorso.
+
+    - id_obiettivi: insieme di id dei nodi obiettivo
+    - euristica: funzione che riceve un id e restituisce la stima
+    - frontiera: come in a_stella
+
+    Restituisce la stessa terna di a_stella:
+      (percorso, costo_totale, nodi_espansi)
+    """
+
+    offset = grafo_compatto.offset
+    destinazioni = grafo_compatto.destinazioni
+    costi = grafo_compatto.costi
+
+    obiettivi = set(id_obiettivi)
+
+    # Al posto dei NodoRicerca tengo solo il padre e il costo g di ogni id
+    padri = {id_iniziale: None}
+    migliori_costi = {id_iniziale: 0.0}
+
+    frontiera = frontiera()
+    inserisci = frontiera.inserisci
+    estrai = frontiera.estrai
+    contatore = 0
+
+    inserisci((float(euristica(id_iniziale)), contatore, id_iniziale, 0.0))
+
+    nodi_espansi = 0
+
+    while frontiera:
+        _, _, corrente, costo_g = estrai()
+
+        # Voce superata da un percorso migliore trovato dopo
+        if costo_g > migliori_costi[corrente]:
+            continue
+
+        if corrente in obiettivi:
+            percorso = []
+            nodo = corrente
+            while nodo is not None:
+                percorso.append(grafo_compatto.nomi[nodo])
+                nodo = padri[nodo]
+            percorso.reverse()
+            return percorso, float(costo_g), nodi_espansi
+
+        nodi_espansi += 1
+
+        for k in range(offset[corrente], offset[corrente + 1]):
+            vicino = destinazioni[k]
+            nuovo_costo = costo_g + costi[k]
+            costo_migliore = migliori_costi.get(vicino)
+
+            if costo_migliore is None or nuovo_costo < costo_migliore:
+                migliori_costi[vicino] = nuovo_costo
+                padri[vicino] = corrente
+
+                contatore += 1
+                f = nuovo_costo + euristica(vicino)
+                inserisci((f, contatore, vicino, nuovo_costo))
+
+    return None, None, nodi_espansi
@@ -0,0 +1,116 @@
+import heapq
+
+
+def _ricostruisci(padri_avanti, padri_indietro, incontro):
+    """
+    Unisce le due metà del percorso nel nodo d'incontro.
+    """
+    percorso = []
+    nodo = incontro
+    while nodo is not None:
+        percorso.append(nodo)
+        nodo = padri_avanti[nodo]
+    percorso.reverse()
+
+    nodo = padri_indietro[incontro]
+    while nodo is not None:
+        percorso.append(nodo)
+        nodo = padri_indietro[nodo]
+
+    return percorso
+
+
+def ricerca_bidirezionale(problema):
+    """
+    Dijkstra bidirezionale.
+
+    Una ricerca parte dallo stato iniziale seguendo i successori,
+    l'altra parte contemporaneamente da tutti gli obiettivi seguendo
+    i predecessori. Ad ogni passo avanza il lato con la frontiera più
+    piccola, così nessuna delle due esplode.
+
+    Criterio di arresto: indicando con mu il costo del miglior percorso
+    completo trovato finora, la ricerca si ferma quando
+      min(frontiera avanti) + min(frontiera indietro) >= mu
+    perché nessun percorso non ancora visto può costare meno di mu.
+
+    Restituisce la stessa terna di a_stella:
+      (percorso, costo_totale, nodi_espansi)
+    """
+
+    stato_iniziale = problema.stato_iniziale()
+
+    if problema.e_goal(stato_iniziale):
+        return [stato_iniziale], 0.0, 0
+
+    if problema.e_irraggiungibile():
+        return None, None, 0
+
+    costi_avanti = {stato_iniziale: 0.0}
+    padri_avanti = {stato_iniziale: None}
+    frontiera_avanti = [(0.0, 0, stato_iniziale)]
+
+    costi_indietro = {}
+    padri_indietro = {}
+    frontiera_indietro = []
+
+    contatore = 0
+    for obiettivo in problema.tutti_obiettivi():
+        contatore += 1
+        costi_indietro[obiettivo] = 0.0
+        padri_indietro[obiettivo] = None
+        frontiera_indietro.append((0.0, contatore, obiettivo))
+    heapq.heapify(frontiera_indietro)
+
+    # Costo e nodo d'incontro del miglior percorso completo trovato
+    mu = float("inf")
+    incontro = None
+
+    nodi_espansi = 0
+
+    while frontiera_avanti and frontiera_indietro:
+
+        if frontiera_avanti[0][0] + frontiera_indietro[0][0] >= mu:
+            break
+
+        # Espando il lato con meno nodi in frontiera
+        if len(frontiera_avanti) <= len(frontiera_indietro):
+            frontiera, costi, padri = frontiera_avanti, costi_avanti, padri_avanti
+            costi_altro_lato = costi_indietro
+            vicini = problema.successori
+        else:
+            frontiera, costi, padri = frontiera_indietro, costi_indietro, padri_indietro
+            costi_altro_lato = costi_avanti
+            vicini = problema.predecessori
+
+        costo_g, _, stato = heapq.heappop(frontiera)
+
+        # Voce superata da un percorso migliore
+        if costo_g > costi[stato]:
+            continue
+
+        nodi_espansi += 1
+
+        for vicino, costo_arco in vicini(stato):
+            nuovo_costo = costo_g + costo_arco
+            costo_migliore = costi.get(vicino)
+
+            if costo_migliore is None or nuovo_costo < costo_migliore:
+                costi[vicino] = nuovo_costo
+                padri[vicino] = stato
+
+                contatore += 1
+                heapq.heappush(frontiera, (nuovo_costo, contatore, vicino))
+
+                # Il vicino è già stato raggiunto dall'altro lato:
+                # ho un percorso completo candidato
+                costo_altro = costi_altro_lato.get(vicino)
+                if costo_altro is not None and nuovo_costo + costo_altro < mu:
+                    mu = nuovo_costo + costo_altro
+                    incontro = vicino
+
+    if incontro is None:
+        return None, None, nodi_espansi
+
+    percorso = _ricostruisci(padri_avanti, padri_indietro, incontro)
+    return percorso, float(mu), nodi_espansi
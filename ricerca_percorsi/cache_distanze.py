@@ -0,0 +1,179 @@
+import heapq
+from collections import OrderedDict
+
+
+def campo_distanze_inverso(grafo, obiettivo):
+    """
+    Dijkstra all'indietro a partire dall'obiettivo.
+
+    Restituisce (distanze, successivi):
+    - distanze[n]: costo minimo da n all'obiettivo
+    - successivi[n]: prossimo nodo sul percorso minimo da n all'obiettivo
+
+    Il grafo di costruisci_grafo è simmetrico, quindi gli archi
+    entranti di un nodo coincidono con quelli uscenti.
+    """
+    distanze = {obiettivo: 0.0}
+    successivi = {obiettivo: None}
+    definitivi = set()
+
+    coda = [(0.0, 0, obiettivo)]
+    contatore = 0
+
+    while coda:
+        costo, _, corrente = heapq.heappop(coda)
+        if corrente in definitivi:
+            continue
+        definitivi.add(corrente)
+
+        for vicino, costo_arco in grafo.get(corrente, {}).items():
+            nuovo_costo = costo + costo_arco
+            costo_migliore = distanze.get(vicino)
+            if costo_migliore is None or nuovo_costo < costo_migliore:
+                distanze[vicino] = nuovo_costo
+                successivi[vicino] = corrente
+                contatore += 1
+                heapq.heappush(coda, (nuovo_costo, contatore, vicino))
+
+    return distanze, successivi
+
+
+class CacheCampiDistanza:
+    """
+    Cache dei campi di distanza esatti verso gli obiettivi più richiesti.
+
+    Per ogni obiettivo in cache è salvato il risultato di un Dijkstra
+    all'indietro. Con questo:
+    - l'euristica esatta verso l'obiettivo è una lettura da dizionario
+    - il percorso da qualsiasi partenza si ottiene seguendo i successivi,
+      in tempo proporzionale alla lunghezza del percorso
+
+    La memoria è limitata dal numero totale di nodi salvati (max_nodi):
+    quando si supera il limite vengono scartati gli obiettivi usati
+    meno di recente (LRU).
+
+    La cache è legata a un grafo: se le viene passato un grafo diverso
+    (ad esempio ricostruito con costruisci_grafo) si svuota da sola.
+    Dopo una modifica dello stesso grafo va chiamato invalida().
+    """
+
+    def __init__(self, grafo, max_nodi=1_000_000):
+        self.grafo = grafo
+        self.max_nodi = max_nodi
+
+        self.campi = OrderedDict()
+        self.nodi_in_cache = 0
+
+        self.hit = 0
+        self.miss = 0
+        self.scartati = 0
+
+    def _verifica_grafo(self, grafo):
+        if grafo is not None and grafo is not self.grafo:
+            self.grafo = grafo
+            self.invalida()
+
+    def invalida(self, obiettivi=None):
+        """
+        Svuota la cache (oppure solo i campi degli obiettivi indicati).
+        """
+        if obiettivi is None:
+            self.campi.clear()
+            self.nodi_in_cache = 0
+            return
+
+        for obiettivo in obiettivi:
+            campo = self.campi.pop(obiettivo, None)
+            if campo is not None:
+                self.nodi_in_cache -= len(campo[0])
+
+    def aggiorna(self, modifiche):
+        """
+        Osservatore per AggiornatoreGrafo.
+
+        Se qualche distanza può essere diminuita (archi nuovi o più
+        economici) svuoto tutta la cache. Se invece gli archi sono solo
+        stati rimossi o resi più costosi, scarto soltanto i campi il cui
+        albero dei cammini minimi usava uno di quegli archi.
+        """
+        if not modifiche.solo_peggioramenti():
+            self.invalida()
+            return
+
+        archi = list(modifiche.archi_rimossi) + list(modifiche.archi_modificati)
+
+        da_scartare = []
+        for obiettivo, (_, successivi) in self.campi.items():
+            for a, b in archi:
+                if successivi.get(a) == b or successivi.get(b) == a:
+                    da_scartare.append(obiettivo)
+                    break
+
+        self.invalida(da_scartare)
+
+    def campo(self, obiettivo, grafo=None):
+        """
+        Restituisce (distanze, successivi) verso l'obiettivo,
+        calcolandoli solo se non sono già in cache.
+        """
+        self._verifica_grafo(grafo)
+
+        campo = self.campi.get(obiettivo)
+        if campo is not None:
+            self.hit += 1
+            self.campi.move_to_end(obiettivo)
+            return campo
+
+        self.miss += 1
+        campo = campo_distanze_inverso(self.grafo, obiettivo)
+        self.campi[obiettivo] = campo
+        self.nodi_in_cache += len(campo[0])
+
+        # Scarto i campi meno recenti, ma tengo sempre quello appena calcolato
+        while self.nodi_in_cache > self.max_nodi and len(self.campi) > 1:
+            _, (distanze, _) = self.campi.popitem(last=False)
+            self.nodi_in_cache -= len(distanze)
+            self.scartati += 1
+
+        return campo
+
+    def euristica(self, obiettivo, grafo=None):
+        """
+        Euristica perfetta h(stato) verso l'obiettivo.
+        Gli stati che non raggiungono l'obiettivo ricevono infinito.
+        """
+        distanze, _ = self.campo(obiettivo, grafo)
+        infinito = float("inf")
+        return lambda stato: distanze.get(stato, infinito)
+
+    def percorso(self, nodo_iniziale, obiettivo, grafo=None):
+        """
+        Restituisce la stessa terna di a_stella:
+          (percorso, costo_totale, nodi_espansi)
+
+        Quando il campo è già in cache non viene espanso nessun nodo.
+        """
+        miss_prima = self.miss
+        distanze, successivi = self.campo(obiettivo, grafo)
+        nodi_espansi = len(distanze) if self.miss > miss_prima else 0
+
+        costo = distanze.get(nodo_iniziale)
+        if costo is None:
+            return None, None, nodi_espansi
+
+        percorso = []
+        nodo = nodo_iniziale
+        while nodo is not None:
+            percorso.append(nodo)
+            nodo = successivi[nodo]
+
+        return percorso, float(costo), nodi_espansi
+
+    def statistiche(self):
+        return {
+            "hit": self.hit,
+            "miss": self.miss,
+            "scartati": self.scartati,
+            "obiettivi_in_cache": len(self.campi),
+            "nodi_in_cache": self.nodi_in_cache,
+        }
@@ -0,0 +1,71 @@
+from pathlib import Path
+
+from integrazione_kb.cache_grafo import chiave_cache
+from integrazione_kb.cache_pickle import leggi_cache, scrivi_cache
+from ricerca_percorsi.contrazione_gerarchie import VERSIONE_INDICE, costruisci_indice
+from ricerca_percorsi.indice_componenti import VERSIONE_COMPONENTI, IndiceComponenti
+
+
+def percorso_indice_contrazione(percorso_owl):
+    """
+    ontologia/biblioteca.owl -> ontologia/biblioteca.contrazione.cache
+    """
+    percorso_owl = Path(percorso_owl)
+    return percorso_owl.with_name(percorso_owl.stem + ".contrazione.cache")
+
+
+def percorso_indice_componenti(percorso_owl):
+    """
+    ontologia/biblioteca.owl -> ontologia/biblioteca.componenti.cache
+    """
+    percorso_owl = Path(percorso_owl)
+    return percorso_owl.with_name(percorso_owl.stem + ".componenti.cache")
+
+
+def carica_indice_contrazione(percorso_owl, grafo, usa_cache=True):
+    """
+    Restituisce l'IndiceContrazione del grafo costruito da percorso_owl,
+    leggendolo dal file accanto all'ontologia se è ancora valido.
+
+    L'indice dipende dal grafo e dall'algoritmo di preparazione:
+    la chiave è quella della cache del grafo più la versione dell'indice.
+    """
+    percorso_owl = Path(percorso_owl)
+    percorso = percorso_indice_contrazione(percorso_owl)
+    chiave = f"{chiave_cache(percorso_owl)}:{VERSIONE_INDICE}"
+
+    if usa_cache:
+        indice = leggi_cache(percorso, chiave)
+        if indice is not None:
+            return indice
+
+    indice = costruisci_indice(grafo)
+
+    if usa_cache:
+        scrivi_cache(percorso, chiave, indice)
+
+    return indice
+
+
+def carica_indice_componenti(percorso_owl, grafo, usa_cache=True):
+    """
+    Restituisce l'IndiceComponenti del grafo costruito da percorso_owl.
+
+    Nel file salvo solo le etichette dei nodi (non il grafo, che ha già
+    la sua cache): alla lettura l'indice viene ricomposto sul grafo passato.
+    """
+    percorso_owl = Path(percorso_owl)
+    percorso = percorso_indice_componenti(percorso_owl)
+    chiave = f"{chiave_cache(percorso_owl)}:{VERSIONE_COMPONENTI}"
+
+    if usa_cache:
+        etichette = leggi_cache(percorso, chiave)
+        if etichette is not None:
+            return IndiceComponenti.da_etichette(grafo, etichette)
+
+    indice = IndiceComponenti(grafo)
+
+    if usa_cache:
+        scrivi_cache(percorso, chiave, indice.componente)
+
+    return indice
@@ -0,0 +1,409 @@
+import heapq
+
+
+# Da incrementare quando cambia il modo di costruire l'indice,
+# così gli indici salvati su disco non vengono più riusati.
+VERSIONE_INDICE = 1
+
+# Limiti della ricerca dei "testimoni" durante la contrazione:
+# oltre questi limiti aggiungo la scorciatoia anche se forse
+# non serviva (l'indice resta corretto, solo un po' più grande).
+MAX_NODI_TESTIMONI = 30
+
+# Un nodo che al momento della contrazione ha più vicini di così
+# resta nel "nucleo" non contratto: contrarlo costerebbe molto
+# e produrrebbe tantissime scorciatoie.
+GRADO_MAX_CONTRAZIONE = 8
+
+
+class IndiceContrazione:
+    """
+    Indice a gerarchie di contrazione (Contraction Hierarchies)
+    per il grafo simmetrico di costruisci_grafo.
+
+    Durante la preparazione i nodi vengono "contratti" uno alla volta,
+    dal meno importante al più importante. Quando un nodo v sparisce,
+    per ogni coppia di vicini u, w ancora presenti aggiungo una
+    scorciatoia u - w (con costo c(u,v) + c(v,w)) se non esiste un
+    percorso alternativo altrettanto economico. La scorciatoia ricorda
+    il nodo intermedio v, così il percorso reale si può ricostruire.
+
+    Alla fine per ogni nodo restano solo gli archi "verso l'alto",
+    cioè verso nodi contratti dopo di lui. Un percorso minimo sale
+    sempre e poi scende, quindi una query sale dalla partenza e dagli
+    obiettivi seguendo solo gli archi verso l'alto e cerca il punto
+    d'incontro: visita pochissimi nodi anche su grafi grandi.
+
+    I nodi del nucleo non contratto (vedi GRADO_MAX_CONTRAZIONE) hanno
+    tutti il rango massimo e tengono tutti gli archi tra loro: dentro
+    il nucleo la query prosegue con un Dijkstra bidirezionale.
+
+    L'indice è statico: se il grafo cambia va ricostruito.
+    """
+
+    def __init__(self, nomi, rango, rango_nucleo, su_vicini, su_costi, intermedi):
+        self.nomi = nomi
+        self.indici = {nome: i for i, nome in enumerate(nomi)}
+        self.rango = rango
+        # I nodi con rango >= rango_nucleo sono quelli del nucleo
+        self.rango_nucleo = rango_nucleo
+        self.su_vicini = su_vicini
+        self.su_costi = su_costi
+        self.intermedi = intermedi
+
+    def __getstate__(self):
+        # Gli indici si ricavano dai nomi: non li salvo su disco
+        stato = dict(self.__dict__)
+        del stato["indici"]
+        return stato
+
+    def __setstate__(self, stato):
+        self.__dict__.update(stato)
+        self.indici = {nome: i for i, nome in enumerate(self.nomi)}
+
+    def numero_nodi(self):
+        return len(self.nomi)
+
+    def numero_archi(self):
+        return sum(len(vicini) for vicini in self.su_vicini)
+
+    def numero_scorciatoie(self):
+        return len(self.intermedi)
+
+    def numero_nodi_nucleo(self):
+        return len(self.nomi) - self.rango_nucleo
+
+    def _espandi(self, a, b, percorso):
+        """
+        Aggiunge a percorso i nodi reali dell'arco a -> b (escluso a),
+        sostituendo ogni scorciatoia con i due archi che rappresenta.
+        """
+        intermedi = self.intermedi
+        pila = [(a, b)]
+        while pila:
+            x, y = pila.pop()
+            medio = intermedi.get((x, y) if x < y else (y, x))
+            if medio is None:
+                percorso.append(y)
+            else:
+                pila.append((medio, y))
+                pila.append((x, medio))
+
+    def _sali(self, sorgenti, costi, padri):
+        """
+        Prima fase della query: Dijkstra da tutte le sorgenti (a costo 0)
+        lungo gli archi verso l'alto, senza espandere i nodi del nucleo.
+
+        Al termine costi e padri contengono le distanze esatte verso
+        tutti i nodi contratti raggiungibili salendo e verso i nodi
+        del nucleo in cui si entra. Restituisce i nodi espansi.
+        """
+        su_vicini = self.su_vicini
+        su_costi = self.su_costi
+        rango = self.rango
+        rango_nucleo = self.rango_nucleo
+
+        frontiera = []
+        for nodo in sorgenti:
+            costi[nodo] = 0.0
+            padri[nodo] = None
+            frontiera.append((0.0, nodo))
+
+        nodi_espansi = 0
+        while frontiera:
+            costo_g, nodo = heapq.heappop(frontiera)
+            if costo_g > costi[nodo] or rango[nodo] >= rango_nucleo:
+                continue
+
+            nodi_espansi += 1
+
+            for vicino, costo_arco in zip(su_vicini[nodo], su_costi[nodo]):
+                nuovo_costo = costo_g + costo_arco
+                costo_migliore = costi.get(vicino)
+                if costo_migliore is None or nuovo_costo < costo_migliore:
+                    costi[vicino] = nuovo_costo
+                    padri[vicino] = nodo
+                    heapq.heappush(frontiera, (nuovo_costo, vicino))
+
+        return nodi_espansi
+
+    def percorso_id(self, sorgente, obiettivi):
+        """
+        Query sugli identificativi interi.
+        Restituisce (percorso di id, costo, nodi_espansi).
+
+        Un percorso minimo nell'indice sale tra i nodi contratti,
+        attraversa eventualmente il nucleo e poi scende. La query quindi:
+        1. sale completamente dalla sorgente e dagli obiettivi
+           (gli spazi di ricerca verso l'alto sono piccoli);
+        2. se serve, prosegue nel nucleo con un Dijkstra bidirezionale
+           che parte dai nodi del nucleo raggiunti nella prima fase.
+        """
+        if sorgente in obiettivi:
+            return [sorgente], 0.0, 0
+
+        costi_avanti = {}
+        padri_avanti = {}
+        costi_indietro = {}
+        padri_indietro = {}
+
+        nodi_espansi = self._sali((sorgente,), costi_avanti, padri_avanti)
+        nodi_espansi += self._sali(obiettivi, costi_indietro, padri_indietro)
+
+        # Miglior percorso che sale e scende (nucleo compreso, per ora
+        # solo nei nodi di ingresso raggiunti da entrambi i lati)
+        mu = float("inf")
+        incontro = None
+        for nodo, costo in costi_avanti.items():
+            costo_altro = costi_indietro.get(nodo)
+            if costo_altro is not None and costo + costo_altro < mu:
+                mu = costo + costo_altro
+                incontro = nodo
+
+        # Fase nel nucleo: il grafo è lo stesso nelle due direzioni,
+        # quindi vale il criterio di arresto del Dijkstra bidirezionale
+        rango = self.rango
+        rango_nucleo = self.rango_nucleo
+        su_vicini = self.su_vicini
+        su_costi = self.su_costi
+
+        frontiera_avanti = [(c, n) for n, c in costi_avanti.items() if rango[n] >= rango_nucleo]
+        frontiera_indietro = [(c, n) for n, c in costi_indietro.items() if rango[n] >= rango_nucleo]
+        heapq.heapify(frontiera_avanti)
+        heapq.heapify(frontiera_indietro)
+
+        while frontiera_avanti and frontiera_indietro:
+
+            if frontiera_avanti[0][0] + frontiera_indietro[0][0] >= mu:
+                break
+
+            if len(frontiera_avanti) <= len(frontiera_indietro):
+                frontiera, costi, padri = frontiera_avanti, costi_avanti, padri_avanti
+                costi_altro_lato = costi_indietro
+            else:
+                frontiera, costi, padri = frontiera_indietro, costi_indietro, padri_indietro
+                costi_altro_lato = costi_avanti
+
+            costo_g, nodo = heapq.heappop(frontiera)
+            if costo_g > costi[nodo]:
+                continue
+
+            nodi_espansi += 1
+
+            for vicino, costo_arco in zip(su_vicini[nodo], su_costi[nodo]):
+                nuovo_costo = costo_g + costo_arco
+                costo_migliore = costi.get(vicino)
+                if costo_migliore is None or nuovo_costo < costo_migliore:
+                    costi[vicino] = nuovo_costo
+                    padri[vicino] = nodo
+                    heapq.heappush(frontiera, (nuovo_costo, vicino))
+
+                    costo_altro = costi_altro_lato.get(vicino)
+                    if costo_altro is not None and nuovo_costo + costo_altro < mu:
+                        mu = nuovo_costo + costo_altro
+                        incontro = vicino
+
+        if incontro is None:
+            return None, None, nodi_espansi
+
+        # Catena di archi (con scorciatoie) dalla sorgente all'obiettivo
+        catena = []
+        nodo = incontro
+        while nodo is not None:
+            catena.append(nodo)
+            nodo = padri_avanti[nodo]
+        catena.reverse()
+        nodo = padri_indietro[incontro]
+        while nodo is not None:
+            catena.append(nodo)
+            nodo = padri_indietro[nodo]
+
+        percorso = [catena[0]]
+        for a, b in zip(catena, catena[1:]):
+            self._espandi(a, b, percorso)
+
+        return percorso, float(mu), nodi_espansi
+
+    def percorso(self, nodo_iniziale, obiettivi):
+        """
+        Restituisce la stessa terna di a_stella:
+          (percorso, costo_totale, nodi_espansi)
+
+        obiettivi può essere un singolo nodo o un insieme di nodi.
+        """
+        if isinstance(obiettivi, str):
+            obiettivi = (obiettivi,)
+
+        sorgente = self.indici.get(nodo_iniziale)
+        id_obiettivi = {self.indici[o] for o in obiettivi if o in self.indici}
+
+        if sorgente is None or not id_obiettivi:
+            return None, None, 0
+
+        percorso, costo, nodi_espansi = self.percorso_id(sorgente, id_obiettivi)
+        if percorso is None:
+            return None, None, nodi_espansi
+
+        nomi = self.nomi
+        return [nomi[i] for i in percorso], costo, nodi_espansi
+
+    def ricerca(self, problema):
+        """
+        Risolve un ProblemaBiblioteca costruito sullo stesso grafo.
+        """
+        if problema.e_irraggiungibile():
+            return None, None, 0
+        return self.percorso(problema.stato_iniziale(), problema.tutti_obiettivi())
+
+
+def _testimoni(adiacenza, sorgente, escluso, costo_max, bersagli):
+    """
+    Dijkstra limitato da sorgente che ignora il nodo escluso:
+    si ferma oltre costo_max, dopo MAX_NODI_TESTIMONI nodi
+    oppure quando tutti i bersagli hanno la distanza definitiva.
+    """
+    distanze = {sorgente: 0.0}
+    coda = [(0.0, sorgente)]
+    definitivi = 0
+    mancanti = len(bersagli)
+
+    while coda and definitivi < MAX_NODI_TESTIMONI:
+        costo, nodo = heapq.heappop(coda)
+        if costo > distanze[nodo]:
+            continue
+        if costo > costo_max:
+            break
+        definitivi += 1
+
+        if nodo in bersagli:
+            mancanti -= 1
+            if mancanti == 0:
+                break
+
+        for vicino, costo_arco in adiacenza[nodo].items():
+            if vicino == escluso:
+                continue
+            nuovo_costo = costo + costo_arco
+            if nuovo_costo <= costo_max and nuovo_costo < distanze.get(vicino, float("inf")):
+                distanze[vicino] = nuovo_costo
+                heapq.heappush(coda, (nuovo_costo, vicino))
+
+    return distanze
+
+
+def _scorciatoie(adiacenza, nodo):
+    """
+    Scorciatoie (u, w, costo) necessarie per contrarre il nodo.
+    """
+    vicini = sorted(adiacenza[nodo].items())
+    necessarie = []
+
+    for i, (u, costo_u) in enumerate(vicini):
+        altri = vicini[i + 1:]
+        if not altri:
+            break
+
+        costo_max = costo_u + max(costo_w for _, costo_w in altri)
+        distanze = _testimoni(adiacenza, u, nodo, costo_max, {w for w, _ in altri})
+
+        for w, costo_w in altri:
+            costo = costo_u + costo_w
+            if distanze.get(w, float("inf")) > costo:
+                necessarie.append((u, w, costo))
+
+    return necessarie
+
+
+def _priorita(adiacenza, vicini_contratti, nodo):
+    """
+    Euristica di ordinamento (più bassa = da contrarre prima):
+    differenza di archi (scorciatoie aggiunte meno archi rimossi)
+    più il numero di vicini già contratti, che distribuisce
+    le contrazioni in modo uniforme sul grafo.
+    """
+    return (
+        len(_scorciatoie(adiacenza, nodo))
+        - len(adiacenza[nodo])
+        + vicini_contratti[nodo]
+    )
+
+
+def costruisci_indice(grafo, grado_max=GRADO_MAX_CONTRAZIONE):
+    """
+    Prepara un IndiceContrazione per il grafo di costruisci_grafo.
+
+    L'ordine di contrazione segue _priorita, aggiornata in modo "pigro":
+    quando un nodo esce dalla coda ricalcolo la sua priorità e,
+    se nel frattempo è peggiorata, lo rimetto in coda.
+
+    I nodi che al momento di essere contratti hanno più di grado_max
+    vicini restano nel nucleo.
+    """
+    nomi = list(grafo.keys())
+    indici = {nome: i for i, nome in enumerate(nomi)}
+    n = len(nomi)
+
+    # Grafo di lavoro sugli id: contiene solo i nodi non ancora contratti
+    adiacenza = [
+        {indici[vicino]: float(costo) for vicino, costo in grafo[nome].items()}
+        for nome in nomi
+    ]
+    intermedi = {}
+
+    vicini_contratti = [0] * n
+    rango = [0] * n
+    su_vicini = [None] * n
+    su_costi = [None] * n
+
+    coda = [(_priorita(adiacenza, vicini_contratti, v), v) for v in range(n)]
+    heapq.heapify(coda)
+
+    nucleo = []
+    livello = 0
+
+    while coda:
+        _, nodo = heapq.heappop(coda)
+
+        # Nodo troppo connesso: lo lascio nel nucleo
+        if len(adiacenza[nodo]) > grado_max:
+            nucleo.append(nodo)
+            continue
+
+        priorita = _priorita(adiacenza, vicini_contratti, nodo)
+        if coda and priorita > coda[0][0]:
+            heapq.heappush(coda, (priorita, nodo))
+            continue
+
+        # Gli archi rimasti portano tutti a nodi contratti più tardi
+        vicini = adiacenza[nodo]
+        su_vicini[nodo] = list(vicini.keys())
+        su_costi[nodo] = list(vicini.values())
+        rango[nodo] = livello
+        livello += 1
+
+        for u, w, costo in _scorciatoie(adiacenza, nodo):
+            adiacenza[u][w] = costo
+            adiacenza[w][u] = costo
+            intermedi[(u, w) if u < w else (w, u)] = nodo
+
+        for vicino in vicini:
+            del adiacenza[vicino][nodo]
+            vicini_contratti[vicino] += 1
+        adiacenza[nodo] = {}
+
+    # Nucleo: stesso rango per tutti e archi verso gli altri nodi
+    # del nucleo in entrambe le direzioni
+    for nodo in nucleo:
+        su_vicini[nodo] = list(adiacenza[nodo].keys())
+        su_costi[nodo] = list(adiacenza[nodo].values())
+        rango[nodo] = livello
+
+    # Tengo solo gli intermedi delle scorciatoie effettivamente usate
+    usati = {}
+    for a in range(n):
+        for b in su_vicini[a]:
+            chiave = (a, b) if a < b else (b, a)
+            if chiave in intermedi:
+                usati[chiave] = intermedi[chiave]
+
+    return IndiceContrazione(nomi, rango, livello, su_vicini, su_costi, usati)
@@ -0,0 +1,200 @@
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as _dijkstra_scipy
+except ImportError:
+    csr_matrix = None
+    _dijkstra_scipy = None
+
+from integrazione_kb.grafo_compatto import compila_grafo
+
+
+# Sorgenti elaborate insieme: una per bit di una parola a 64 bit
+SORGENTI_PER_BLOCCO = 64
+
+
+def _tipo_passi(n):
+    """
+    Tipo intero più piccolo che contiene qualsiasi numero di passi
+    (al massimo n - 1) più il valore riservato agli irraggiungibili.
+    """
+    return np.uint16 if n < np.iinfo(np.uint16).max else np.uint32
+
+
+def _archi_per_destinazione(grafo_compatto):
+    """
+    Riordina gli archi del CSR per nodo di arrivo.
+    Restituisce (origini degli archi ordinate per destinazione,
+    inizio del gruppo di ogni nodo con archi entranti, maschera
+    dei nodi con archi entranti).
+    """
+    n = grafo_compatto.numero_nodi()
+    offset = np.asarray(grafo_compatto.offset, dtype=np.int64)
+    destinazioni = np.asarray(grafo_compatto.destinazioni)
+
+    origini = np.repeat(np.arange(n, dtype=np.int32), np.diff(offset))
+    ordine = np.argsort(destinazioni, kind="stable")
+
+    gradi_entranti = np.bincount(destinazioni, minlength=n)
+    inizi = np.cumsum(gradi_entranti) - gradi_entranti
+    con_archi = gradi_entranti > 0
+
+    return origini[ordine], inizi[con_archi], con_archi
+
+
+def distanze_passi(grafo_compatto, sorgenti, max_passi=None):
+    """
+    BFS da molte sorgenti insieme (numero di archi, costi ignorati).
+
+    Restituisce una matrice len(sorgenti) x n: la riga r contiene il numero
+    di passi da sorgenti[r] a ogni nodo, oppure il massimo del tipo
+    (np.iinfo(matrice.dtype).max) per i nodi non raggiunti. Il tipo è
+    uint16 finché basta: con migliaia di sorgenti la matrice resta
+    di pochi byte per cella.
+
+    Le sorgenti vengono elaborate a blocchi di 64: ogni nodo ha una parola
+    a 64 bit in cui il bit b dice se la sorgente b lo ha già raggiunto,
+    e un livello della BFS per tutto il blocco è un OR sugli archi.
+    """
+    n = grafo_compatto.numero_nodi()
+    sorgenti = np.asarray(sorgenti, dtype=np.int64)
+
+    tipo = _tipo_passi(n)
+    matrice = np.full((len(sorgenti), n), np.iinfo(tipo).max, dtype=tipo)
+    if n == 0 or len(sorgenti) == 0:
+        return matrice
+
+    origini, inizi, con_archi = _archi_per_destinazione(grafo_compatto)
+    uno = np.uint64(1)
+
+    for primo in range(0, len(sorgenti), SORGENTI_PER_BLOCCO):
+        blocco = sorgenti[primo:primo + SORGENTI_PER_BLOCCO]
+        bit = np.arange(len(blocco), dtype=np.uint64)
+
+        frontiera = np.zeros(n, dtype=np.uint64)
+        np.bitwise_or.at(frontiera, blocco, uno << bit)
+        visitati = frontiera.copy()
+        matrice[primo + np.arange(len(blocco)), blocco] = 0
+
+        livello = 0
+        while len(origini) and (max_passi is None or livello < max_passi):
+            livello += 1
+
+            raggiunti = np.zeros(n, dtype=np.uint64)
+            raggiunti[con_archi] = np.bitwise_or.reduceat(frontiera[origini], inizi)
+
+            frontiera = raggiunti & ~visitati
+            nodi = np.flatnonzero(frontiera)
+            if len(nodi) == 0:
+                break
+            visitati |= frontiera
+
+            # Scrivo il livello nelle righe delle sorgenti che hanno
+            # raggiunto ciascun nodo per la prima volta
+            parole = frontiera[nodi]
+            for b in range(len(blocco)):
+                colpiti = nodi[((parole >> bit[b]) & uno) != 0]
+                if len(colpiti):
+                    matrice[primo + b, colpiti] = livello
+
+    return matrice
+
+
+def distanze_costi(grafo_compatto, sorgenti):
+    """
+    Costi minimi (Dijkstra) da ogni sorgente a ogni nodo, come matrice
+    float64 len(sorgenti) x n con inf per i nodi non raggiunti.
+
+    Con SciPy uso csgraph, che lavora direttamente sugli array CSR;
+    senza, un Dijkstra per sorgente sul grafo compatto.
+    """
+    n = grafo_compatto.numero_nodi()
+    sorgenti = np.asarray(sorgenti, dtype=np.int64)
+
+    if _dijkstra_scipy is not None:
+        adiacenza = csr_matrix(
+            (
+                np.asarray(grafo_compatto.costi, dtype=np.float64),
+                np.asarray(grafo_compatto.destinazioni),
+                np.asarray(grafo_compatto.offset, dtype=np.int64),
+            ),
+            shape=(n, n),
+        )
+        return np.atleast_2d(_dijkstra_scipy(adiacenza, indices=sorgenti))
+
+    # Importato qui: serve solo senza SciPy
+    from integrazione_kb.euristica_landmark import _dijkstra_compatto
+
+    matrice = np.empty((len(sorgenti), n), dtype=np.float64)
+    for r, s in enumerate(sorgenti):
+        matrice[r] = np.frombuffer(_dijkstra_compatto(grafo_compatto, int(s)), dtype=np.float64)
+    return matrice
+
+
+class MatriceDistanze:
+    """
+    Distanze da un insieme di nodi sorgente a tutti i nodi del grafo,
+    calcolate in blocco con distanze_passi (o distanze_costi se pesate).
+
+    - matrice: array len(sorgenti) x n
+    - righe: nome della sorgente -> riga della matrice
+    - indici: nome del nodo -> colonna della matrice
+    - costo_minimo_arco: i passi moltiplicati per questo valore sono
+      una stima per difetto del costo, quindi un'euristica ammissibile
+
+    Il grafo di costruisci_grafo è simmetrico, quindi la distanza da
+    una sorgente a un nodo è anche quella dal nodo alla sorgente.
+    """
+
+    def __init__(self, grafo, sorgenti, pesate=False, max_passi=None):
+        compatto = grafo if hasattr(grafo, "offset") else compila_grafo(grafo)
+        self.costo_minimo_arco = min(compatto.costi, default=1.0)
+
+        self.indici = {compatto.nome(i): i for i in range(compatto.numero_nodi())}
+        self.righe = {}
+        ids = []
+        for nome in sorgenti:
+            if nome in self.indici and nome not in self.righe:
+                self.righe[nome] = len(ids)
+                ids.append(self.indici[nome])
+
+        if pesate:
+            self.matrice = distanze_costi(compatto, ids)
+            self.irraggiungibile = np.inf
+        else:
+            self.matrice = distanze_passi(compatto, ids, max_passi)
+            self.irraggiungibile = np.iinfo(self.matrice.dtype).max
+
+    def distanza(self, sorgente, nodo):
+        """
+        Distanza tra sorgente e nodo, oppure None se non è nota
+        (sorgente non calcolata, nodo sconosciuto o non raggiungibile).
+        """
+        riga = self.righe.get(sorgente)
+        colonna = self.indici.get(nodo)
+        if riga is None or colonna is None:
+            return None
+
+        d = self.matrice[riga, colonna]
+        if d == self.irraggiungibile:
+            return None
+        return float(d)
+
+    def funzione_verso(self, obiettivo, fattore=1.0, predefinito=1.0):
+        """
+        Funzione h(stato) con la distanza tra stato e obiettivo,
+        moltiplicata per fattore. La riga viene convertita una volta
+        in lista Python, così ogni chiamata è una lettura senza
+        passare da numpy.
+        """
+        riga = self.righe.get(obiettivo)
+        if riga is None:
+            return lambda s: 0.0 if s == obiettivo else predefinito
+
+        valori = [
+            predefinito if d == self.irraggiungibile else d * fattore
+            for d in self.matrice[riga].tolist()
+        ]
+        indici = self.indici
+        return lambda s: valori[indici[s]] if s in indici else predefinito
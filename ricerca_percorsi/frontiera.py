@@ -0,0 +1,195 @@
+import heapq
+from collections import deque
+from fractions import Fraction
+from functools import partial
+from math import gcd
+
+
+class FrontieraHeap:
+    """
+    Frontiera classica: coda di priorità su heap binario.
+
+    Le voci sono tuple (f, contatore, ...): si ordinano per f e,
+    a parità di f, per ordine di inserimento. Funziona con costi
+    qualsiasi.
+    """
+
+    __slots__ = ("voci", "inserisci", "estrai")
+
+    def __init__(self):
+        self.voci = []
+        # Legati direttamente alle funzioni C di heapq: nessun costo extra
+        self.inserisci = partial(heapq.heappush, self.voci)
+        self.estrai = partial(heapq.heappop, self.voci)
+
+    def __len__(self):
+        return len(self.voci)
+
+
+class FrontieraBucket:
+    """
+    Coda a secchi (algoritmo di Dial) per priorità multiple di un quanto.
+
+    Il secchio k contiene le voci con f = k * quanto, in ordine di
+    inserimento: l'ordine di estrazione è quindi lo stesso di
+    FrontieraHeap, ma inserimento ed estrazione costano O(1)
+    invece di O(log n).
+
+    I secchi coprono solo l'intervallo di f delle voci presenti (il primo
+    è quello della f più piccola inserita dopo l'ultima volta in cui la
+    frontiera era vuota) e quelli già svuotati in testa vengono scartati:
+    la memoria dipende dall'ampiezza dell'intervallo, non dal valore di f.
+
+    Se arriva una priorità che non è multipla del quanto (ad esempio
+    da un'euristica con valori arbitrari), o se l'intervallo diventa
+    troppo ampio rispetto al numero di voci, tutte le voci passano in
+    un heap binario e la frontiera continua a funzionare da lì.
+    """
+
+    # Secchi ammessi: MIN_SECCHI più SECCHI_PER_VOCE per ogni voce presente.
+    # Oltre, quasi tutti i secchi sarebbero vuoti e conviene l'heap.
+    MIN_SECCHI = 1024
+    SECCHI_PER_VOCE = 8
+
+    def __init__(self, quanto):
+        self.quanto = quanto
+        self.secchi = []
+        self.base = 0      # f / quanto del secchio in posizione 0
+        self.inizio = 0    # nessun secchio prima di questa posizione ha voci
+        self.dimensione = 0
+        self.heap = None
+
+    def __len__(self):
+        if self.heap is not None:
+            return len(self.heap)
+        return self.dimensione
+
+    def _passa_a_heap(self):
+        voci = []
+        for secchio in self.secchi[self.inizio:]:
+            voci.extend(secchio)
+        heapq.heapify(voci)
+        self.heap = voci
+        self.secchi = []
+
+    def inserisci(self, voce):
+        if self.heap is not None:
+            heapq.heappush(self.heap, voce)
+            return
+
+        priorita = voce[0]
+        k = priorita / self.quanto
+
+        # k deve essere un intero esatto
+        if not (0 <= k < float("inf")) or k != int(k):
+            self._passa_a_heap()
+            heapq.heappush(self.heap, voce)
+            return
+
+        k = int(k)
+        secchi = self.secchi
+
+        if self.dimensione == 0:
+            secchi.clear()
+            self.base = k
+            self.inizio = 0
+
+        posizione = k - self.base
+        if posizione < 0:
+            nuovi = -posizione
+        else:
+            nuovi = max(0, posizione + 1 - len(secchi))
+
+        if nuovi:
+            if len(secchi) + nuovi > self.MIN_SECCHI + self.SECCHI_PER_VOCE * self.dimensione:
+                self._passa_a_heap()
+                heapq.heappush(self.heap, voce)
+                return
+
+            if posizione < 0:
+                # Con euristiche non consistenti f può anche scendere
+                secchi[0:0] = [deque() for _ in range(nuovi)]
+                self.base = k
+                self.inizio += nuovi
+                posizione = 0
+            else:
+                secchi.extend(deque() for _ in range(nuovi))
+
+        secchi[posizione].append(voce)
+        self.dimensione += 1
+
+        if posizione < self.inizio:
+            self.inizio = posizione
+
+    def estrai(self):
+        if self.heap is not None:
+            return heapq.heappop(self.heap)
+
+        if self.dimensione == 0:
+            raise IndexError("estrai da una frontiera vuota")
+
+        secchi = self.secchi
+        k = self.inizio
+        while not secchi[k]:
+            k += 1
+
+        # Scarto i secchi vuoti in testa quando sono la maggior parte
+        if k > self.MIN_SECCHI and 2 * k > len(secchi):
+            del secchi[:k]
+            self.base += k
+            k = 0
+        self.inizio = k
+
+        self.dimensione -= 1
+        return secchi[k].popleft()
+
+
+def quanto_costi(grafo, max_denominatore=1024):
+    """
+    Cerca il più grande quanto q tale che tutti i costi degli archi
+    siano multipli interi di q (per costruisci_grafo: 0.5).
+
+    Restituisce None se i costi non sono "discreti", cioè se servirebbe
+    un quanto con denominatore più grande di max_denominatore.
+    """
+    numeratore = 0
+    denominatore = 1
+
+    for vicini in grafo.values():
+        for costo in vicini.values():
+            frazione = Fraction(costo)
+            if frazione < 0 or frazione.denominator > max_denominatore:
+                return None
+
+            # gcd di due frazioni = gcd dei numeratori / mcm dei denominatori,
+            # dopo averle portate allo stesso denominatore
+            mcm = denominatore * frazione.denominator // gcd(denominatore, frazione.denominator)
+            if mcm > max_denominatore:
+                return None
+
+            numeratore = gcd(
+                numeratore * (mcm // denominatore),
+                frazione.numerator * (mcm // frazione.denominator)
+            )
+            denominatore = mcm
+
+    if numeratore == 0:
+        return None
+
+    return numeratore / denominatore
+
+
+def scegli_frontiera(grafo):
+    """
+    Restituisce la "fabbrica" di frontiere adatta al grafo,
+    da passare ad a_stella come parametro frontiera.
+
+    Se i costi degli archi sono multipli di un quanto comune
+    uso la coda a secchi, altrimenti l'heap binario.
+    Il controllo scorre tutti gli archi: va fatto una volta per grafo,
+    non una volta per ricerca.
+    """
+    quanto = quanto_costi(grafo)
+    if quanto is None:
+        return FrontieraHeap
+    return partial(FrontieraBucket, quanto)
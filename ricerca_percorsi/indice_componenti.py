@@ -0,0 +1,203 @@
+import heapq
+from collections import deque
+
+
+# Versione del modo di etichettare le componenti, per le etichette salvate
+VERSIONE_COMPONENTI = 1
+
+
+class IndiceComponenti:
+    """
+    Etichetta ogni nodo con la sua componente connessa.
+
+    Con l'indice, capire se due nodi sono collegati è un confronto tra
+    due etichette: una ricerca tra componenti diverse può essere
+    rifiutata subito, invece di esplorare tutta la componente della
+    partenza prima di arrendersi.
+
+    - componente: nodo -> id della componente
+    - membri: id -> insieme dei nodi della componente
+
+    Presuppone un grafo simmetrico, come quello di costruisci_grafo.
+    Può essere registrato come osservatore di AggiornatoreGrafo
+    (metodo aggiorna) per restare allineato alle modifiche.
+    """
+
+    def __init__(self, grafo):
+        self.grafo = grafo
+        self.componente = {}
+        self.membri = {}
+        self._prossimo_id = 0
+
+        for nodo in grafo:
+            if nodo not in self.componente:
+                self._etichetta(self._visita(nodo))
+
+    @classmethod
+    def da_etichette(cls, grafo, componente):
+        """
+        Ricompone l'indice dalle etichette (nodo -> id) di un indice
+        costruito sullo stesso grafo, senza visitarlo.
+        """
+        indice = cls.__new__(cls)
+        indice.grafo = grafo
+        indice.componente = dict(componente)
+        indice.membri = {}
+        for nodo, id_componente in indice.componente.items():
+            indice.membri.setdefault(id_componente, set()).add(nodo)
+        indice._prossimo_id = max(indice.membri, default=0)
+        return indice
+
+    def _nuovo_id(self):
+        self._prossimo_id += 1
+        return self._prossimo_id
+
+    def _visita(self, partenza):
+        """
+        Nodi raggiungibili da partenza (BFS).
+        """
+        grafo = self.grafo
+        visti = {partenza}
+        coda = deque([partenza])
+        while coda:
+            for vicino in grafo.get(coda.popleft(), ()):
+                if vicino not in visti:
+                    visti.add(vicino)
+                    coda.append(vicino)
+        return visti
+
+    def _etichetta(self, nodi):
+        """
+        Assegna ai nodi una nuova componente, togliendoli da quelle vecchie.
+        """
+        nuovo = self._nuovo_id()
+        for nodo in nodi:
+            vecchio = self.componente.get(nodo)
+            if vecchio is not None:
+                self._togli(nodo, vecchio)
+            self.componente[nodo] = nuovo
+        self.membri[nuovo] = set(nodi)
+
+    def _togli(self, nodo, id_componente):
+        membri = self.membri[id_componente]
+        membri.discard(nodo)
+        if not membri:
+            del self.membri[id_componente]
+
+    def _unisci(self, a, b):
+        """
+        Unisce le componenti di a e b rietichettando la più piccola.
+        """
+        ca = self.componente[a]
+        cb = self.componente[b]
+        if ca == cb:
+            return
+
+        if len(self.membri[ca]) < len(self.membri[cb]):
+            ca, cb = cb, ca
+
+        spostati = self.membri.pop(cb)
+        for nodo in spostati:
+            self.componente[nodo] = ca
+        self.membri[ca] |= spostati
+
+    def _separa_se_serve(self, a, b):
+        """
+        Dopo la rimozione dell'arco (a, b) controlla se a e b sono ancora
+        collegati, con due BFS alternate che si fermano appena si
+        incontrano. Se una delle due si esaurisce prima, quello che ha
+        visitato è una componente a sé e riceve una nuova etichetta:
+        il lavoro è proporzionale alla parte più piccola.
+        """
+        grafo = self.grafo
+        lati = []
+        for partenza in (a, b):
+            lati.append(({partenza}, deque([partenza])))
+
+        while True:
+            for i, (visti, coda) in enumerate(lati):
+                altri = lati[1 - i][0]
+
+                if not coda:
+                    self._etichetta(visti)
+                    return
+
+                for vicino in grafo.get(coda.popleft(), ()):
+                    if vicino in altri:
+                        return
+                    if vicino not in visti:
+                        visti.add(vicino)
+                        coda.append(vicino)
+
+    def aggiorna(self, modifiche):
+        """
+        Osservatore per AggiornatoreGrafo.
+
+        Il grafo è già nello stato finale: tolgo i nodi spariti, controllo
+        se gli archi rimossi hanno diviso una componente, poi aggiungo
+        i nodi nuovi e unisco le componenti collegate dagli archi nuovi.
+        I costi modificati non cambiano la connettività.
+
+        Ogni pezzo di una componente divisa contiene almeno un estremo
+        ancora presente di un arco rimosso (anche quando l'altro estremo
+        è un nodo sparito, ad esempio un individuo rimosso che teneva
+        unito il grafo). Per questo confronto tra loro tutti questi estremi:
+        alla fine due estremi con la stessa etichetta sono collegati, e
+        quindi lo sono anche tutti i nodi con la stessa etichetta.
+        """
+        for nodo in modifiche.nodi_rimossi:
+            id_componente = self.componente.pop(nodo, None)
+            if id_componente is not None:
+                self._togli(nodo, id_componente)
+
+        estremi = {}
+        for a, b in modifiche.archi_rimossi:
+            for x in (a, b):
+                if x in self.grafo and x in self.componente:
+                    estremi[x] = None
+
+        # Un rappresentante per etichetta tra gli estremi già controllati:
+        # ogni estremo viene confrontato solo con quello della sua etichetta
+        rappresentanti = {}
+        for nodo in estremi:
+            rappresentante = rappresentanti.get(self.componente[nodo])
+            if rappresentante is not None:
+                self._separa_se_serve(rappresentante, nodo)
+                rappresentanti[self.componente[rappresentante]] = rappresentante
+            rappresentanti[self.componente[nodo]] = nodo
+
+        for nodo in modifiche.nodi_aggiunti:
+            if nodo not in self.componente and nodo in self.grafo:
+                self._etichetta([nodo])
+
+        for a, b in modifiche.archi_aggiunti:
+            self._unisci(a, b)
+
+    def collegati(self, a, b):
+        """
+        True se esiste un percorso tra a e b.
+        """
+        ca = self.componente.get(a)
+        return ca is not None and ca == self.componente.get(b)
+
+    def dimensione(self, nodo):
+        """
+        Numero di nodi nella componente del nodo (0 se non è nel grafo).
+        """
+        id_componente = self.componente.get(nodo)
+        if id_componente is None:
+            return 0
+        return len(self.membri[id_componente])
+
+    def numero_componenti(self):
+        return len(self.membri)
+
+    def suggerimenti(self, nodo, limite=15):
+        """
+        Alcuni nodi raggiungibili dal nodo indicato, in ordine alfabetico,
+        letti dalla sua componente senza visitare il grafo.
+        """
+        id_componente = self.componente.get(nodo)
+        if id_componente is None:
+            return []
+        return heapq.nsmallest(limite, (n for n in self.membri[id_componente] if n != nodo))
@@ -7,8 +7,13 @@ class NodoRicerca:
     - padre: riferimento al nodo precedente nel percorso
     - azione: non usata qui, ma mantenuta per generalità
     - costo_g: costo accumulato dalla radice fino a questo nodo
+
+    Con __slots__ ogni nodo occupa molta meno memoria
+    (niente __dict__ per istanza).
     """
 
+    __slots__ = ("stato", "padre", "azione", "costo_g")
+
     def __init__(self, stato, padre=None, azione=None, costo_g=0.0):
         self.stato = stato
         self.padre = padre
@@ -29,3 +34,20 @@ class NodoRicerca:
 
         percorso.reverse()
         return percorso
+
+
+def ricostruisci_da_padri(padri, stato):
+    """
+    Ricostruisce il percorso fino a stato usando la tabella dei padri
+    (stato -> stato precedente, None per la radice).
+    """
+
+    percorso = []
+    stato_corrente = stato
+
+    while stato_corrente is not None:
+        percorso.append(stato_corrente)
+        stato_corrente = padri[stato_corrente]
+
+    percorso.reverse()
+    return percorso
@@ -14,7 +14,9 @@ class ProblemaBiblioteca:
         self,
         grafo: Dict[str, Dict[str, float]],
         nodo_iniziale: str,
-        obiettivi: Set[str]
+        obiettivi: Set[str],
+        sottoalbero=None,
+        componenti=None
     ):
 
         # Salvo il grafo costruito a partire dall'ontologia
@@ -26,6 +28,15 @@ class ProblemaBiblioteca:
         # Insieme degli stati obiettivo
         self.obiettivi = set(str(o) for o in obiettivi)
 
+        # Obiettivi descritti da una categoria invece che elencati
+        # (ObiettivoSottoalbero): sono obiettivi anche i nodi che
+        # contiene, senza doverli mettere tutti in self.obiettivi
+        self.sottoalbero = sottoalbero
+
+        # Indice delle componenti connesse (IndiceComponenti), facoltativo:
+        # permette di scartare subito gli obiettivi irraggiungibili
+        self.componenti = componenti
+
     def stato_iniziale(self) -> str:
         """
         Restituisce lo stato di partenza.
@@ -36,7 +47,34 @@ class ProblemaBiblioteca:
         """
         Verifica se lo stato corrente è uno degli obiettivi.
         """
-        return str(stato) in self.obiettivi
+        stato = str(stato)
+        if stato in self.obiettivi:
+            return True
+        return self.sottoalbero is not None and stato in self.sottoalbero
+
+    def e_irraggiungibile(self) -> bool:
+        """
+        True se si sa già, senza cercare, che nessun obiettivo è
+        raggiungibile: tutti stanno in componenti diverse da quella
+        dello stato iniziale. Senza indice (o con un sottoalbero, i cui
+        obiettivi non vengono elencati) la risposta è sempre False.
+        """
+        if self.componenti is None or self.sottoalbero is not None:
+            return False
+        if self.nodo_iniziale in self.obiettivi:
+            return False
+
+        collegati = self.componenti.collegati
+        return not any(collegati(self.nodo_iniziale, o) for o in self.obiettivi)
+
+    def tutti_obiettivi(self) -> Set[str]:
+        """
+        Obiettivi elencati più quelli del sottoalbero, per gli algoritmi
+        che devono conoscerli tutti (ad esempio per partire da essi).
+        """
+        if self.sottoalbero is None:
+            return self.obiettivi
+        return self.obiettivi | set(self.sottoalbero.elenca())
 
     def successori(self, stato: str) -> Iterable[Tuple[str, float]]:
         """
@@ -47,3 +85,13 @@ class ProblemaBiblioteca:
 
         for vicino, costo in vicini.items():
             yield str(vicino), float(costo)
+
+    def predecessori(self, stato: str) -> Iterable[Tuple[str, float]]:
+        """
+        Restituisce gli stati da cui si arriva allo stato indicato,
+        insieme al costo dell'arco.
+
+        Il grafo di costruisci_grafo è simmetrico, quindi coincidono
+        con i successori: serve alla ricerca bidirezionale.
+        """
+        return self.successori(stato)
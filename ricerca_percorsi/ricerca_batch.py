@@ -0,0 +1,123 @@
+import heapq
+from collections import defaultdict
+
+
+def _ricostruisci(padri, obiettivo):
+    percorso = []
+    nodo = obiettivo
+    while nodo is not None:
+        percorso.append(nodo)
+        nodo = padri[nodo]
+    percorso.reverse()
+    return percorso
+
+
+def dijkstra_verso_obiettivi(grafo, sorgente, obiettivi):
+    """
+    Una sola visita di Dijkstra dalla sorgente che si ferma
+    appena tutti gli obiettivi richiesti hanno la distanza definitiva.
+
+    Restituisce (distanze, padri) limitati ai nodi visitati:
+    gli obiettivi assenti da distanze non sono raggiungibili.
+    """
+    mancanti = set(obiettivi)
+
+    distanze = {sorgente: 0.0}
+    padri = {sorgente: None}
+    definitivi = set()
+
+    coda = [(0.0, 0, sorgente)]
+    contatore = 0
+
+    while coda and mancanti:
+        costo_g, _, corrente = heapq.heappop(coda)
+
+        if corrente in definitivi:
+            continue
+        definitivi.add(corrente)
+        mancanti.discard(corrente)
+
+        if not mancanti:
+            break
+
+        for vicino, costo_arco in grafo.get(corrente, {}).items():
+            nuovo_costo = costo_g + costo_arco
+            costo_migliore = distanze.get(vicino)
+
+            if costo_migliore is None or nuovo_costo < costo_migliore:
+                distanze[vicino] = nuovo_costo
+                padri[vicino] = corrente
+                contatore += 1
+                heapq.heappush(coda, (nuovo_costo, contatore, vicino))
+
+    # Tengo solo le distanze definitive: le altre potrebbero ancora scendere
+    distanze = {n: d for n, d in distanze.items() if n in definitivi}
+    return distanze, padri
+
+
+def risolvi_batch(grafo, coppie, ricostruisci_percorsi=True):
+    """
+    Risolve molte coppie (partenza, obiettivo) in una volta.
+
+    Le coppie vengono raggruppate per partenza: per ogni partenza
+    basta una sola visita di Dijkstra, che si ferma quando tutti
+    gli obiettivi di quella partenza sono stati raggiunti.
+
+    Restituisce un dizionario con la stessa terna di a_stella:
+      {(partenza, obiettivo): (percorso, costo_totale, nodi_espansi)}
+    con (None, None, nodi_espansi) per le coppie senza collegamento.
+    Se ricostruisci_percorsi=False il percorso è sempre None.
+
+    nodi_espansi è il numero di nodi resi definitivi dalla visita della
+    partenza: è lo stesso per tutte le coppie che la condividono.
+    """
+    per_sorgente = defaultdict(set)
+    for partenza, obiettivo in coppie:
+        per_sorgente[partenza].add(obiettivo)
+
+    risultati = {}
+
+    for partenza, obiettivi in per_sorgente.items():
+        distanze, padri = dijkstra_verso_obiettivi(grafo, partenza, obiettivi)
+        nodi_espansi = len(distanze)
+
+        for obiettivo in obiettivi:
+            costo = distanze.get(obiettivo)
+            if costo is None:
+                risultati[(partenza, obiettivo)] = (None, None, nodi_espansi)
+                continue
+
+            percorso = _ricostruisci(padri, obiettivo) if ricostruisci_percorsi else None
+            risultati[(partenza, obiettivo)] = (percorso, float(costo), nodi_espansi)
+
+    return risultati
+
+
+def matrice_distanze(grafo, partenze, obiettivi, ricostruisci_percorsi=False):
+    """
+    Versione molti-a-molti di risolvi_batch.
+
+    Restituisce (distanze, percorsi), dove distanze[i][j] è il costo
+    minimo da partenze[i] a obiettivi[j] (None se irraggiungibile)
+    e percorsi[i][j] il relativo percorso (None se non richiesto).
+    """
+    risultati = risolvi_batch(
+        grafo,
+        ((p, o) for p in partenze for o in obiettivi),
+        ricostruisci_percorsi=ricostruisci_percorsi
+    )
+
+    distanze = []
+    percorsi = []
+
+    for p in partenze:
+        riga_distanze = []
+        riga_percorsi = []
+        for o in obiettivi:
+            percorso, costo, _ = risultati[(p, o)]
+            riga_distanze.append(costo)
+            riga_percorsi.append(percorso)
+        distanze.append(riga_distanze)
+        percorsi.append(riga_percorsi)
+
+    return distanze, percorsi
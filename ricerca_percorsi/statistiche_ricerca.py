@@ -0,0 +1,69 @@
+class StatisticheRicerca:
+    """
+    Contatori raccolti da a_stella quando gli viene passato
+    un oggetto di questo tipo (parametro statistiche).
+
+    - inserimenti / estrazioni: operazioni sulla frontiera
+    - estrazioni_superate: voci estratte ma ignorate perché nel frattempo
+      lo stato era stato raggiunto con un costo migliore
+    - riaperture: stati già espansi raggiunti di nuovo con costo minore
+      (con un'euristica consistente restano a zero)
+    - max_frontiera: numero massimo di voci presenti in frontiera
+    - chiamate_euristica / tempo_euristica: chiamate alla funzione h
+      e tempo totale speso al loro interno (secondi)
+    - tempo_successori: tempo speso a generare i successori (secondi)
+    - tempo_frontiera: tempo speso in inserimenti ed estrazioni (secondi)
+
+    Lo stesso oggetto può essere passato a più ricerche:
+    i contatori si sommano finché non viene chiamato azzera().
+    """
+
+    __slots__ = (
+        "inserimenti",
+        "estrazioni",
+        "estrazioni_superate",
+        "riaperture",
+        "max_frontiera",
+        "chiamate_euristica",
+        "tempo_euristica",
+        "tempo_successori",
+        "tempo_frontiera",
+    )
+
+    def __init__(self):
+        self.azzera()
+
+    def azzera(self):
+        self.inserimenti = 0
+        self.estrazioni = 0
+        self.estrazioni_superate = 0
+        self.riaperture = 0
+        self.max_frontiera = 0
+        self.chiamate_euristica = 0
+        self.tempo_euristica = 0.0
+        self.tempo_successori = 0.0
+        self.tempo_frontiera = 0.0
+
+    def in_dizionario(self):
+        """
+        Restituisce i contatori con i nomi delle colonne dei risultati
+        (tempi in millisecondi).
+        """
+        return {
+            "inserimenti": self.inserimenti,
+            "estrazioni": self.estrazioni,
+            "estrazioni_superate": self.estrazioni_superate,
+            "riaperture": self.riaperture,
+            "max_frontiera": self.max_frontiera,
+            "chiamate_euristica": self.chiamate_euristica,
+            "tempo_euristica_ms": self.tempo_euristica * 1000.0,
+            "tempo_successori_ms": self.tempo_successori * 1000.0,
+            "tempo_frontiera_ms": self.tempo_frontiera * 1000.0,
+        }
+
+    @classmethod
+    def colonne(cls):
+        """
+        Nomi delle colonne prodotte da in_dizionario.
+        """
+        return list(cls().in_dizionario().keys())
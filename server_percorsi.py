@@ -0,0 +1,415 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from integrazione_kb.cache_grafo import carica_grafo_biblioteca
+from integrazione_kb.costruisci_grafo import TIPO_CATEGORIA
+from integrazione_kb.euristiche_biblioteca import EuristicaTassonomia
+from integrazione_kb.euristica_landmark import EuristicaLandmark
+from ricerca_percorsi.cache_indici import carica_indice_componenti, carica_indice_contrazione
+from ricerca_percorsi.problema_biblioteca import ProblemaBiblioteca
+from ricerca_percorsi.algoritmo_a_stella import a_stella
+from ricerca_percorsi.algoritmo_bidirezionale import ricerca_bidirezionale
+from ricerca_percorsi.frontiera import scegli_frontiera
+from ricerca_percorsi.ricerca_batch import risolvi_batch
+from valutazione_sperimentale.harness_benchmark import percentile
+
+
+STRATEGIE = ["nulla", "base", "informata", "landmark", "bidirezionale", "contrazione"]
+
+# Latenze conservate per il calcolo dei percentili
+MAX_LATENZE = 10_000
+
+
+# Grafo e tabelle delle euristiche, caricati una volta sola.
+# Come nel runner, vengono impostati prima di creare il pool:
+# con "fork" i worker li ereditano senza copiarli.
+_CONTESTO = None
+
+
+class ContestoServer:
+    """
+    Tutto ciò che serve per rispondere alle richieste,
+    preparato all'avvio del server.
+    """
+
+    def __init__(self, percorso_owl, con_contrazione=True):
+        dati = carica_grafo_biblioteca(percorso_owl)
+
+        self.grafo = dati["grafo"]
+        self.tipi = dati["tipi"]
+        self.componenti = carica_indice_componenti(percorso_owl, self.grafo)
+        self.frontiera = scegli_frontiera(self.grafo)
+        self.euristica_tassonomia = EuristicaTassonomia(self.grafo, self.tipi)
+        self.euristica_landmark = EuristicaLandmark(self.grafo)
+        self.indice_contrazione = None
+        if con_contrazione:
+            self.indice_contrazione = carica_indice_contrazione(percorso_owl, self.grafo)
+
+    def funzione_euristica(self, strategia, obiettivi):
+        """
+        Euristica per A*. Con più obiettivi uso il minimo
+        delle stime verso ciascuno, che resta ammissibile.
+        """
+        if strategia == "nulla":
+            return lambda s: 0.0
+
+        if strategia == "base":
+            return lambda s: 0.0 if s in obiettivi else 1.0
+
+        if strategia == "informata":
+            # Come in main.py: la tassonomia aiuta solo verso le categorie
+            if all(self.tipi.get(o) == TIPO_CATEGORIA for o in obiettivi):
+                funzioni = [self.euristica_tassonomia.funzione_per(o) for o in obiettivi]
+            else:
+                return lambda s: 0.0 if s in obiettivi else 1.0
+        else:
+            funzioni = [self.euristica_landmark.funzione_per(o) for o in obiettivi]
+
+        if len(funzioni) == 1:
+            return funzioni[0]
+        return lambda s: min(f(s) for f in funzioni)
+
+
+def _imposta_contesto(contesto):
+    global _CONTESTO
+    _CONTESTO = contesto
+
+
+def _risposta(percorso, costo, nodi_espansi, strategia):
+    return {
+        "trovato": percorso is not None,
+        "percorso": percorso,
+        "costo": costo,
+        "nodi_espansi": nodi_espansi,
+        "strategia": strategia,
+    }
+
+
+def risolvi_richiesta(partenza, obiettivi, strategia):
+    """
+    Risolve una singola richiesta, già validata, con il contesto caricato.
+    """
+    contesto = _CONTESTO
+    problema = ProblemaBiblioteca(contesto.grafo, partenza, set(obiettivi), componenti=contesto.componenti)
+
+    if strategia == "bidirezionale":
+        risultato = ricerca_bidirezionale(problema)
+    elif strategia == "contrazione" and contesto.indice_contrazione is not None:
+        risultato = contesto.indice_contrazione.ricerca(problema)
+    else:
+        funzione_h = contesto.funzione_euristica(strategia, problema.obiettivi)
+        risultato = a_stella(problema, funzione_h, contesto.frontiera)
+
+    return _risposta(*risultato, strategia)
+
+
+def risolvi_lotto(lotto):
+    """
+    Risolve un lotto di richieste (partenza, obiettivi, strategia)
+    e restituisce le risposte nello stesso ordine.
+
+    Le richieste "nulla" con un solo obiettivo sono semplici cammini
+    minimi: le raggruppo e le risolvo con risolvi_batch, che fa una sola
+    visita di Dijkstra per ogni partenza distinta. Le coppie in componenti
+    diverse restano fuori: farebbero visitare alla ricerca l'intera
+    componente della partenza.
+    """
+    risposte = [None] * len(lotto)
+    coppie = defaultdict(list)
+    collegati = _CONTESTO.componenti.collegati
+
+    for i, (partenza, obiettivi, strategia) in enumerate(lotto):
+        if strategia == "nulla" and len(obiettivi) == 1:
+            if partenza != obiettivi[0] and not collegati(partenza, obiettivi[0]):
+                risposte[i] = _risposta(None, None, 0, "nulla")
+            else:
+                coppie[(partenza, obiettivi[0])].append(i)
+        else:
+            risposte[i] = risolvi_richiesta(partenza, obiettivi, strategia)
+
+    if coppie:
+        risultati = risolvi_batch(_CONTESTO.grafo, coppie.keys())
+        for coppia, posizioni in coppie.items():
+            for i in posizioni:
+                risposte[i] = _risposta(*risultati[coppia], "nulla")
+
+    return risposte
+
+
+class ServerPercorsi:
+    """
+    Servizio di ricerca dei percorsi sempre attivo.
+
+    Protocollo: una richiesta JSON per riga, una risposta JSON per riga.
+      {"id": 1, "partenza": "Anna", "obiettivo": "cat_Storia", "euristica": "landmark"}
+      {"id": 2, "partenza": "Anna", "obiettivi": ["LibroAI", "LibroML"]}
+      {"tipo": "statistiche"}
+    Le risposte riportano lo stesso "id" e possono arrivare in ordine
+    diverso da quello delle richieste.
+
+    Le richieste che arrivano nella stessa finestra di tempo (finestra_ms)
+    vengono riunite in un lotto di al massimo max_lotto richieste, risolto
+    da un processo del pool. I lotti in lavorazione sono al massimo
+    max_lotti_attivi: oltre, le richieste aspettano in coda.
+    """
+
+    def __init__(self, contesto, workers=2, finestra_ms=2.0, max_lotto=64, max_lotti_attivi=None):
+        self.contesto = contesto
+        self.workers = workers
+        self.finestra = finestra_ms / 1000.0
+        self.max_lotto = max_lotto
+        self.max_lotti_attivi = max_lotti_attivi or max(1, workers) * 2
+
+        self.coda = None
+        self.pool = None
+
+        self.avvio = time.time()
+        self.richieste = 0
+        self.errori = 0
+        self.lotti = 0
+        self.richieste_in_lotti = 0
+        self.latenze = deque(maxlen=MAX_LATENZE)
+
+    def _crea_pool(self):
+        _imposta_contesto(self.contesto)
+
+        if self.workers <= 0:
+            return None
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"))
+
+        return ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_imposta_contesto,
+            initargs=(self.contesto,),
+        )
+
+    def valida(self, richiesta):
+        """
+        Restituisce (partenza, obiettivi, strategia) oppure solleva ValueError.
+        """
+        partenza = richiesta.get("partenza")
+        obiettivi = richiesta.get("obiettivi")
+        if obiettivi is None and "obiettivo" in richiesta:
+            obiettivi = [richiesta["obiettivo"]]
+        strategia = richiesta.get("euristica", "landmark")
+
+        if not isinstance(partenza, str) or not obiettivi:
+            raise ValueError("servono 'partenza' e 'obiettivo' (oppure 'obiettivi')")
+        if isinstance(obiettivi, str):
+            obiettivi = [obiettivi]
+        if not isinstance(obiettivi, list) or not all(isinstance(o, str) for o in obiettivi):
+            raise ValueError("'obiettivo' deve essere un nome di nodo e 'obiettivi' una lista non vuota di nomi")
+        if strategia not in STRATEGIE:
+            raise ValueError(f"euristica sconosciuta: {strategia} (valide: {', '.join(STRATEGIE)})")
+        if strategia == "contrazione" and self.contesto.indice_contrazione is None:
+            raise ValueError("il server è stato avviato senza indice di contrazione")
+
+        grafo = self.contesto.grafo
+        for nodo in [partenza, *obiettivi]:
+            if nodo not in grafo:
+                raise ValueError(f"nodo sconosciuto: {nodo}")
+
+        return partenza, tuple(obiettivi), strategia
+
+    async def _ciclo_lotti(self):
+        """
+        Raccoglie le richieste in coda in lotti e li manda al pool.
+        """
+        loop = asyncio.get_running_loop()
+        posti = asyncio.Semaphore(self.max_lotti_attivi)
+
+        # Il loop tiene solo riferimenti deboli ai task: senza questo
+        # insieme un lotto in lavorazione potrebbe essere raccolto dal
+        # garbage collector, lasciando i client in attesa per sempre
+        in_corso = set()
+
+        while True:
+            lotto = [await self.coda.get()]
+            scadenza = loop.time() + self.finestra
+
+            while len(lotto) < self.max_lotto:
+                attesa = scadenza - loop.time()
+                if attesa <= 0:
+                    break
+                try:
+                    lotto.append(await asyncio.wait_for(self.coda.get(), attesa))
+                except asyncio.TimeoutError:
+                    break
+
+            await posti.acquire()
+            compito = loop.create_task(self._esegui_lotto(lotto, posti))
+            in_corso.add(compito)
+            compito.add_done_callback(in_corso.discard)
+
+    async def _esegui_lotto(self, lotto, posti):
+        richieste = [r for r, _ in lotto]
+        try:
+            if self.pool is None:
+                risposte = risolvi_lotto(richieste)
+            else:
+                loop = asyncio.get_running_loop()
+                risposte = await loop.run_in_executor(self.pool, risolvi_lotto, richieste)
+        except Exception as e:
+            for _, futuro in lotto:
+                if not futuro.done():
+                    futuro.set_exception(e)
+        else:
+            for (_, futuro), risposta in zip(lotto, risposte):
+                if not futuro.done():
+                    futuro.set_result(risposta)
+        finally:
+            self.lotti += 1
+            self.richieste_in_lotti += len(lotto)
+            posti.release()
+
+    async def rispondi(self, richiesta):
+        """
+        Elabora una richiesta già decodificata e restituisce la risposta.
+        """
+        t0 = time.perf_counter()
+
+        if richiesta.get("tipo") == "statistiche":
+            return self.statistiche()
+
+        self.richieste += 1
+        try:
+            valida = self.valida(richiesta)
+            futuro = asyncio.get_running_loop().create_future()
+            await self.coda.put((valida, futuro))
+            risposta = dict(await futuro)
+        except Exception as e:
+            self.errori += 1
+            risposta = {"errore": str(e)}
+
+        latenza_ms = (time.perf_counter() - t0) * 1000.0
+        self.latenze.append(latenza_ms)
+        risposta["tempo_ms"] = latenza_ms
+        return risposta
+
+    async def _gestisci_connessione(self, reader, writer):
+        scrittura = asyncio.Lock()
+
+        async def elabora(riga):
+            try:
+                richiesta = json.loads(riga)
+                if not isinstance(richiesta, dict):
+                    raise ValueError("la richiesta deve essere un oggetto JSON")
+            except ValueError as e:
+                self.errori += 1
+                risposta = {"errore": f"richiesta non valida: {e}"}
+            else:
+                risposta = await self.rispondi(richiesta)
+                if "id" in richiesta:
+                    risposta["id"] = richiesta["id"]
+
+            async with scrittura:
+                writer.write(json.dumps(risposta, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        compiti = set()
+        try:
+            while True:
+                riga = await reader.readline()
+                if not riga:
+                    break
+                if not riga.strip():
+                    continue
+                compito = asyncio.create_task(elabora(riga))
+                compiti.add(compito)
+                compito.add_done_callback(compiti.discard)
+
+            if compiti:
+                await asyncio.gather(*compiti, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def statistiche(self):
+        latenze = list(self.latenze)
+        return {
+            "attivo_da_s": time.time() - self.avvio,
+            "richieste": self.richieste,
+            "errori": self.errori,
+            "lotti": self.lotti,
+            "richieste_per_lotto": self.richieste_in_lotti / self.lotti if self.lotti else 0.0,
+            "in_coda": self.coda.qsize() if self.coda is not None else 0,
+            "workers": self.workers,
+            "latenza_ms": {
+                "campioni": len(latenze),
+                "p50": percentile(latenze, 50),
+                "p90": percentile(latenze, 90),
+                "p99": percentile(latenze, 99),
+                "max": max(latenze) if latenze else None,
+            },
+        }
+
+    async def servi(self, host="127.0.0.1", porta=8765, socket_unix=None):
+        self.coda = asyncio.Queue()
+        self.pool = self._crea_pool()
+
+        if socket_unix is not None:
+            server = await asyncio.start_unix_server(self._gestisci_connessione, path=str(socket_unix))
+            indirizzo = str(socket_unix)
+        else:
+            server = await asyncio.start_server(self._gestisci_connessione, host, porta)
+            indirizzo = f"{host}:{porta}"
+
+        ciclo = asyncio.create_task(self._ciclo_lotti())
+        print(f"Server in ascolto su {indirizzo} (worker: {self.workers}).")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            ciclo.cancel()
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+
+
+def leggi_argomenti():
+    parser = argparse.ArgumentParser(description="Server locale per la ricerca di percorsi nella biblioteca.")
+    parser.add_argument("--ontologia", type=Path, default=Path("ontologia") / "biblioteca.owl")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--socket", type=Path, default=None, help="socket Unix da usare al posto di host/porta")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="processi per le ricerche (0 = nel processo del server)")
+    parser.add_argument("--finestra-ms", type=float, default=2.0, help="attesa massima per formare un lotto")
+    parser.add_argument("--max-lotto", type=int, default=64)
+    parser.add_argument("--senza-contrazione", action="store_true",
+                        help="non preparare l'indice a gerarchie di contrazione")
+    return parser.parse_args()
+
+
+def main():
+    args = leggi_argomenti()
+
+    print("Carico il grafo e preparo le euristiche...")
+    contesto = ContestoServer(args.ontologia, con_contrazione=not args.senza_contrazione)
+    print(f"Grafo pronto: {len(contesto.grafo)} nodi.")
+
+    server = ServerPercorsi(
+        contesto,
+        workers=args.workers,
+        finestra_ms=args.finestra_ms,
+        max_lotto=args.max_lotto,
+    )
+
+    try:
+        asyncio.run(server.servi(args.host, args.porta, args.socket))
+    except KeyboardInterrupt:
+        print("\nServer fermato.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+import csv
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from valutazione_sperimentale.harness_benchmark import Z_95
+
+
+# Con pyarrow uso Parquet, altrimenti un npz compresso con una
+# matrice per colonna (le stringhe come codici + categorie).
+ESTENSIONE = ".parquet" if pyarrow is not None else ".npz"
+
+CHIAVI = ["nodo_iniziale", "nodo_obiettivo", "euristica"]
+
+# Colonne di testo con pochi valori distinti: le salvo come categorie
+COLONNE_CATEGORIA = CHIAVI + ["percorso"]
+
+# Oltre questo numero di parti l'archivio viene riunito in una sola
+MAX_PARTI = 32
+
+# Momenti aggiornati in modo incrementale: colonna -> prefisso nelle statistiche
+MOMENTI = {
+    "tempo_ms": "tempo",
+    "nodi_espansi": "espansi",
+    "costo": "costo",
+}
+
+
+def percorso_archivio(percorso_csv):
+    """
+    risultati/risultati.csv -> risultati/risultati_archivio/
+
+    La cartella contiene le parti dell'archivio (parte_000000.parquet
+    oppure .npz, ...), una per conversione, e stato.npz con quanto
+    del CSV è già stato convertito.
+    """
+    percorso_csv = Path(percorso_csv)
+    return percorso_csv.with_name(percorso_csv.stem + "_archivio")
+
+
+def salva_colonne(df, percorso):
+    percorso = Path(percorso)
+
+    if percorso.suffix == ".parquet":
+        df.to_parquet(percorso, index=False)
+        return
+
+    matrici = {"__colonne": np.array(list(df.columns), dtype=str)}
+    for colonna in df.columns:
+        serie = df[colonna]
+        if not isinstance(serie.dtype, pd.CategoricalDtype) and not pd.api.types.is_numeric_dtype(serie.dtype):
+            # Testi (ad esempio chiavi uscite da un'unione di indici):
+            # np.load senza pickle non legge array di oggetti
+            serie = serie.astype(str).astype("category")
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            matrici[f"{colonna}__codici"] = serie.cat.codes.to_numpy()
+            matrici[f"{colonna}__categorie"] = serie.cat.categories.to_numpy(dtype=str)
+        else:
+            matrici[colonna] = serie.to_numpy()
+
+    # Il file temporaneo deve finire in .npz, altrimenti numpy lo aggiunge
+    temporaneo = percorso.with_name(percorso.stem + ".tmp.npz")
+    np.savez_compressed(temporaneo, **matrici)
+    temporaneo.replace(percorso)
+
+
+def carica_colonne(percorso, colonne=None):
+    """
+    Legge un archivio scritto da salva_colonne. Con colonne viene
+    letto solo il sottoinsieme indicato (le altre non vengono nemmeno
+    decompresse).
+    """
+    percorso = Path(percorso)
+
+    if percorso.suffix == ".parquet":
+        return pd.read_parquet(percorso, columns=colonne)
+
+    with np.load(percorso, allow_pickle=False) as archivio:
+        presenti = list(archivio["__colonne"])
+        dati = {}
+        for colonna in (presenti if colonne is None else [c for c in colonne if c in presenti]):
+            if f"{colonna}__codici" in archivio:
+                dati[colonna] = pd.Categorical.from_codes(
+                    archivio[f"{colonna}__codici"], archivio[f"{colonna}__categorie"]
+                )
+            else:
+                dati[colonna] = archivio[colonna]
+
+    return pd.DataFrame(dati)
+
+
+def _concatena(parti):
+    """
+    Unisce i DataFrame delle parti. Le colonne categoriche hanno
+    categorie diverse in ogni parte: le unisco, così restano categoriche.
+    """
+    parti = [p for p in parti if len(p.columns)]
+    if not parti:
+        return pd.DataFrame()
+    if len(parti) == 1:
+        return parti[0].reset_index(drop=True)
+
+    dati = {}
+    for colonna in parti[0].columns:
+        serie = [p[colonna] for p in parti]
+        if all(isinstance(s.dtype, pd.CategoricalDtype) for s in serie):
+            dati[colonna] = union_categoricals(serie)
+        else:
+            dati[colonna] = pd.concat(serie, ignore_index=True)
+    return pd.DataFrame(dati)
+
+
+def _leggi_righe(dati, colonne):
+    """
+    Righe CSV (byte, senza intestazione) come DataFrame tipizzato:
+    testi come categorie, trovato come booleano.
+    """
+    tipi = {c: "category" for c in COLONNE_CATEGORIA if c in colonne}
+    df = pd.read_csv(io.BytesIO(dati), header=None, names=colonne, dtype=tipi)
+
+    if df["trovato"].dtype != bool:
+        df["trovato"] = df["trovato"].astype(str).str.lower().isin(["true", "1"])
+    return df
+
+
+def _leggi_stato(cartella, firma, percorso_csv):
+    """
+    Stato della conversione, se vale ancora per il CSV attuale:
+    stessa firma e stessa riga subito prima del punto raggiunto
+    (una ripresa del runner tronca solo dopo quel punto).
+    """
+    percorso_stato = cartella / "stato.npz"
+    if not percorso_stato.exists():
+        return None
+
+    with np.load(percorso_stato, allow_pickle=False) as stato:
+        if str(stato["firma"]) != firma:
+            return None
+        posizione = int(stato["posizione"])
+        ultima = stato["ultima_riga"].tobytes()
+        parti = (int(stato["prima_parte"]), int(stato["parti"]))
+        colonne = list(stato["colonne"])
+
+    if percorso_csv.stat().st_size < posizione:
+        return None
+    with open(percorso_csv, "rb") as f:
+        f.seek(posizione - len(ultima))
+        if f.read(len(ultima)) != ultima:
+            return None
+
+    return {"posizione": posizione, "ultima_riga": ultima, "parti": parti, "colonne": colonne}
+
+
+def _scrivi_stato(cartella, firma, stato):
+    temporaneo = cartella / "stato.tmp.npz"
+    np.savez(
+        temporaneo,
+        firma=np.array(firma),
+        posizione=np.array(stato["posizione"]),
+        ultima_riga=np.frombuffer(stato["ultima_riga"], dtype=np.uint8),
+        prima_parte=np.array(stato["parti"][0]),
+        parti=np.array(stato["parti"][1]),
+        colonne=np.array(stato["colonne"], dtype=str),
+    )
+    temporaneo.replace(cartella / "stato.npz")
+
+
+def _parte(cartella, numero):
+    return cartella / f"parte_{numero:06d}{ESTENSIONE}"
+
+
+def _coda(percorso_csv, posizione):
+    """
+    Byte del CSV da posizione fino all'ultimo a capo (una riga troncata
+    da un'esecuzione in corso resta fuori).
+    """
+    with open(percorso_csv, "rb") as f:
+        f.seek(posizione)
+        dati = f.read()
+    return dati[:dati.rfind(b"\n") + 1]
+
+
+def converti_csv(percorso_csv):
+    """
+    Porta l'archivio a colonne accanto al CSV dei risultati al passo
+    con il CSV e restituisce lo stato della conversione.
+
+    Viene letta solo la parte del CSV aggiunta dopo la conversione
+    precedente, che diventa una nuova parte dell'archivio; quando le
+    parti sono più di MAX_PARTI vengono riunite in una. Se il runner è
+    ripartito da capo (firma diversa) l'archivio viene rifatto.
+
+    Come in aggiorna_statistiche, le righe dell'ultimo id_esperimento
+    restano fuori dall'archivio: il caso potrebbe essere incompleto.
+    """
+    percorso_csv = Path(percorso_csv)
+    cartella = percorso_archivio(percorso_csv)
+    firma = _firma(percorso_csv)
+
+    stato = _leggi_stato(cartella, firma, percorso_csv)
+    if stato is None:
+        cartella.mkdir(exist_ok=True)
+        for vecchia in cartella.glob("parte_*"):
+            vecchia.unlink()
+        with open(percorso_csv, "rb") as f:
+            intestazione = f.readline()
+        colonne = next(csv.reader([intestazione.decode("utf-8")]))
+        stato = {"posizione": len(intestazione), "ultima_riga": intestazione, "parti": (0, 0), "colonne": colonne}
+        _scrivi_stato(cartella, firma, stato)
+
+    dati = _coda(percorso_csv, stato["posizione"])
+    if not dati:
+        return stato
+
+    # I casi arrivano in ordine di id: le righe dell'ultimo sono in fondo
+    df = _leggi_righe(dati, stato["colonne"])
+    id_esperimenti = df["id_esperimento"].to_numpy()
+    completi = int(np.argmax(id_esperimenti == id_esperimenti.max()))
+    if completi == 0:
+        return stato
+
+    # Una riga del CSV per risultato: la riga i finisce all'i-esimo a capo
+    fine_righe = np.flatnonzero(np.frombuffer(dati, dtype=np.uint8) == ord("\n"))
+    taglio = int(fine_righe[completi - 1]) + 1
+    inizio_ultima = int(fine_righe[completi - 2]) + 1 if completi > 1 else 0
+
+    # Le parti valide sono quelle da prima a fine (esclusa) indicate nello
+    # stato: un file scritto oltre fine, da una conversione interrotta
+    # prima di aggiornare lo stato, viene semplicemente sovrascritto
+    prima, fine = stato["parti"]
+    salva_colonne(df.iloc[:completi], _parte(cartella, fine))
+    fine += 1
+
+    vecchie = []
+    if fine - prima > MAX_PARTI:
+        unite = _concatena([carica_colonne(_parte(cartella, i)) for i in range(prima, fine)])
+        salva_colonne(unite, _parte(cartella, fine))
+        vecchie = range(prima, fine)
+        prima, fine = fine, fine + 1
+
+    stato["parti"] = (prima, fine)
+    stato["posizione"] += taglio
+    stato["ultima_riga"] = dati[inizio_ultima:taglio]
+    _scrivi_stato(cartella, firma, stato)
+
+    for numero in vecchie:
+        _parte(cartella, numero).unlink()
+
+    return stato
+
+
+def carica_risultati(percorso_csv, colonne=None):
+    """
+    Risultati del runner come DataFrame tipizzato: le parti dell'archivio
+    più le righe non ancora archiviate (l'ultimo caso), lette dal CSV.
+    """
+    percorso_csv = Path(percorso_csv)
+    stato = converti_csv(percorso_csv)
+    cartella = percorso_archivio(percorso_csv)
+
+    parti = [carica_colonne(_parte(cartella, i), colonne) for i in range(*stato["parti"])]
+
+    coda = _coda(percorso_csv, stato["posizione"])
+    if coda:
+        in_sospeso = _leggi_righe(coda, stato["colonne"])
+        parti.append(in_sospeso if colonne is None else in_sospeso[[c for c in colonne if c in in_sospeso]])
+
+    if not parti:
+        # CSV con la sola intestazione
+        return pd.DataFrame(columns=colonne or stato["colonne"])
+
+    return _concatena(parti)
+
+
+def _firma(percorso_csv):
+    """
+    Intestazione e prima riga del CSV: cambiano quando il runner
+    ricomincia da capo, restano uguali quando riprende o aggiunge righe.
+    """
+    with open(percorso_csv, "rb") as f:
+        return (f.readline() + f.readline()).decode("utf-8", "replace")
+
+
+def _momenti(gruppi, colonna):
+    """
+    Numero di valori, media e somma dei quadrati degli scarti per gruppo.
+    """
+    n = gruppi[colonna].count()
+    media = gruppi[colonna].mean()
+    m2 = (gruppi[colonna].var(ddof=1) * (n - 1)).fillna(0.0)
+    return n, media, m2
+
+
+def _unisci_momenti(na, media_a, m2a, nb, media_b, m2b):
+    """
+    Combina i momenti di due insiemi di campioni (formula di Chan),
+    su intere colonne.
+    """
+    n = na + nb
+    peso_b = np.where(n > 0, nb / np.maximum(n, 1), 0.0)
+    delta = media_b - media_a
+    media = media_a + delta * peso_b
+    m2 = m2a + m2b + delta ** 2 * na * peso_b
+    return n, media, m2
+
+
+def aggrega_nuovi(df):
+    """
+    Statistiche cumulabili per (partenza, obiettivo, euristica) delle righe
+    di df: conteggi, minimo, massimo e, per tempi, nodi espansi e costi,
+    numero di valori, media e M2. Solo aggregazioni vettoriali di pandas.
+    """
+    gruppi = df.groupby(CHIAVI, observed=True, sort=False)
+
+    statistiche = pd.DataFrame({
+        "n": gruppi.size(),
+        "successi": gruppi["trovato"].sum(),
+        "tempo_min": gruppi["tempo_ms"].min(),
+        "tempo_max": gruppi["tempo_ms"].max(),
+    })
+    for colonna, prefisso in MOMENTI.items():
+        n, media, m2 = _momenti(gruppi, colonna)
+        statistiche[f"{prefisso}_n"] = n
+        statistiche[f"{prefisso}_media"] = media.fillna(0.0)
+        statistiche[f"{prefisso}_m2"] = m2
+
+    return statistiche
+
+
+def unisci_statistiche(vecchie, nuove):
+    """
+    Somma due tabelle prodotte da aggrega_nuovi (allineate per chiave).
+    """
+    if vecchie is None or vecchie.empty:
+        return nuove
+    if nuove.empty:
+        return vecchie
+
+    indice = vecchie.index.union(nuove.index)
+    a = vecchie.reindex(indice)
+    b = nuove.reindex(indice)
+
+    unite = pd.DataFrame(index=indice)
+    for colonna in ["n", "successi"]:
+        unite[colonna] = a[colonna].fillna(0) + b[colonna].fillna(0)
+    unite["tempo_min"] = np.fmin(a["tempo_min"], b["tempo_min"])
+    unite["tempo_max"] = np.fmax(a["tempo_max"], b["tempo_max"])
+
+    for prefisso in MOMENTI.values():
+        n, media, m2 = _unisci_momenti(
+            a[f"{prefisso}_n"].fillna(0), a[f"{prefisso}_media"].fillna(0.0), a[f"{prefisso}_m2"].fillna(0.0),
+            b[f"{prefisso}_n"].fillna(0), b[f"{prefisso}_media"].fillna(0.0), b[f"{prefisso}_m2"].fillna(0.0),
+        )
+        unite[f"{prefisso}_n"] = n
+        unite[f"{prefisso}_media"] = media
+        unite[f"{prefisso}_m2"] = m2
+
+    return unite
+
+
+def aggiorna_statistiche(percorso_csv, df=None):
+    """
+    Statistiche cumulative dei risultati, salvate accanto al CSV.
+
+    Vengono aggregate solo le righe con id_esperimento non ancora
+    elaborati; le altre sono già nelle statistiche salvate. Se il runner
+    è ripartito da capo (firma del CSV diversa) si ricomincia da zero.
+
+    Il runner scrive i casi in ordine di id e l'ultimo può essere ancora
+    incompleto (esecuzione interrotta o in corso): le sue righe entrano
+    nel risultato ma non nelle statistiche salvate.
+    Restituisce la tabella delle statistiche indicizzata per CHIAVI.
+    """
+    percorso_csv = Path(percorso_csv)
+    percorso_stat = percorso_csv.with_name(percorso_csv.stem + "_statistiche" + ESTENSIONE)
+    percorso_meta = percorso_csv.with_name(percorso_csv.stem + "_statistiche.meta.npz")
+    firma = _firma(percorso_csv)
+
+    vecchie = None
+    elaborati = np.empty(0, dtype=np.int64)
+    if percorso_stat.exists() and percorso_meta.exists():
+        with np.load(percorso_meta, allow_pickle=False) as meta:
+            if str(meta["firma"]) == firma:
+                elaborati = meta["id"]
+                vecchie = carica_colonne(percorso_stat).set_index(CHIAVI)
+
+    if df is None:
+        df = carica_risultati(percorso_csv, CHIAVI + ["id_esperimento", "trovato", *MOMENTI])
+
+    nuovi = df[~df["id_esperimento"].isin(elaborati)]
+    ultimo = df["id_esperimento"].max()
+    in_sospeso = nuovi["id_esperimento"] == ultimo
+    completi = nuovi[~in_sospeso]
+
+    statistiche = vecchie
+    if vecchie is None or not completi.empty:
+        statistiche = unisci_statistiche(vecchie, aggrega_nuovi(completi))
+        elaborati = np.union1d(elaborati, completi["id_esperimento"].to_numpy())
+
+        salva_colonne(statistiche.reset_index(), percorso_stat)
+        temporaneo = percorso_meta.with_name(percorso_meta.stem + ".tmp.npz")
+        np.savez_compressed(temporaneo, firma=np.array(firma), id=elaborati)
+        temporaneo.replace(percorso_meta)
+
+    return unisci_statistiche(statistiche, aggrega_nuovi(nuovi[in_sospeso]))
+
+
+def tabella_riassuntiva(statistiche):
+    """
+    Dalle statistiche cumulative alle colonne della tabella riassuntiva:
+    medie, deviazioni standard e semiampiezza dell'intervallo di
+    confidenza al 95% (stessa approssimazione di semiampiezza_ic).
+    """
+    s = statistiche
+
+    def deviazione(prefisso):
+        n = s[f"{prefisso}_n"]
+        return np.sqrt(s[f"{prefisso}_m2"] / (n - 1)).where(n > 1, 0.0)
+
+    tempo_std = deviazione("tempo")
+    gradi = (s["tempo_n"] - 1).where(s["tempo_n"] > 1)
+    t = Z_95 * (1 + (Z_95 ** 2 + 1) / (4 * gradi))
+
+    return pd.DataFrame({
+        "n_run": s["n"].astype(np.int64),
+        "successo_pct": 100.0 * s["successi"] / s["n"],
+        "tempo_min_ms": s["tempo_min"],
+        "tempo_medio_ms": s["tempo_media"],
+        "tempo_ic95_ms": t * tempo_std / np.sqrt(s["tempo_n"]),
+        "tempo_std_ms": tempo_std,
+        "espansi_medio": s["espansi_media"],
+        "espansi_std": deviazione("espansi"),
+        "costo_medio": s["costo_media"].where(s["costo_n"] > 0),
+        "costo_std": deviazione("costo"),
+    }, index=s.index)
@@ -0,0 +1,101 @@
+import argparse
+import gc
+import pickle
+import random
+import statistics
+import time
+from pathlib import Path
+
+from integrazione_kb.cache_grafo import carica_grafo_biblioteca
+from ricerca_percorsi.problema_biblioteca import ProblemaBiblioteca
+from ricerca_percorsi.algoritmo_a_stella import a_stella
+from ricerca_percorsi.algoritmo_bidirezionale import ricerca_bidirezionale
+from ricerca_percorsi.contrazione_gerarchie import costruisci_indice
+from valutazione_sperimentale.genera_ontologia_sintetica import carica_workload, grafo_sintetico
+
+
+def latenze(cerca, coppie):
+    """
+    Esegue cerca(partenza, obiettivo) per ogni coppia.
+    Restituisce (latenze in microsecondi, costi trovati).
+    """
+    tempi = []
+    costi = []
+    gc.collect()
+    for start, goal in coppie:
+        t0 = time.perf_counter()
+        _, costo, _ = cerca(start, goal)
+        t1 = time.perf_counter()
+        tempi.append((t1 - t0) * 1e6)
+        costi.append(costo)
+    return tempi, costi
+
+
+def confronta(nome_grafo, grafo, coppie):
+    print(f"\n== {nome_grafo}: {len(grafo)} nodi, {sum(len(v) for v in grafo.values())} archi orientati ==")
+
+    t0 = time.perf_counter()
+    indice = costruisci_indice(grafo)
+    t1 = time.perf_counter()
+
+    n_nucleo = indice.numero_nodi_nucleo()
+    dimensione = len(pickle.dumps(indice, protocol=pickle.HIGHEST_PROTOCOL))
+
+    print(f"Preparazione:   {t1 - t0:.2f} s")
+    print(f"Indice:         {dimensione / 1024:,.0f} KB, {indice.numero_archi()} archi verso l'alto, "
+          f"{indice.numero_scorciatoie()} scorciatoie, {n_nucleo} nodi nel nucleo")
+
+    motori = [
+        ("a_stella", lambda s, g: a_stella(ProblemaBiblioteca(grafo, s, {g}), lambda x: 0.0)),
+        ("bidirezionale", lambda s, g: ricerca_bidirezionale(ProblemaBiblioteca(grafo, s, {g}))),
+        ("contrazione", indice.percorso),
+    ]
+
+    riferimento = None
+    print(f"{'motore':16}{'mediana µs':>14}{'media µs':>14}{'max µs':>14}")
+    for nome, cerca in motori:
+        tempi, costi = latenze(cerca, coppie)
+        if riferimento is None:
+            riferimento = costi
+        elif costi != riferimento:
+            raise AssertionError(f"{nome}: costi diversi da a_stella")
+        print(f"{nome:16}{statistics.median(tempi):>14,.1f}{statistics.mean(tempi):>14,.1f}{max(tempi):>14,.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerarchie di contrazione a confronto con A* e Dijkstra bidirezionale.")
+    parser.add_argument("--persone", type=int, default=2_000)
+    parser.add_argument("--query", type=int, default=200)
+    parser.add_argument("--seme", type=int, default=42)
+    parser.add_argument("--ontologia", type=Path, default=None,
+                        help="ontologia (ad esempio sintetica) da usare al posto del grafo generato in memoria")
+    parser.add_argument("--workload", type=Path, default=None,
+                        help="file JSON di query prodotto da genera_ontologia_sintetica")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seme)
+
+    cartella_progetto = Path(__file__).resolve().parent.parent
+    grafo = carica_grafo_biblioteca(cartella_progetto / "ontologia" / "biblioteca.owl")["grafo"]
+    nodi = list(grafo)
+    coppie = [(rnd.choice(nodi), rnd.choice(nodi)) for _ in range(args.query)]
+    confronta("biblioteca.owl", grafo, coppie)
+
+    if args.ontologia is not None:
+        nome = args.ontologia.name
+        grafo = carica_grafo_biblioteca(args.ontologia)["grafo"]
+    else:
+        nome = "grafo sintetico"
+        grafo = grafo_sintetico(args.persone, seme=args.seme)
+
+    if args.workload is not None:
+        coppie = carica_workload(args.workload)[:args.query]
+    else:
+        nodi = list(grafo)
+        coppie = [(rnd.choice(nodi), rnd.choice(nodi)) for _ in range(args.query)]
+    confronta(nome, grafo, coppie)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import time
+from pathlib import Path
+
+from owlready2 import get_ontology
+
+from integrazione_kb.costruisci_grafo import costruisci_grafo
+from integrazione_kb.euristiche_biblioteca import (
+    EuristicaTassonomia,
+    euristica_informata_tassonomia,
+    _e_categoria,
+)
+from ricerca_percorsi.problema_biblioteca import ProblemaBiblioteca
+from ricerca_percorsi.algoritmo_a_stella import a_stella
+
+
+def misura_query(grafo, coppie, crea_funzione_h):
+    """
+    Esegue A* su tutte le coppie (partenza, obiettivo) e restituisce
+    il tempo medio per query in millisecondi e i risultati ottenuti.
+    """
+    risultati = []
+
+    t0 = time.perf_counter()
+    for start, goal in coppie:
+        problema = ProblemaBiblioteca(grafo, start, {goal})
+        risultati.append(a_stella(problema, crea_funzione_h(goal)))
+    t1 = time.perf_counter()
+
+    return (t1 - t0) * 1000.0 / max(len(coppie), 1), risultati
+
+
+def main():
+
+    print("\nConfronto tra euristica tassonomica originale e precalcolata...\n")
+
+    cartella_progetto = Path(__file__).resolve().parent.parent
+    percorso_owl = cartella_progetto / "ontologia" / "biblioteca.owl"
+
+    ontologia = get_ontology(str(percorso_owl.resolve())).load()
+    grafo = costruisci_grafo(ontologia)
+
+    categorie = [n for n in grafo.keys() if _e_categoria(n)]
+    coppie = [(s, c) for s in grafo.keys() for c in categorie]
+
+    # Controllo preliminare: i valori devono coincidere ovunque
+    t0 = time.perf_counter()
+    euristica = EuristicaTassonomia(grafo)
+    t1 = time.perf_counter()
+
+    for s in grafo.keys():
+        for c in categorie:
+            originale = euristica_informata_tassonomia(grafo, s, c)
+            precalcolata = euristica.stima(s, c)
+            if originale != precalcolata:
+                raise AssertionError(f"Valori diversi per {s} -> {c}: {originale} / {precalcolata}")
+
+    # Per un confronto equo riparto da tabelle vuote
+    euristica = EuristicaTassonomia(grafo)
+
+    ms_originale, ris_originale = misura_query(
+        grafo, coppie,
+        lambda goal: (lambda s: euristica_informata_tassonomia(grafo, s, goal))
+    )
+    ms_precalcolata, ris_precalcolata = misura_query(
+        grafo, coppie,
+        euristica.funzione_per
+    )
+
+    if ris_originale != ris_precalcolata:
+        raise AssertionError("A* restituisce risultati diversi con le due euristiche.")
+
+    print(f"Query eseguite:                 {len(coppie)}")
+    print(f"Costruzione tabelle:            {(t1 - t0) * 1000.0:.3f} ms")
+    print(f"Tempo medio (originale):        {ms_originale:.4f} ms/query")
+    print(f"Tempo medio (precalcolata):     {ms_precalcolata:.4f} ms/query")
+
+    if ms_precalcolata > 0:
+        print(f"Speed-up:                       {ms_originale / ms_precalcolata:.1f}x")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import gc
+import heapq
+import random
+import time
+import tracemalloc
+
+from ricerca_percorsi.problema_biblioteca import ProblemaBiblioteca
+from ricerca_percorsi.algoritmo_a_stella import a_stella
+from ricerca_percorsi.frontiera import FrontieraHeap, scegli_frontiera
+from valutazione_sperimentale.genera_ontologia_sintetica import grafo_sintetico
+
+
+class _NodoConDict:
+    """
+    Nodo di ricerca come era prima di __slots__ (con __dict__).
+    """
+
+    def __init__(self, stato, padre=None, azione=None, costo_g=0.0):
+        self.stato = stato
+        self.padre = padre
+        self.azione = azione
+        self.costo_g = costo_g
+
+
+def a_stella_riferimento(problema, euristica):
+    """
+    Implementazione precedente di a_stella, con un oggetto nodo
+    per ogni inserimento in frontiera. Serve solo per il confronto.
+    """
+    stato_iniziale = problema.stato_iniziale()
+    nodo_iniziale = _NodoConDict(stato_iniziale, None, None, 0.0)
+
+    frontiera = []
+    contatore = 0
+    heapq.heappush(frontiera, (float(euristica(stato_iniziale)), contatore, nodo_iniziale))
+
+    migliori_costi = {stato_iniziale: 0.0}
+    nodi_espansi = 0
+
+    while frontiera:
+        _, _, nodo = heapq.heappop(frontiera)
+
+        costo_conosciuto = migliori_costi.get(nodo.stato)
+        if costo_conosciuto is not None and nodo.costo_g > costo_conosciuto:
+            continue
+
+        if problema.e_goal(nodo.stato):
+            percorso = []
+            corrente = nodo
+            while corrente is not None:
+                percorso.append(corrente.stato)
+                corrente = corrente.padre
+            percorso.reverse()
+            return percorso, float(nodo.costo_g), nodi_espansi
+
+        nodi_espansi += 1
+
+        for stato_successore, costo_arco in problema.successori(nodo.stato):
+            nuovo_costo = nodo.costo_g + float(costo_arco)
+            costo_migliore = migliori_costi.get(stato_successore)
+
+            if costo_migliore is None or nuovo_costo < costo_migliore:
+                migliori_costi[stato_successore] = nuovo_costo
+                nuovo_nodo = _NodoConDict(stato_successore, nodo, None, nuovo_costo)
+                contatore += 1
+                f = nuovo_costo + float(euristica(stato_successore))
+                heapq.heappush(frontiera, (f, contatore, nuovo_nodo))
+
+    return None, None, nodi_espansi
+
+
+def misura(algoritmo, grafo, coppie):
+    """
+    Restituisce (nodi espansi al secondo, picco di memoria in KB, risultati).
+
+    Tempo e memoria vengono misurati in due passate separate,
+    perché tracemalloc rallenta molto l'esecuzione.
+    """
+    euristica = lambda s: 0.0
+
+    gc.collect()
+    espansi = 0
+    risultati = []
+    t0 = time.perf_counter()
+    for start, goal in coppie:
+        r = algoritmo(ProblemaBiblioteca(grafo, start, {goal}), euristica)
+        espansi += r[2]
+        risultati.append(r)
+    t1 = time.perf_counter()
+
+    picco = 0
+    for start, goal in coppie:
+        gc.collect()
+        tracemalloc.start()
+        algoritmo(ProblemaBiblioteca(grafo, start, {goal}), euristica)
+        _, picco_query = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        picco = max(picco, picco_query)
+
+    return espansi / max(t1 - t0, 1e-9), picco / 1024.0, risultati
+
+
+def velocita_frontiera(grafo, coppie, frontiera, ripetizioni=3):
+    """
+    Nodi espansi al secondo con la frontiera indicata
+    (miglior valore su alcune ripetizioni).
+    """
+    euristica = lambda s: 0.0
+    migliore = 0.0
+    risultati = None
+
+    for _ in range(ripetizioni):
+        gc.collect()
+        espansi = 0
+        risultati = []
+        t0 = time.perf_counter()
+        for start, goal in coppie:
+            r = a_stella(ProblemaBiblioteca(grafo, start, {goal}), euristica, frontiera)
+            espansi += r[2]
+            risultati.append(r)
+        t1 = time.perf_counter()
+        migliore = max(migliore, espansi / max(t1 - t0, 1e-9))
+
+    return migliore, risultati
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confronto tra il nuovo A* e la versione con oggetti nodo.")
+    parser.add_argument("--persone", type=int, default=20_000)
+    parser.add_argument("--query", type=int, default=10)
+    parser.add_argument("--seme", type=int, default=42)
+    args = parser.parse_args()
+
+    print("\nCostruisco il grafo sintetico...")
+    grafo = grafo_sintetico(args.persone, seme=args.seme)
+    n_archi = sum(len(v) for v in grafo.values())
+    print(f"Nodi: {len(grafo)}  archi (orientati): {n_archi}\n")
+
+    rnd = random.Random(args.seme)
+    persone = [n for n in grafo if n.startswith("Persona")]
+    coppie = [(rnd.choice(persone), rnd.choice(persone)) for _ in range(args.query)]
+
+    vel_rif, mem_rif, ris_rif = misura(a_stella_riferimento, grafo, coppie)
+    vel_nuovo, mem_nuovo, ris_nuovo = misura(a_stella, grafo, coppie)
+
+    if ris_rif != ris_nuovo:
+        raise AssertionError("Le due implementazioni restituiscono risultati diversi.")
+
+    print(f"{'':18}{'nodi/s':>14}{'picco memoria':>18}")
+    print(f"{'riferimento':18}{vel_rif:>14,.0f}{mem_rif:>15,.0f} KB")
+    print(f"{'a_stella':18}{vel_nuovo:>14,.0f}{mem_nuovo:>15,.0f} KB")
+    print()
+
+    # Confronto tra heap binario e coda a secchi scelta automaticamente
+    frontiera_auto = scegli_frontiera(grafo)
+    vel_heap, ris_heap = velocita_frontiera(grafo, coppie, FrontieraHeap)
+    vel_auto, ris_auto = velocita_frontiera(grafo, coppie, frontiera_auto)
+
+    if ris_heap != ris_auto:
+        raise AssertionError("Le due frontiere restituiscono risultati diversi.")
+
+    nome_auto = getattr(frontiera_auto, "func", frontiera_auto).__name__
+    print(f"{'frontiera':18}{'nodi/s':>14}")
+    print(f"{'FrontieraHeap':18}{vel_heap:>14,.0f}")
+    print(f"{nome_auto:18}{vel_auto:>14,.0f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
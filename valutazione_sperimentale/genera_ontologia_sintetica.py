@@ -0,0 +1,380 @@
+import argparse
+import json
+import random
+import time
+from itertools import accumulate
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from integrazione_kb.costruisci_grafo import aggiungi_relazione
+
+
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+
+# Stesso schema di ontologia/biblioteca.owl (classi e object property)
+INTESTAZIONE = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:xsd="http://www.w3.org/2001/XMLSchema#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#"
+         xml:base="http://example.org/biblioteca.owl"
+         xmlns="http://example.org/biblioteca.owl#">
+
+<owl:Ontology rdf:about="http://example.org/biblioteca.owl"/>
+
+<owl:ObjectProperty rdf:about="#haPrestito">
+  <rdfs:domain rdf:resource="#Persona"/>
+  <rdfs:range rdf:resource="#Prestito"/>
+</owl:ObjectProperty>
+
+<owl:ObjectProperty rdf:about="#riguardaLibro">
+  <rdfs:domain rdf:resource="#Prestito"/>
+  <rdfs:range rdf:resource="#Libro"/>
+</owl:ObjectProperty>
+
+<owl:ObjectProperty rdf:about="#appartieneCategoria">
+  <rdfs:domain rdf:resource="#Libro"/>
+  <rdfs:range rdf:resource="#Categoria"/>
+</owl:ObjectProperty>
+
+<owl:ObjectProperty rdf:about="#sottoCategoriaDi">
+  <rdfs:domain rdf:resource="#Categoria"/>
+  <rdfs:range rdf:resource="#Categoria"/>
+</owl:ObjectProperty>
+
+<owl:DatatypeProperty rdf:about="#nomeCompleto">
+  <rdfs:domain rdf:resource="#Persona"/>
+  <rdfs:range rdf:resource="http://www.w3.org/2001/XMLSchema#string"/>
+</owl:DatatypeProperty>
+
+<owl:DatatypeProperty rdf:about="#titolo">
+  <rdfs:domain rdf:resource="#Libro"/>
+  <rdfs:range rdf:resource="http://www.w3.org/2001/XMLSchema#string"/>
+</owl:DatatypeProperty>
+
+<owl:DatatypeProperty rdf:about="#statoPrestito">
+  <rdfs:domain rdf:resource="#Prestito"/>
+  <rdfs:range rdf:resource="http://www.w3.org/2001/XMLSchema#string"/>
+</owl:DatatypeProperty>
+
+<owl:Class rdf:about="#Persona">
+  <rdfs:subClassOf rdf:resource="http://www.w3.org/2002/07/owl#Thing"/>
+</owl:Class>
+
+<owl:Class rdf:about="#Libro">
+  <rdfs:subClassOf rdf:resource="http://www.w3.org/2002/07/owl#Thing"/>
+</owl:Class>
+
+<owl:Class rdf:about="#Categoria">
+  <rdfs:subClassOf rdf:resource="http://www.w3.org/2002/07/owl#Thing"/>
+</owl:Class>
+
+<owl:Class rdf:about="#Prestito">
+  <rdfs:subClassOf rdf:resource="http://www.w3.org/2002/07/owl#Thing"/>
+</owl:Class>
+
+"""
+
+CHIUSURA = "\n</rdf:RDF>\n"
+
+RADICE = "cat_Biblioteca"
+
+# Tipi di query del carico di lavoro (come i casi di runner_esperimenti)
+TIPI_QUERY = [
+    ("persona", "libro"),
+    ("persona", "categoria"),
+    ("libro", "categoria"),
+    ("persona", "persona"),
+]
+
+
+def tassonomia(profondita, ramificazione):
+    """
+    Restituisce le coppie (categoria, categoria_padre) di un albero
+    completo, dalla radice (padre None) alle foglie.
+    """
+    coppie = [(RADICE, None)]
+    livello = [RADICE]
+
+    for p in range(1, profondita):
+        nuovo_livello = []
+        for i, padre in enumerate(livello):
+            for r in range(ramificazione):
+                figlia = f"cat_{p}_{i * ramificazione + r}"
+                coppie.append((figlia, padre))
+                nuovo_livello.append(figlia)
+        livello = nuovo_livello
+
+    return coppie
+
+
+def dimensioni(n_persone=None, n_individui=None, prestiti_per_persona=3,
+               libri_per_persona=0.5, profondita=5, ramificazione=4):
+    """
+    Calcola il numero di individui di ogni tipo.
+
+    Si può indicare direttamente n_persone oppure il numero totale
+    di individui desiderato (n_individui): in questo caso le persone
+    vengono ricavate dalle proporzioni tra i tipi.
+    """
+    n_categorie = sum(ramificazione ** p for p in range(profondita))
+
+    if n_persone is None:
+        if n_individui is None:
+            raise ValueError("Indicare n_persone oppure n_individui.")
+        per_persona = 1 + prestiti_per_persona + libri_per_persona
+        n_persone = max(1, int((n_individui - n_categorie) / per_persona))
+
+    n_libri = max(1, int(n_persone * libri_per_persona))
+
+    return {
+        "persone": n_persone,
+        "libri": n_libri,
+        "prestiti": n_persone * prestiti_per_persona,
+        "categorie": n_categorie,
+    }
+
+
+def pesi_cumulativi(n_libri, asimmetria):
+    """
+    Pesi cumulativi della popolarità dei libri secondo una legge di Zipf:
+    il libro i viene prestato con probabilità proporzionale a 1 / (i + 1)^asimmetria.
+    Con asimmetria 0 tutti i libri sono equiprobabili.
+    """
+    if asimmetria == 0:
+        return None
+    return list(accumulate(1.0 / (i + 1) ** asimmetria for i in range(n_libri)))
+
+
+def _individuo(f, nome, classe, relazioni, attributo=None):
+    righe = [f'<owl:NamedIndividual rdf:about="#{nome}">\n',
+             f'  <rdf:type rdf:resource="#{classe}"/>\n']
+    for nome_prop, destinazione in relazioni:
+        righe.append(f'  <{nome_prop} rdf:resource="#{destinazione}"/>\n')
+    if attributo is not None:
+        nome_attr, valore = attributo
+        righe.append(f'  <{nome_attr} rdf:datatype="{XSD_STRING}">{escape(valore)}</{nome_attr}>\n')
+    righe.append("</owl:NamedIndividual>\n\n")
+    f.write("".join(righe))
+
+
+def individui_sintetici(n_persone, prestiti_per_persona=3, libri_per_persona=0.5,
+                        profondita=5, ramificazione=4, categorie_per_libro=2,
+                        asimmetria=1.0, attributi=True, seme=42):
+    """
+    Genera uno alla volta gli individui dell'ontologia sintetica come
+    terne (nome, classe, relazioni, attributo), dove relazioni è la lista
+    delle coppie (proprietà, destinazione) e attributo è una coppia
+    (proprietà, valore) oppure None.
+
+    È l'unica definizione del carico sintetico: genera_ontologia ne scrive
+    il file OWL e grafo_sintetico ne costruisce direttamente il grafo.
+
+    - categorie_per_libro: ogni libro appartiene da 1 a questo numero
+      di categorie foglia
+    - asimmetria: esponente di Zipf della popolarità dei libri nei prestiti
+    - attributi: aggiunge un attributo testuale a ogni individuo,
+      per avere file di dimensioni realistiche
+    """
+    rnd = random.Random(seme)
+    n_libri = dimensioni(n_persone, None, prestiti_per_persona, libri_per_persona,
+                         profondita, ramificazione)["libri"]
+
+    coppie_tassonomia = tassonomia(profondita, ramificazione)
+    figli = {padre for _, padre in coppie_tassonomia}
+    foglie = [c for c, _ in coppie_tassonomia if c not in figli]
+
+    cumulativi = pesi_cumulativi(n_libri, asimmetria)
+    indici_libri = range(n_libri)
+
+    for categoria, padre in coppie_tassonomia:
+        relazioni = [("sottoCategoriaDi", padre)] if padre is not None else []
+        yield categoria, "Categoria", relazioni, None
+
+    for i in range(n_libri):
+        k = rnd.randint(1, min(categorie_per_libro, len(foglie)))
+        relazioni = [("appartieneCategoria", c) for c in rnd.sample(foglie, k)]
+        attributo = ("titolo", f"Libro sintetico {i}") if attributi else None
+        yield f"Libro{i}", "Libro", relazioni, attributo
+
+    n_prestito = 0
+    for i in range(n_persone):
+        relazioni = [
+            ("haPrestito", f"Prestito{n_prestito + j}")
+            for j in range(prestiti_per_persona)
+        ]
+        attributo = ("nomeCompleto", f"Persona sintetica {i}") if attributi else None
+        yield f"Persona{i}", "Persona", relazioni, attributo
+
+        if cumulativi is None:
+            libri = [rnd.randrange(n_libri) for _ in range(prestiti_per_persona)]
+        else:
+            libri = rnd.choices(indici_libri, cum_weights=cumulativi, k=prestiti_per_persona)
+
+        for libro in libri:
+            attributo = ("statoPrestito", rnd.choice(("aperto", "chiuso"))) if attributi else None
+            yield f"Prestito{n_prestito}", "Prestito", [("riguardaLibro", f"Libro{libro}")], attributo
+            n_prestito += 1
+
+
+def genera_ontologia(percorso_owl, n_persone, prestiti_per_persona=3, libri_per_persona=0.5,
+                     profondita=5, ramificazione=4, categorie_per_libro=2,
+                     asimmetria=1.0, attributi=True, seme=42):
+    """
+    Scrive un file OWL (RDF/XML) con lo schema della biblioteca
+    e gli individui di individui_sintetici (stessi parametri).
+    Il file viene scritto un individuo alla volta, quindi la memoria
+    usata dipende solo dal numero di libri.
+
+    Restituisce il dizionario delle dimensioni (vedi dimensioni()).
+    """
+    conteggi = dimensioni(n_persone, None, prestiti_per_persona, libri_per_persona,
+                          profondita, ramificazione)
+
+    individui = individui_sintetici(n_persone, prestiti_per_persona, libri_per_persona,
+                                    profondita, ramificazione, categorie_per_libro,
+                                    asimmetria, attributi, seme)
+
+    with open(percorso_owl, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write(INTESTAZIONE)
+        for nome, classe, relazioni, attributo in individui:
+            _individuo(f, nome, classe, relazioni, attributo)
+        f.write(CHIUSURA)
+
+    return conteggi
+
+
+def grafo_sintetico(n_persone, prestiti_per_persona=3, libri_per_persona=0.5,
+                    profondita=5, ramificazione=4, categorie_per_libro=2,
+                    asimmetria=1.0, attributi=True, seme=42):
+    """
+    Costruisce in memoria il grafo che costruisci_grafo ricaverebbe
+    dall'ontologia di genera_ontologia con gli stessi parametri,
+    senza passare dal file OWL.
+
+    attributi non compare nel grafo, ma va passato come all'ontologia:
+    cambia la sequenza casuale e quindi i libri dei prestiti.
+    """
+    grafo = {}
+    individui = individui_sintetici(n_persone, prestiti_per_persona, libri_per_persona,
+                                    profondita, ramificazione, categorie_per_libro,
+                                    asimmetria, attributi, seme)
+    for nome, _, relazioni, _ in individui:
+        for nome_prop, destinazione in relazioni:
+            aggiungi_relazione(grafo, nome, nome_prop, destinazione)
+    return grafo
+
+
+def genera_workload(conteggi, n_query, profondita=5, ramificazione=4, seme=42):
+    """
+    Genera n_query coppie (partenza, obiettivo) tra individui che esistono
+    nell'ontologia con le dimensioni indicate, mescolando i tipi di query
+    di TIPI_QUERY. Lo stesso seme produce sempre lo stesso carico.
+    """
+    rnd = random.Random(seme)
+    categorie = [c for c, _ in tassonomia(profondita, ramificazione)]
+
+    estrai = {
+        "persona": lambda: f"Persona{rnd.randrange(conteggi['persone'])}",
+        "libro": lambda: f"Libro{rnd.randrange(conteggi['libri'])}",
+        "categoria": lambda: rnd.choice(categorie),
+    }
+
+    query = []
+    for _ in range(n_query):
+        tipo_partenza, tipo_obiettivo = rnd.choice(TIPI_QUERY)
+        query.append((estrai[tipo_partenza](), estrai[tipo_obiettivo]()))
+
+    return query
+
+
+def salva_workload(percorso_json, query, parametri):
+    with open(percorso_json, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "parametri": parametri,
+                "query": [{"partenza": s, "obiettivo": g} for s, g in query],
+            },
+            f, indent=2, ensure_ascii=False
+        )
+
+
+def carica_workload(percorso_json):
+    """
+    Legge un carico di lavoro salvato da salva_workload
+    e restituisce la lista di coppie (partenza, obiettivo).
+    """
+    with open(percorso_json, "r", encoding="utf-8") as f:
+        dati = json.load(f)
+    return [(q["partenza"], q["obiettivo"]) for q in dati["query"]]
+
+
+def percorso_workload(percorso_owl):
+    """
+    ontologia/sintetica.owl -> ontologia/sintetica.query.json
+    """
+    percorso_owl = Path(percorso_owl)
+    return percorso_owl.with_name(percorso_owl.stem + ".query.json")
+
+
+def leggi_argomenti():
+    parser = argparse.ArgumentParser(description="Genera un'ontologia sintetica della biblioteca e un carico di query.")
+    parser.add_argument("uscita", type=Path, help="file OWL da scrivere")
+    dimensione = parser.add_mutually_exclusive_group(required=True)
+    dimensione.add_argument("--persone", type=int, help="numero di persone")
+    dimensione.add_argument("--individui", type=int, help="numero totale di individui (circa)")
+    parser.add_argument("--prestiti-per-persona", type=int, default=3)
+    parser.add_argument("--libri-per-persona", type=float, default=0.5)
+    parser.add_argument("--profondita", type=int, default=5, help="livelli della tassonomia")
+    parser.add_argument("--ramificazione", type=int, default=4, help="sottocategorie per categoria")
+    parser.add_argument("--categorie-per-libro", type=int, default=2)
+    parser.add_argument("--asimmetria", type=float, default=1.0,
+                        help="esponente di Zipf della popolarità dei libri (0 = uniforme)")
+    parser.add_argument("--senza-attributi", action="store_true")
+    parser.add_argument("--query", type=int, default=1000, help="query del carico di lavoro")
+    parser.add_argument("--seme", type=int, default=42)
+    return parser.parse_args()
+
+
+def main():
+    args = leggi_argomenti()
+
+    n_persone = args.persone
+    if n_persone is None:
+        n_persone = dimensioni(
+            n_individui=args.individui,
+            prestiti_per_persona=args.prestiti_per_persona,
+            libri_per_persona=args.libri_per_persona,
+            profondita=args.profondita,
+            ramificazione=args.ramificazione,
+        )["persone"]
+
+    print(f"\nGenero {args.uscita}...")
+
+    t0 = time.perf_counter()
+    conteggi = genera_ontologia(
+        args.uscita,
+        n_persone,
+        prestiti_per_persona=args.prestiti_per_persona,
+        libri_per_persona=args.libri_per_persona,
+        profondita=args.profondita,
+        ramificazione=args.ramificazione,
+        categorie_per_libro=args.categorie_per_libro,
+        asimmetria=args.asimmetria,
+        attributi=not args.senza_attributi,
+        seme=args.seme,
+    )
+    t1 = time.perf_counter()
+
+    query = genera_workload(conteggi, args.query, args.profondita, args.ramificazione, args.seme)
+    parametri = dict(vars(args), uscita=str(args.uscita), persone=n_persone, conteggi=conteggi)
+    salva_workload(percorso_workload(args.uscita), query, parametri)
+
+    totale = sum(conteggi.values())
+    print(f"Individui: {totale:,} ({', '.join(f'{k}: {v:,}' for k, v in conteggi.items())})")
+    print(f"Scritto in {t1 - t0:.2f} s, {Path(args.uscita).stat().st_size / 2**20:,.1f} MB")
+    print(f"Carico di lavoro: {percorso_workload(args.uscita)} ({len(query)} query)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
 from pathlib import Path
-import pandas as pd
 import matplotlib.pyplot as plt
 
+from valutazione_sperimentale.archivio_risultati import (
+    CHIAVI,
+    aggiorna_statistiche,
+    carica_risultati,
+    tabella_riassuntiva,
+)
+
 
 def main():
 
@@ -16,24 +22,30 @@ def main():
         print("Prima esegui il runner degli esperimenti.\n")
         return
 
-    df = pd.read_csv(csv_path)
-    df["trovato"] = df["trovato"].astype(bool)
-
-    gruppi = df.groupby(["nodo_iniziale", "nodo_obiettivo", "euristica"], dropna=False)
+    # Leggo solo le colonne che servono, dall'archivio a colonne:
+    # del CSV viene convertita solo la parte aggiunta dall'ultima volta
+    df = carica_risultati(
+        csv_path,
+        CHIAVI + ["id_esperimento", "trovato", "tempo_ms", "nodi_espansi", "costo"],
+    )
 
-    tabella = gruppi.agg(
-        n_run=("id_esperimento", "count"),
-        successo_pct=("trovato", lambda x: 100.0 * x.mean()),
-        tempo_medio_ms=("tempo_ms", "mean"),
-        tempo_std_ms=("tempo_ms", "std"),
-        espansi_medio=("nodi_espansi", "mean"),
-        espansi_std=("nodi_espansi", "std"),
-        costo_medio=("costo", "mean"),
-        costo_std=("costo", "std"),
-    ).reset_index()
+    # Conteggi, medie e deviazioni: statistiche cumulative, in cui
+    # vengono aggiunti solo gli esperimenti nuovi
+    tabella = tabella_riassuntiva(aggiorna_statistiche(csv_path, df))
+
+    # Mediana e p95 non si possono cumulare: richiedono una passata
+    # su tutti i tempi, con i quantili per gruppo di pandas
+    quantili = (
+        df.groupby(CHIAVI, observed=True)["tempo_ms"]
+        .quantile([0.5, 0.95])
+        .unstack()
+        .reindex(tabella.index)
+    )
+    tabella.insert(3, "tempo_mediana_ms", quantili[0.5])
+    tabella.insert(4, "tempo_p95_ms", quantili[0.95])
 
-    for c in ["tempo_std_ms", "espansi_std", "costo_std"]:
-        tabella[c] = tabella[c].fillna(0.0)
+    tabella = tabella.reset_index()
+    tabella[CHIAVI] = tabella[CHIAVI].astype(str)
 
     out_tabella = cartella_risultati / "tabella_riassuntiva.csv"
     tabella.to_csv(out_tabella, index=False)
@@ -47,14 +59,20 @@ def main():
         + ")"
     )
 
-    # --- Grafico tempo medio con deviazione standard ---
+    # --- Grafico tempo: mediana, con barre dal minimo al p95 ---
+    # I tempi hanno code lunghe: mediana e percentili li descrivono
+    # meglio di media e deviazione standard.
+    errori = [
+        tabella["tempo_mediana_ms"] - tabella["tempo_min_ms"],
+        tabella["tempo_p95_ms"] - tabella["tempo_mediana_ms"],
+    ]
     plt.figure()
-    plt.bar(tabella["caso"], tabella["tempo_medio_ms"], yerr=tabella["tempo_std_ms"], capsize=4)
-    plt.ylabel("Tempo medio (ms)")
-    plt.title("Tempo medio A* (media ± dev. std)")
+    plt.bar(tabella["caso"], tabella["tempo_mediana_ms"], yerr=errori, capsize=4)
+    plt.ylabel("Tempo (ms)")
+    plt.title("Tempo A* (mediana, barre da min a p95)")
     plt.xticks(rotation=45, ha="right")
     plt.tight_layout()
-    out_tempo = cartella_risultati / "tempo_medio_con_std.png"
+    out_tempo = cartella_risultati / "tempo_mediana_p95.png"
     plt.savefig(out_tempo)
     plt.close()
 
@@ -0,0 +1,269 @@
+import argparse
+import csv
+import gc
+import math
+import statistics
+import time
+from pathlib import Path
+
+
+# Quantile della normale standard per un intervallo di confidenza al 95%
+Z_95 = statistics.NormalDist().inv_cdf(0.975)
+
+
+class OpzioniMisura:
+    """
+    Parametri della misura adattiva.
+
+    - riscaldamento: esecuzioni iniziali scartate (cache, allocazioni)
+    - min_ripetizioni / max_ripetizioni: limiti sul numero di campioni
+    - precisione: ci si ferma quando la semiampiezza dell'intervallo
+      di confidenza al 95% della media è sotto questa frazione della media
+    - tempo_max_s: tempo massimo da dedicare a un singolo caso
+    """
+
+    def __init__(self, riscaldamento=3, min_ripetizioni=5, max_ripetizioni=200,
+                 precisione=0.05, tempo_max_s=2.0):
+        self.riscaldamento = riscaldamento
+        self.min_ripetizioni = min_ripetizioni
+        self.max_ripetizioni = max_ripetizioni
+        self.precisione = precisione
+        self.tempo_max_s = tempo_max_s
+
+    @classmethod
+    def fisse(cls, ripetizioni):
+        """
+        Numero di ripetizioni fisso (nessun criterio adattivo).
+        """
+        return cls(min_ripetizioni=ripetizioni, max_ripetizioni=ripetizioni,
+                   precisione=float("inf"), tempo_max_s=float("inf"))
+
+
+def semiampiezza_ic(campioni):
+    """
+    Semiampiezza dell'intervallo di confidenza al 95% della media.
+
+    Al posto della t di Student (che richiederebbe scipy) uso la sua
+    approssimazione a partire dal quantile della normale, più che
+    sufficiente per decidere quando fermarsi.
+    """
+    n = len(campioni)
+    if n < 2:
+        return float("inf")
+    gradi = n - 1
+    t = Z_95 * (1 + (Z_95 ** 2 + 1) / (4 * gradi))
+    return t * statistics.stdev(campioni) / math.sqrt(n)
+
+
+def misura_adattiva(funzione, opzioni=None):
+    """
+    Chiama funzione() più volte e restituisce (campioni, ultimo risultato),
+    con i campioni in millisecondi.
+
+    Prima vengono eseguite le chiamate di riscaldamento, poi le misure
+    con il garbage collector disattivato (una raccolta durante una misura
+    la falserebbe). Le ripetizioni continuano finché l'intervallo di
+    confidenza della media non è abbastanza stretto, entro i limiti
+    di opzioni.
+    """
+    if opzioni is None:
+        opzioni = OpzioniMisura()
+
+    risultato = None
+    for _ in range(opzioni.riscaldamento):
+        risultato = funzione()
+
+    campioni = []
+    orologio = time.perf_counter
+
+    gc_attivo = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        inizio = orologio()
+        while len(campioni) < opzioni.max_ripetizioni:
+            t0 = orologio()
+            risultato = funzione()
+            t1 = orologio()
+            campioni.append((t1 - t0) * 1000.0)
+
+            if len(campioni) < opzioni.min_ripetizioni:
+                continue
+            if t1 - inizio > opzioni.tempo_max_s:
+                break
+
+            media = statistics.fmean(campioni)
+            if semiampiezza_ic(campioni) <= opzioni.precisione * media:
+                break
+    finally:
+        if gc_attivo:
+            gc.enable()
+
+    return campioni, risultato
+
+
+def percentile(campioni, q):
+    """
+    Percentile q (tra 0 e 100) con interpolazione lineare.
+    """
+    ordinati = sorted(campioni)
+    if not ordinati:
+        return None
+    posizione = (len(ordinati) - 1) * q / 100.0
+    basso = math.floor(posizione)
+    alto = math.ceil(posizione)
+    return ordinati[basso] + (ordinati[alto] - ordinati[basso]) * (posizione - basso)
+
+
+def riassumi(campioni):
+    """
+    Statistiche dei campioni: minimo, mediana, p95, media e
+    semiampiezza dell'intervallo di confidenza al 95% della media.
+    """
+    return {
+        "n": len(campioni),
+        "min": min(campioni),
+        "mediana": statistics.median(campioni),
+        "p95": percentile(campioni, 95),
+        "media": statistics.fmean(campioni),
+        "ic95": semiampiezza_ic(campioni),
+    }
+
+
+def mann_whitney(a, b):
+    """
+    Test U di Mann-Whitney a due code (approssimazione normale,
+    con correzione per i pareggi e di continuità).
+
+    Restituisce (U di a, p-value). Non assume che i tempi siano
+    distribuiti normalmente, cosa che per i tempi quasi mai è vera.
+    """
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return None, 1.0
+
+    valori = sorted([(x, 0) for x in a] + [(x, 1) for x in b])
+    n = n1 + n2
+
+    # Ranghi medi per i valori uguali
+    somma_ranghi_a = 0.0
+    correzione_pareggi = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and valori[j + 1][0] == valori[i][0]:
+            j += 1
+        rango_medio = (i + j) / 2.0 + 1.0
+        gruppo = j - i + 1
+        correzione_pareggi += gruppo ** 3 - gruppo
+        somma_ranghi_a += rango_medio * sum(1 for k in range(i, j + 1) if valori[k][1] == 0)
+        i = j + 1
+
+    u = somma_ranghi_a - n1 * (n1 + 1) / 2.0
+    media_u = n1 * n2 / 2.0
+    varianza = n1 * n2 / 12.0 * ((n + 1) - correzione_pareggi / (n * (n - 1)))
+    if varianza <= 0:
+        return u, 1.0
+
+    differenza = u - media_u
+    if differenza != 0:
+        differenza -= math.copysign(0.5, differenza)
+    z = differenza / math.sqrt(varianza)
+    p = 2.0 * (1.0 - statistics.NormalDist().cdf(abs(z)))
+    return u, min(p, 1.0)
+
+
+def leggi_tempi(percorso_csv, colonna="tempo_ms"):
+    """
+    Legge un risultati.csv del runner e raggruppa i tempi
+    per (nodo_iniziale, nodo_obiettivo, euristica).
+    """
+    gruppi = {}
+    with open(percorso_csv, newline="", encoding="utf-8") as f:
+        for riga in csv.DictReader(f):
+            if not riga.get(colonna):
+                continue
+            chiave = (riga["nodo_iniziale"], riga["nodo_obiettivo"], riga["euristica"])
+            gruppi.setdefault(chiave, []).append(float(riga[colonna]))
+    return gruppi
+
+
+def confronta_risultati(percorso_base, percorso_nuovo, alfa=0.01, soglia=0.05):
+    """
+    Confronta due file di risultati caso per caso (partenza, obiettivo,
+    euristica).
+
+    Un caso è un peggioramento se il test di Mann-Whitney è significativo
+    (p < alfa) e la mediana nuova supera quella di riferimento di almeno
+    la frazione soglia; simmetricamente per i miglioramenti. Le differenze
+    significative ma più piccole della soglia vengono ignorate.
+    """
+    base = leggi_tempi(percorso_base)
+    nuovo = leggi_tempi(percorso_nuovo)
+
+    righe = []
+    for chiave in sorted(set(base) & set(nuovo)):
+        a, b = base[chiave], nuovo[chiave]
+        mediana_a = statistics.median(a)
+        mediana_b = statistics.median(b)
+        _, p = mann_whitney(a, b)
+        variazione = (mediana_b - mediana_a) / mediana_a if mediana_a > 0 else 0.0
+
+        if p < alfa and variazione > soglia:
+            esito = "peggioramento"
+        elif p < alfa and variazione < -soglia:
+            esito = "miglioramento"
+        else:
+            esito = "invariato"
+
+        righe.append({
+            "nodo_iniziale": chiave[0],
+            "nodo_obiettivo": chiave[1],
+            "euristica": chiave[2],
+            "n_base": len(a),
+            "n_nuovo": len(b),
+            "mediana_base_ms": mediana_a,
+            "mediana_nuovo_ms": mediana_b,
+            "variazione_pct": 100.0 * variazione,
+            "p_value": p,
+            "esito": esito,
+        })
+
+    return righe
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confronta due file di risultati del runner e segnala i peggioramenti.")
+    parser.add_argument("base", type=Path, help="risultati di riferimento (csv)")
+    parser.add_argument("nuovo", type=Path, help="risultati da confrontare (csv)")
+    parser.add_argument("--alfa", type=float, default=0.01, help="livello di significatività")
+    parser.add_argument("--soglia", type=float, default=0.05, help="variazione minima della mediana da segnalare")
+    parser.add_argument("--uscita", type=Path, default=None, help="csv in cui salvare il confronto")
+    args = parser.parse_args()
+
+    righe = confronta_risultati(args.base, args.nuovo, args.alfa, args.soglia)
+    if not righe:
+        print("\nNessun caso in comune tra i due file.\n")
+        return
+
+    print(f"\n{'caso':52}{'base ms':>10}{'nuovo ms':>10}{'var %':>8}{'p':>10}  esito")
+    for r in righe:
+        caso = f"{r['nodo_iniziale']} → {r['nodo_obiettivo']} ({r['euristica']})"
+        print(f"{caso:52}{r['mediana_base_ms']:>10.4f}{r['mediana_nuovo_ms']:>10.4f}"
+              f"{r['variazione_pct']:>8.1f}{r['p_value']:>10.2g}  {r['esito']}")
+
+    if args.uscita is not None:
+        with open(args.uscita, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=list(righe[0].keys()))
+            w.writeheader()
+            w.writerows(righe)
+
+    peggioramenti = [r for r in righe if r["esito"] == "peggioramento"]
+    print(f"\nCasi confrontati: {len(righe)}, peggioramenti significativi: {len(peggioramenti)}\n")
+
+    if peggioramenti:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
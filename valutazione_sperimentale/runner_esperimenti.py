@@ -1,21 +1,34 @@
-import csv
-import json
+import argparse
+import multiprocessing
+import os
 import time
-from collections import deque
 from pathlib import Path
 
-from owlready2 import get_ontology
-
-from integrazione_kb.costruisci_grafo import costruisci_grafo
+from integrazione_kb.cache_grafo import carica_grafo_biblioteca
+from integrazione_kb.euristica_landmark import EuristicaLandmark
+from valutazione_sperimentale.genera_ontologia_sintetica import carica_workload
+from valutazione_sperimentale.harness_benchmark import OpzioniMisura, misura_adattiva
+from valutazione_sperimentale.sink_risultati import SinkRisultati
 from ricerca_percorsi.problema_biblioteca import ProblemaBiblioteca
 from ricerca_percorsi.algoritmo_a_stella import a_stella
+from ricerca_percorsi.algoritmo_bidirezionale import ricerca_bidirezionale
+from ricerca_percorsi.statistiche_ricerca import StatisticheRicerca
+from ricerca_percorsi.distanze_multiple import MatriceDistanze
+from ricerca_percorsi.frontiera import FrontieraHeap, scegli_frontiera
+
+
+# Dati in sola lettura condivisi con i processi worker.
+# Vengono impostati prima di creare il pool: con il metodo "fork"
+# i worker li ereditano dal padre senza copiarli né serializzarli.
+_CONTESTO = None
 
 
 def carica_ontologia(percorso_owl: Path):
     """
-    Carica l'ontologia OWL dal percorso indicato.
+    Carica il grafo dell'ontologia OWL dal percorso indicato,
+    riusando la cache su disco quando è ancora valida.
     """
-    return get_ontology(str(percorso_owl.resolve())).load()
+    return carica_grafo_biblioteca(percorso_owl)
 
 
 def euristica_nulla(_stato, _obiettivo, _distanze=None):
@@ -28,44 +41,32 @@ def euristica_base(stato, obiettivo, _distanze=None):
 
 def costruisci_distanze_bfs(grafo, nodi_interesse):
     """
-    Precalcola le distanze minime tra alcuni nodi,
-    usando una semplice BFS a costo uniforme.
+    Precalcola le distanze minime (in passi) dai nodi di interesse
+    a tutti gli altri, con una BFS vettoriale da tutte le sorgenti
+    insieme. Il risultato è una MatriceDistanze: una riga compatta
+    per sorgente invece di un dizionario per ogni coppia di nodi,
+    quindi regge anche migliaia di nodi di interesse.
     """
-
-    distanze = {}
-
-    for sorgente in nodi_interesse:
-        dist_sorg = {sorgente: 0}
-        coda = deque([sorgente])
-
-        while coda:
-            corrente = coda.popleft()
-            passi = dist_sorg[corrente]
-
-            for vicino in grafo.get(corrente, {}).keys():
-                if vicino not in dist_sorg:
-                    dist_sorg[vicino] = passi + 1
-                    coda.append(vicino)
-
-        distanze[sorgente] = dist_sorg
-
-    return distanze
+    return MatriceDistanze(grafo, sorted(nodi_interesse))
 
 
 def euristica_informata(stato, obiettivo, distanze_bfs):
     """
     Euristica informata basata sulle distanze minime BFS.
     Se non abbiamo informazioni sufficienti, usa una stima prudente.
+
+    I passi vengono moltiplicati per il costo minimo di un arco,
+    così la stima non supera mai il costo reale.
     """
 
     if stato == obiettivo:
         return 0.0
 
-    d = distanze_bfs.get(stato, {}).get(obiettivo)
-    return float(d) if d is not None else 1.0
+    d = distanze_bfs.distanza(obiettivo, stato)
+    return d * distanze_bfs.costo_minimo_arco if d is not None else 1.0
 
 
-def scegli_funzione_euristica(nome, obiettivo, distanze_bfs):
+def scegli_funzione_euristica(nome, obiettivo, distanze_bfs, euristica_landmark=None):
 
     if nome == "nulla":
         return lambda s: euristica_nulla(s, obiettivo, distanze_bfs)
@@ -74,98 +75,252 @@ def scegli_funzione_euristica(nome, obiettivo, distanze_bfs):
         return lambda s: euristica_base(s, obiettivo, distanze_bfs)
 
     if nome == "informata":
-        return lambda s: euristica_informata(s, obiettivo, distanze_bfs)
+        # Stessi valori di euristica_informata, letti da una riga
+        # della matrice già convertita in lista
+        return distanze_bfs.funzione_verso(obiettivo, distanze_bfs.costo_minimo_arco)
+
+    if nome == "landmark" and euristica_landmark is not None:
+        return euristica_landmark.funzione_per(obiettivo)
 
     return lambda s: euristica_base(s, obiettivo, distanze_bfs)
 
 
-def esegui_singolo_test(grafo, nodo_iniziale, nodo_obiettivo, nome_euristica, distanze_bfs):
+def esegui_caso(grafo, nodo_iniziale, nodo_obiettivo, nome_euristica, distanze_bfs,
+                euristica_landmark=None, opzioni=None, frontiera=FrontieraHeap):
+    """
+    Misura un caso (partenza, obiettivo, euristica) con misura_adattiva
+    e restituisce una riga di risultati per ogni campione di tempo.
+    frontiera è quella scelta per il grafo con scegli_frontiera.
+    """
 
-    funzione_h = scegli_funzione_euristica(nome_euristica, nodo_obiettivo, distanze_bfs)
     problema = ProblemaBiblioteca(grafo, nodo_iniziale, {nodo_obiettivo})
 
-    t0 = time.perf_counter()
-    percorso, costo, nodi_espansi = a_stella(problema, funzione_h)
-    t1 = time.perf_counter()
+    # "bidirezionale" non è un'euristica ma una strategia di ricerca diversa
+    if nome_euristica == "bidirezionale":
+        cerca = lambda: ricerca_bidirezionale(problema)
+    else:
+        funzione_h = scegli_funzione_euristica(
+            nome_euristica, nodo_obiettivo, distanze_bfs, euristica_landmark
+        )
+        cerca = lambda: a_stella(problema, funzione_h, frontiera)
+
+    campioni, (percorso, costo, nodi_espansi) = misura_adattiva(cerca, opzioni)
+
+    # I contatori vengono raccolti in una seconda esecuzione strumentata,
+    # così tempo_ms resta quello della ricerca senza misure interne.
+    # Le due esecuzioni condividono il ciclo di A*: se il risultato
+    # cambiasse, i contatori non descriverebbero la ricerca misurata.
+    if nome_euristica == "bidirezionale":
+        contatori = dict.fromkeys(StatisticheRicerca.colonne())
+    else:
+        statistiche = StatisticheRicerca()
+        strumentato = a_stella(problema, funzione_h, frontiera, statistiche=statistiche)
+        if strumentato != (percorso, costo, nodi_espansi):
+            raise RuntimeError(
+                f"A* strumentato diverso da quello misurato per "
+                f"{nodo_iniziale} -> {nodo_obiettivo} ({nome_euristica})"
+            )
+        contatori = statistiche.in_dizionario()
 
     trovato = percorso is not None
     lunghezza = len(percorso) if trovato else None
-    tempo_ms = (t1 - t0) * 1000.0
     percorso_str = " -> ".join(percorso) if trovato else None
 
-    return {
-        "nodo_iniziale": nodo_iniziale,
-        "nodo_obiettivo": nodo_obiettivo,
-        "euristica": nome_euristica,
-        "trovato": bool(trovato),
-        "costo": float(costo) if costo is not None else None,
-        "lunghezza_percorso": int(lunghezza) if lunghezza is not None else None,
-        "tempo_ms": float(tempo_ms),
-        "nodi_espansi": int(nodi_espansi),
-        "percorso": percorso_str
-    }
+    return [
+        {
+            "nodo_iniziale": nodo_iniziale,
+            "nodo_obiettivo": nodo_obiettivo,
+            "euristica": nome_euristica,
+            "campione": i,
+            "trovato": bool(trovato),
+            "costo": float(costo) if costo is not None else None,
+            "lunghezza_percorso": int(lunghezza) if lunghezza is not None else None,
+            "tempo_ms": float(tempo_ms),
+            "nodi_espansi": int(nodi_espansi),
+            **contatori,
+            "worker": os.getpid(),
+            "percorso": percorso_str
+        }
+        for i, tempo_ms in enumerate(campioni, start=1)
+    ]
+
 
+def _imposta_contesto(contesto):
+    global _CONTESTO
+    _CONTESTO = contesto
 
-def main():
 
-    print("\nAvvio la fase di valutazione sperimentale...\n")
+def _esegui_compito(compito):
+    """
+    Misura un singolo caso usando i dati condivisi.
+    Il tempo viene misurato dentro il worker, attorno alla sola ricerca,
+    quindi resta confrontabile con quello delle esecuzioni seriali.
+    """
+    id_esperimento, start, goal, eur = compito
+    grafo, distanze_bfs, euristica_landmark, opzioni, frontiera = _CONTESTO
+
+    righe = esegui_caso(grafo, start, goal, eur, distanze_bfs, euristica_landmark, opzioni, frontiera)
+    for r in righe:
+        r["id_esperimento"] = id_esperimento
+    return righe
 
-    cartella_progetto = Path(__file__).resolve().parent.parent
-    percorso_owl = cartella_progetto / "ontologia" / "biblioteca.owl"
-
-    ontologia = carica_ontologia(percorso_owl)
-    grafo = costruisci_grafo(ontologia)
-
-    # Casi scelti per testare situazioni diverse
-    casi = [
-        ("Anna", "LibroGaribaldi"),
-        ("Marco", "LibroAI"),
-        ("Marco", "cat_AlgebraLineare"),
-        ("ProfRossi", "cat_StoriaItalia"),
-        ("LibroAI", "cat_Biblioteca"),
-        ("LibroAI", "cat_Fiabe"),
-    ]
 
-    euristiche = ["nulla", "base", "informata"]
-    ripetizioni = 6
+def esegui_compiti(compiti, contesto, workers=1):
+    """
+    Esegue tutti i compiti (id_esperimento, partenza, obiettivo, euristica),
+    in serie oppure su un pool di processi.
+
+    Restituisce un generatore con le righe di ogni compito, nello stesso
+    ordine dei compiti: i risultati possono essere salvati man mano,
+    senza tenerli tutti in memoria.
+    """
+    _imposta_contesto(contesto)
+
+    if workers <= 1:
+        for c in compiti:
+            yield _esegui_compito(c)
+        return
+
+    metodi = multiprocessing.get_all_start_methods()
+
+    if "fork" in metodi:
+        # Il contesto è già nella memoria del padre: i worker lo vedono
+        # tramite copy-on-write e ricevono solo i piccoli compiti.
+        ctx = multiprocessing.get_context("fork")
+        pool = ctx.Pool(workers)
+    else:
+        # Senza fork il contesto viene inviato una volta per worker,
+        # non una volta per compito.
+        ctx = multiprocessing.get_context("spawn")
+        pool = ctx.Pool(workers, initializer=_imposta_contesto, initargs=(contesto,))
+
+    blocco = max(1, len(compiti) // (workers * 4))
+
+    with pool:
+        yield from pool.imap(_esegui_compito, compiti, chunksize=blocco)
+
+
+def leggi_argomenti():
+    parser = argparse.ArgumentParser(description="Valutazione sperimentale di A* sulla biblioteca.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="numero di processi con cui eseguire gli esperimenti (default: 1, seriale)"
+    )
+    parser.add_argument(
+        "--ontologia",
+        type=Path,
+        default=None,
+        help="file OWL da usare al posto di ontologia/biblioteca.owl (ad esempio uno sintetico)"
+    )
+    parser.add_argument(
+        "--workload",
+        type=Path,
+        default=None,
+        help="file JSON di query prodotto da genera_ontologia_sintetica"
+    )
+    parser.add_argument(
+        "--ripetizioni",
+        type=int,
+        default=None,
+        help="numero fisso di ripetizioni per caso (default: adattivo)"
+    )
+    parser.add_argument("--precisione", type=float, default=0.05,
+                        help="semiampiezza relativa dell'intervallo di confidenza al 95%% a cui fermarsi")
+    parser.add_argument("--max-ripetizioni", type=int, default=200)
+    parser.add_argument(
+        "--riprendi",
+        action="store_true",
+        help="continua un'esecuzione interrotta saltando i casi già presenti nei risultati"
+    )
+    return parser.parse_args()
+
+
+def main(workers=1, percorso_owl=None, percorso_workload=None, opzioni=None, riprendi=False):
 
-    nodi_interesse = {n for caso in casi for n in caso}
+    print("\nAvvio la fase di valutazione sperimentale...\n")
+
+    cartella_progetto = Path(__file__).resolve().parent.parent
+    if percorso_owl is None:
+        percorso_owl = cartella_progetto / "ontologia" / "biblioteca.owl"
+        nome_risultati = "risultati"
+    else:
+        # Non sovrascrivo i risultati dell'ontologia della biblioteca
+        nome_risultati = f"risultati_{Path(percorso_owl).stem}"
+
+    grafo = carica_ontologia(percorso_owl)["grafo"]
+
+    if percorso_workload is not None:
+        casi = carica_workload(percorso_workload)
+    else:
+        # Casi scelti per testare situazioni diverse
+        casi = [
+            ("Anna", "LibroGaribaldi"),
+            ("Marco", "LibroAI"),
+            ("Marco", "cat_AlgebraLineare"),
+            ("ProfRossi", "cat_StoriaItalia"),
+            ("LibroAI", "cat_Biblioteca"),
+            ("LibroAI", "cat_Fiabe"),
+        ]
+
+    euristiche = ["nulla", "base", "informata", "landmark", "bidirezionale"]
+
+    # Il grafo è simmetrico: bastano le distanze dagli obiettivi
+    nodi_interesse = {goal for _, goal in casi}
     distanze_bfs = costruisci_distanze_bfs(grafo, nodi_interesse)
+    euristica_landmark = EuristicaLandmark(grafo)
+
+    # Ogni compito è un caso: le ripetizioni le decide misura_adattiva.
+    # L'id_esperimento è la posizione del caso, uguale per tutti i suoi
+    # campioni e stabile tra un'esecuzione e l'altra (serve a riprendere).
+    combinazioni = [(start, goal, eur) for start, goal in casi for eur in euristiche]
+    compiti = [(i, *c) for i, c in enumerate(combinazioni, start=1)]
 
-    risultati = []
-    id_esperimento = 1
+    if opzioni is None:
+        opzioni = OpzioniMisura()
 
-    for start, goal in casi:
-        for eur in euristiche:
-            for _ in range(ripetizioni):
-                r = esegui_singolo_test(grafo, start, goal, eur, distanze_bfs)
-                r["id_esperimento"] = id_esperimento
-                id_esperimento += 1
-                risultati.append(r)
+    # Coda a secchi se i costi degli archi sono multipli di un quanto
+    contesto = (grafo, distanze_bfs, euristica_landmark, opzioni, scegli_frontiera(grafo))
 
     cartella_out = cartella_progetto / "valutazione_sperimentale" / "risultati"
     cartella_out.mkdir(parents=True, exist_ok=True)
 
-    csv_path = cartella_out / "risultati.csv"
-    json_path = cartella_out / "risultati.json"
+    csv_path = cartella_out / f"{nome_risultati}.csv"
+    jsonl_path = cartella_out / f"{nome_risultati}.jsonl"
+    json_path = cartella_out / f"{nome_risultati}.json"
 
-    colonne = list(risultati[0].keys())
+    with SinkRisultati(csv_path, jsonl_path, riprendi=riprendi) as sink:
+        da_eseguire = [c for c in compiti if c[0] not in sink.completati]
+        if len(da_eseguire) < len(compiti):
+            print(f"Riprendo: {len(compiti) - len(da_eseguire)} casi già misurati.")
 
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=colonne)
-        w.writeheader()
-        for r in risultati:
-            w.writerow(r)
+        t0 = time.perf_counter()
+        for righe in esegui_compiti(da_eseguire, contesto, workers=workers):
+            sink.scrivi(righe)
+        t1 = time.perf_counter()
 
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(risultati, f, indent=2, ensure_ascii=False)
+        sink.chiudi(json_path)
 
-    print(f"Ho completato {len(risultati)} esecuzioni.")
+    print(f"Ho misurato {len(da_eseguire)} casi in {t1 - t0:.2f} s (processi: {max(workers, 1)}); "
+          f"{sink.righe_scritte} ripetizioni in totale nei risultati.")
     print("Risultati salvati in:")
     print(" -", csv_path)
+    print(" -", jsonl_path)
     print(" -", json_path)
     print("\nOra puoi generare grafici e report.\n")
 
 
 if __name__ == "__main__":
-    main()
+    args = leggi_argomenti()
+    if args.ripetizioni is not None:
+        opzioni = OpzioniMisura.fisse(args.ripetizioni)
+    else:
+        opzioni = OpzioniMisura(precisione=args.precisione, max_ripetizioni=args.max_ripetizioni)
+    main(
+        workers=args.workers,
+        percorso_owl=args.ontologia,
+        percorso_workload=args.workload,
+        opzioni=opzioni,
+        riprendi=args.riprendi,
+    )
@@ -0,0 +1,219 @@
+import csv
+import json
+import os
+from pathlib import Path
+
+
+def _ultima_riga_completa(percorso):
+    """
+    Posizione subito dopo l'ultimo a capo del file: quello che segue
+    è una riga scritta a metà da un'esecuzione interrotta.
+    """
+    with open(percorso, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        fine = f.tell()
+        blocco = 1 << 16
+        while fine > 0:
+            inizio = max(0, fine - blocco)
+            f.seek(inizio)
+            dati = f.read(fine - inizio)
+            k = dati.rfind(b"\n")
+            if k >= 0:
+                return inizio + k + 1
+            fine = inizio
+    return 0
+
+
+def _ultima_riga(percorso, fine):
+    """
+    Ultima riga completa del file (quella che termina in fine),
+    letta a blocchi dal fondo senza scorrere il file.
+    """
+    with open(percorso, "rb") as f:
+        inizio = fine
+        blocco = 1 << 16
+        while inizio > 0:
+            inizio = max(0, inizio - blocco)
+            f.seek(inizio)
+            dati = f.read(fine - inizio)
+            k = dati.rfind(b"\n", 0, len(dati) - 1)
+            if k >= 0:
+                return dati[k + 1:]
+            blocco *= 2
+        return dati
+
+
+def _taglio(percorso, inizio, fine, leggi_id, ultimo, completati=None):
+    """
+    Scorre le righe complete del file da inizio fino alla prima con
+    id >= ultimo, senza tenerle in memoria.
+
+    Restituisce (posizione di quella riga, righe lette prima);
+    se completati è un insieme, vi aggiunge gli id incontrati.
+    """
+    righe = 0
+    with open(percorso, "rb") as f:
+        f.seek(inizio)
+        posizione = inizio
+        for riga in f:
+            if posizione + len(riga) > fine:
+                break
+            id_esperimento = leggi_id(riga)
+            if id_esperimento >= ultimo:
+                break
+            if completati is not None:
+                completati.add(id_esperimento)
+            righe += 1
+            posizione += len(riga)
+    return posizione, righe
+
+
+def _id_jsonl(riga):
+    return json.loads(riga)["id_esperimento"]
+
+
+class SinkRisultati:
+    """
+    Scrive i risultati del runner man mano che arrivano, in CSV e JSONL
+    (un oggetto JSON per riga), invece di tenerli tutti in memoria.
+
+    scrivi() riceve le righe di un caso (stesso id_esperimento): restano
+    in un buffer che viene scritto su disco ogni righe_per_scrittura righe,
+    e sempre a casi interi.
+
+    Con riprendi=True i file esistenti non vengono cancellati:
+    completati contiene gli id_esperimento già registrati, da saltare.
+    I casi arrivano in ordine di id, quindi solo l'ultimo caso presente
+    nei file può essere stato interrotto a metà: lo tolgo da entrambi i
+    file (insieme a un'eventuale riga troncata) e viene rieseguito.
+    """
+
+    def __init__(self, percorso_csv, percorso_jsonl, riprendi=False, righe_per_scrittura=1000):
+        self.percorso_csv = Path(percorso_csv)
+        self.percorso_jsonl = Path(percorso_jsonl)
+        self.righe_per_scrittura = righe_per_scrittura
+
+        self.completati = set()
+        self.colonne = None
+        self.righe_scritte = 0
+        self._buffer = []
+
+        esistenti = self.percorso_csv.exists() and self.percorso_jsonl.exists()
+        modo = "a" if riprendi and esistenti and self._prepara_ripresa() else "w"
+
+        self._csv = open(self.percorso_csv, modo, newline="", encoding="utf-8")
+        self._jsonl = open(self.percorso_jsonl, modo, encoding="utf-8")
+        self._scrittore = None
+        if self.colonne is not None:
+            self._scrittore = csv.DictWriter(self._csv, fieldnames=self.colonne)
+
+    def _prepara_ripresa(self):
+        """
+        Legge i file esistenti e li tronca all'ultimo caso completo.
+        Restituisce False se non c'è nulla da riprendere.
+
+        In memoria resta solo l'insieme completati: l'ultimo id di ogni
+        file si legge dalla sua ultima riga, poi ogni file viene scorso
+        una volta sola fino alla prima riga da togliere.
+        """
+        fine_csv = _ultima_riga_completa(self.percorso_csv)
+        if fine_csv == 0:
+            return False
+
+        # La prima riga del CSV è l'intestazione
+        with open(self.percorso_csv, "rb") as f:
+            intestazione = f.readline()
+        self.colonne = next(csv.reader([intestazione.decode("utf-8")]))
+        colonna_id = self.colonne.index("id_esperimento")
+
+        def id_csv(riga):
+            return int(next(csv.reader([riga.decode("utf-8")]))[colonna_id])
+
+        fine_jsonl = _ultima_riga_completa(self.percorso_jsonl)
+
+        # Tengo i casi presenti in entrambi i file, tranne l'ultimo
+        ultimo = min(
+            _id_jsonl(_ultima_riga(self.percorso_jsonl, fine_jsonl)) if fine_jsonl > 0 else 0,
+            id_csv(_ultima_riga(self.percorso_csv, fine_csv)) if fine_csv > len(intestazione) else 0,
+        )
+
+        taglio_jsonl, self.righe_scritte = _taglio(
+            self.percorso_jsonl, 0, fine_jsonl, _id_jsonl, ultimo, self.completati
+        )
+        taglio_csv, _ = _taglio(self.percorso_csv, len(intestazione), fine_csv, id_csv, ultimo)
+
+        os.truncate(self.percorso_jsonl, taglio_jsonl)
+        os.truncate(self.percorso_csv, taglio_csv)
+        return True
+
+    def scrivi(self, righe):
+        """
+        Aggiunge le righe di un caso.
+        """
+        self._buffer.extend(righe)
+        if len(self._buffer) >= self.righe_per_scrittura:
+            self.svuota()
+
+    def svuota(self):
+        """
+        Scrive su disco le righe nel buffer.
+        """
+        if not self._buffer:
+            return
+
+        if self._scrittore is None:
+            self.colonne = list(self._buffer[0].keys())
+            self._scrittore = csv.DictWriter(self._csv, fieldnames=self.colonne)
+            self._scrittore.writeheader()
+
+        self._scrittore.writerows(self._buffer)
+        self._jsonl.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in self._buffer)
+
+        self._csv.flush()
+        self._jsonl.flush()
+
+        self.righe_scritte += len(self._buffer)
+        self._buffer = []
+
+    def chiudi(self, percorso_json=None):
+        """
+        Scrive le ultime righe e chiude i file.
+
+        Con percorso_json produce anche il file JSON (una lista indentata)
+        copiandolo riga per riga dal JSONL, senza caricarlo in memoria.
+        """
+        if self._csv.closed:
+            return
+
+        self.svuota()
+        self._csv.close()
+        self._jsonl.close()
+
+        if percorso_json is not None:
+            esporta_json(self.percorso_jsonl, percorso_json)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_eccezione, *_):
+        # Anche dopo un errore scrivo quello che ho: servirà a riprendere
+        self.chiudi()
+
+
+def esporta_json(percorso_jsonl, percorso_json):
+    """
+    Converte un file JSONL nella lista JSON indentata prodotta
+    in passato dal runner.
+    """
+    with open(percorso_jsonl, encoding="utf-8") as origine, \
+            open(percorso_json, "w", encoding="utf-8") as destinazione:
+        destinazione.write("[")
+        primo = True
+        for riga in origine:
+            if not riga.strip():
+                continue
+            oggetto = json.dumps(json.loads(riga), indent=2, ensure_ascii=False)
+            destinazione.write("\n  " if primo else ",\n  ")
+            destinazione.write(oggetto.replace("\n", "\n  "))
+            primo = False
+        destinazione.write("\n]" if not primo else "]")
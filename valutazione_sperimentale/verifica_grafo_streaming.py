@@ -0,0 +1,45 @@
+import argparse
+import time
+from pathlib import Path
+
+from owlready2 import get_ontology
+
+from integrazione_kb.costruisci_grafo import costruisci_grafo
+from integrazione_kb.lettore_rdf_streaming import confronta_grafi, costruisci_grafo_streaming
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confronto tra grafo owlready2 e grafo in streaming.")
+    parser.add_argument("--ontologia", type=Path, default=None,
+                        help="file OWL da usare al posto di ontologia/biblioteca.owl")
+    args = parser.parse_args()
+
+    print("\nConfronto tra il grafo costruito con owlready2 e quello in streaming...\n")
+
+    cartella_progetto = Path(__file__).resolve().parent.parent
+    percorso_owl = args.ontologia or cartella_progetto / "ontologia" / "biblioteca.owl"
+
+    t0 = time.perf_counter()
+    ontologia = get_ontology(str(percorso_owl.resolve())).load()
+    grafo_owlready = costruisci_grafo(ontologia)
+    t1 = time.perf_counter()
+
+    grafo_streaming = costruisci_grafo_streaming(percorso_owl)
+    t2 = time.perf_counter()
+
+    print(f"owlready2: {len(grafo_owlready)} nodi in {(t1 - t0) * 1000.0:.2f} ms")
+    print(f"streaming: {len(grafo_streaming)} nodi in {(t2 - t1) * 1000.0:.2f} ms")
+
+    differenze = confronta_grafi(grafo_owlready, grafo_streaming)
+
+    if differenze:
+        print("\nI due grafi sono diversi:")
+        for d in differenze:
+            print(f"  - {d}")
+        raise SystemExit(1)
+
+    print("\nI due grafi coincidono.\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import random
+
+from integrazione_kb.aggiornamento_grafo import AggiornatoreGrafo
+from ricerca_percorsi.indice_componenti import IndiceComponenti
+
+
+def partizione(indice):
+    """
+    Componenti dell'indice come insieme di insiemi, confrontabile
+    con quelle di un indice costruito da zero.
+    """
+    return {frozenset(membri) for membri in indice.membri.values()}
+
+
+def differenze(indice):
+    """
+    Cosa non torna tra l'indice aggiornato e uno ricostruito sul grafo attuale.
+    """
+    problemi = []
+    nuovo = IndiceComponenti(indice.grafo)
+
+    if set(indice.componente) != set(indice.grafo):
+        problemi.append("i nodi etichettati non coincidono con quelli del grafo")
+    for nodo, id_componente in indice.componente.items():
+        if nodo not in indice.membri.get(id_componente, ()):
+            problemi.append(f"{nodo} non è tra i membri della sua componente")
+    if partizione(indice) != partizione(nuovo):
+        problemi.append("le componenti sono diverse da quelle ricostruite")
+
+    return problemi
+
+
+def caso_nodo_di_taglio():
+    """
+    X tiene unite le due metà del grafo: rimuovendolo, A e B
+    devono finire in componenti diverse.
+    """
+    aggiornatore = AggiornatoreGrafo.da_asserzioni([
+        ("A", "haPrestito", "X"),
+        ("X", "haPrestito", "B"),
+        ("A", "haPrestito", "C"),
+        ("B", "haPrestito", "D"),
+    ])
+    indice = IndiceComponenti(aggiornatore.grafo)
+    aggiornatore.registra_osservatore(indice.aggiorna)
+
+    aggiornatore.rimuovi_individuo("X")
+
+    problemi = differenze(indice)
+    if indice.collegati("A", "B"):
+        problemi.append("A e B risultano ancora collegati")
+    if set(indice.suggerimenti("A")) != {"C"}:
+        problemi.append(f"suggerimenti per A: {indice.suggerimenti('A')}")
+    return problemi
+
+
+def caso_casuale(passi, nodi, seme):
+    """
+    Sequenza casuale di asserzioni aggiunte e rimosse e di individui
+    rimossi, confrontando l'indice con una ricostruzione dopo ogni passo.
+    """
+    generatore = random.Random(seme)
+    nomi = [f"n{i}" for i in range(nodi)]
+    proprieta = ["haPrestito", "scrittoDa", "sottoCategoriaDi"]
+
+    aggiornatore = AggiornatoreGrafo.da_asserzioni([])
+    indice = IndiceComponenti(aggiornatore.grafo)
+    aggiornatore.registra_osservatore(indice.aggiorna)
+    presenti = []
+
+    for passo in range(passi):
+        scelta = generatore.random()
+        if presenti and scelta < 0.5:
+            asserzione = presenti.pop(generatore.randrange(len(presenti)))
+            aggiornatore.rimuovi_asserzione(*asserzione)
+        elif scelta < 0.55 and aggiornatore.grafo:
+            nome = generatore.choice(sorted(aggiornatore.grafo))
+            aggiornatore.rimuovi_individuo(nome)
+            presenti = [a for a in presenti if nome not in (a[0], a[2])]
+        else:
+            sorgente, destinazione = generatore.sample(nomi, 2)
+            asserzione = (sorgente, generatore.choice(proprieta), destinazione)
+            presenti.append(asserzione)
+            aggiornatore.aggiungi_asserzione(*asserzione)
+
+        problemi = differenze(indice)
+        if problemi:
+            return [f"passo {passo}: {p}" for p in problemi]
+
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica dell'indice delle componenti dopo gli aggiornamenti.")
+    parser.add_argument("--passi", type=int, default=5000)
+    parser.add_argument("--nodi", type=int, default=80)
+    parser.add_argument("--seme", type=int, default=42)
+    args = parser.parse_args()
+
+    print("\nVerifico l'indice delle componenti aggiornato in modo incrementale...\n")
+
+    problemi = caso_nodo_di_taglio()
+    problemi += caso_casuale(args.passi, args.nodi, args.seme)
+
+    if problemi:
+        print("L'indice aggiornato non coincide con quello ricostruito:")
+        for p in problemi:
+            print(f"  - {p}")
+        raise SystemExit(1)
+
+    print("L'indice aggiornato coincide sempre con quello ricostruito.\n")
+
+
+if __name__ == "__main__":
+    main()
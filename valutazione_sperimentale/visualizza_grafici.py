@@ -1,10 +1,12 @@
 from pathlib import Path
-import pandas as pd
 import matplotlib.pyplot as plt
 
+from valutazione_sperimentale import archivio_risultati
 
-# Carica il file risultati.csv dalla cartella "risultati".
-# Se non lo trova, avvisa e si ferma.
+
+# Carica i risultati dalla cartella "risultati", passando dall'archivio
+# a colonne (i tipi, compreso 'trovato', sono già quelli giusti).
+# Se non trova risultati.csv, avvisa e si ferma.
 def carica_risultati():
     base = Path(__file__).resolve().parent
     csv_path = base / "risultati" / "risultati.csv"
@@ -14,11 +16,7 @@ def carica_risultati():
         print("Prima esegui: python -m valutazione_sperimentale.runner_esperimenti")
         return None, None
 
-    df = pd.read_csv(csv_path)
-
-    # Se la colonna 'trovato' è stata letta come stringa, la sistemiamo
-    if df["trovato"].dtype == object:
-        df["trovato"] = df["trovato"].astype(str).str.lower().isin(["true", "1"])
+    df = archivio_risultati.carica_risultati(csv_path)
 
     return df, csv_path.parent
 
@@ -27,10 +25,11 @@ def carica_risultati():
 # Confronto globale: quante espansioni in media fa ogni euristica.
 # Serve per vedere chi esplora meno nodi in generale.
 def grafico_nodi_medi_per_euristica(df, out):
-    grp = df.groupby("euristica").agg(
+    grp = df.groupby("euristica", observed=True).agg(
         nodi_medi=("nodi_espansi", "mean")
     ).reset_index()
 
+    grp["euristica"] = grp["euristica"].astype(str)
     grp = grp.sort_values("nodi_medi")
 
     plt.figure(figsize=(6, 4))
@@ -48,9 +47,10 @@ def grafico_nodi_medi_per_euristica(df, out):
 # Tempo medio di esecuzione per ciascuna euristica.
 # Qui guardiamo la velocità, non la qualità della ricerca.
 def grafico_tempo_medio(df, out):
-    grp = df.groupby("euristica").agg(
+    grp = df.groupby("euristica", observed=True).agg(
         tempo_medio=("tempo_ms", "mean")
     ).reset_index()
+    grp["euristica"] = grp["euristica"].astype(str)
 
     plt.figure(figsize=(6, 4))
     plt.bar(grp["euristica"], grp["tempo_medio"])
@@ -68,13 +68,14 @@ def grafico_tempo_medio(df, out):
 # così il grafico è più leggibile e progressivo.
 def grafico_nodi_per_caso(df, out):
     grp = df.groupby(
-        ["nodo_iniziale", "nodo_obiettivo", "euristica"]
+        ["nodo_iniziale", "nodo_obiettivo", "euristica"], observed=True
     ).agg(
         nodi_medi=("nodi_espansi", "mean")
     ).reset_index()
 
     # Creo etichetta leggibile per ogni caso
-    grp["caso"] = grp["nodo_iniziale"] + " → " + grp["nodo_obiettivo"]
+    grp["caso"] = grp["nodo_iniziale"].astype(str) + " → " + grp["nodo_obiettivo"].astype(str)
+    grp["euristica"] = grp["euristica"].astype(str)
 
     pivot = grp.pivot(index="caso", columns="euristica", values="nodi_medi")
 